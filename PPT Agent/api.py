@@ -1,20 +1,50 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 import os
+import json
+import tempfile
+import threading
+import uuid
 import logging
+from urllib.parse import quote
+from config import Config
 from tool_registry import ToolRegistry
 from register_tools import register_all_tools
+from job_queue import JobManager, JobQueueFull
+from http_client import http_client
+from metrics import metrics
 from pydantic import BaseModel
+from typing import List, Optional
 
 logging.basicConfig(level=logging.INFO)
 
-# Register tools (this must happen after all tool classes are defined)
+# Register tools by import path; each is imported and built on first use
 register_all_tools()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    if Config.TOOL_WARMUP:
+        # Build tools in the background so the server starts listening at
+        # once; a request arriving meanwhile waits for the same build
+        names = None if Config.TOOL_WARMUP is True else list(Config.TOOL_WARMUP)
+        threading.Thread(target=ToolRegistry.warm_up, args=(names,), daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+jobs = JobManager()
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+JOBS_OUTPUT_PATH = os.path.join(Config.OUTPUT_PATH, "jobs")
+REQUESTS_OUTPUT_PATH = os.path.join(Config.OUTPUT_PATH, "requests")
+os.makedirs(JOBS_OUTPUT_PATH, exist_ok=True)
+os.makedirs(REQUESTS_OUTPUT_PATH, exist_ok=True)
 
 class GenerateTextRequest(BaseModel):
     topic: str
+    bypass_cache: bool = False
 
 @app.post("/generate_text/")
 def generate_text(request_data: GenerateTextRequest):
@@ -26,7 +56,7 @@ def generate_text(request_data: GenerateTextRequest):
     if not text_tool:
         raise HTTPException(status_code=500, detail="Text generation tool not found.")
     
-    generated_text = text_tool.run(topic)
+    generated_text = text_tool.run(topic, bypass_cache=request_data.bypass_cache)
     if not generated_text or "error" in generated_text:
         logging.error(f"🚨 Text generation failed for {topic}: {generated_text.get('error', 'Unknown Error')}")
         return {"data": [{"title": topic, "content": "Text generation failed."}]}
@@ -37,6 +67,37 @@ def generate_text(request_data: GenerateTextRequest):
 
     return generated_text  # ✅ Now properly returns a dictionary with "data" as a list
 
+class GenerateTextBatchRequest(BaseModel):
+    topics: List[str]
+    bypass_cache: bool = False
+
+@app.post("/generate_text_batch/")
+def generate_text_batch(request_data: GenerateTextBatchRequest):
+    """
+    Generates slides for several topics in as few LLM requests as possible.
+    Returns {"data": {topic: [slides]}}.
+    """
+    topics = [topic for topic in request_data.topics if topic]
+    if not topics:
+        raise HTTPException(status_code=400, detail="At least one topic is required.")
+
+    text_tool = ToolRegistry.get_tool("text_generation")
+    if not text_tool:
+        raise HTTPException(status_code=500, detail="Text generation tool not found.")
+
+    results = text_tool.run_batch(topics, bypass_cache=request_data.bypass_cache)
+    data = {}
+    for topic, generated_text in results.items():
+        if not generated_text or "error" in generated_text:
+            logging.error(f"🚨 Text generation failed for {topic}: {generated_text.get('error', 'Unknown Error')}")
+            data[topic] = [{"title": topic, "content": "Text generation failed."}]
+        elif not generated_text.get("data"):
+            logging.warning(f"⚠️ No content found for {topic}. Returning fallback response.")
+            data[topic] = [{"title": topic, "content": "No content found."}]
+        else:
+            data[topic] = generated_text["data"]
+    return {"data": data}
+
 @app.post("/generate_ppt/")
 def generate_ppt(request_data: dict):
     main_topic = request_data.get("main_topic")
@@ -47,41 +108,300 @@ def generate_ppt(request_data: dict):
         raise HTTPException(status_code=400, detail="Main topic and subtopics are required.")
 
     ppt_generator = ToolRegistry.get_tool("ppt_generator")
-    ppt_path = ppt_generator.run(main_topic, subtopics, generated_text)
-    if ppt_path is None or not os.path.exists(ppt_path):
-        raise HTTPException(status_code=500, detail="PPT generation failed.")
-    
+    if not ppt_generator:
+        raise HTTPException(status_code=500, detail="PPT generator tool not found.")
+    return deck_response(
+        lambda output: ppt_generator.run(main_topic, subtopics, generated_text, output),
+        "generated_presentation.pptx",
+        "PPT generation failed."
+    )
+
+def deck_response(render, filename, error_detail):
+    """
+    Calls `render(output)` with a private output for this request and sends
+    the deck back. With Config.RENDER_IN_MEMORY the output is a spooled
+    buffer that only touches disk (as an anonymous temp file) past
+    Config.RENDER_SPOOL_MAX_BYTES; otherwise it is a unique file that is
+    removed once the response has been sent. Either way concurrent requests
+    never share a file. The time spent per stage is sent in a Server-Timing
+    header.
+    """
+    if Config.RENDER_IN_MEMORY:
+        buffer = tempfile.SpooledTemporaryFile(max_size=Config.RENDER_SPOOL_MAX_BYTES)
+        with metrics.trace() as trace:
+            rendered = render(buffer)
+        if rendered is None:
+            buffer.close()
+            raise HTTPException(status_code=500, detail=error_detail)
+        size = buffer.seek(0, os.SEEK_END)
+        buffer.seek(0)
+        return StreamingResponse(
+            iter(lambda: buffer.read(Config.UPLOAD_CHUNK_SIZE), b""),
+            media_type=PPTX_MEDIA_TYPE,
+            headers={
+                "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+                "Content-Length": str(size),
+                "Server-Timing": trace.server_timing(),
+            },
+            background=BackgroundTask(buffer.close)
+        )
+
+    ppt_path = os.path.join(REQUESTS_OUTPUT_PATH, f"{uuid.uuid4().hex}.pptx")
+    with metrics.trace() as trace:
+        rendered = render(ppt_path)
+    if rendered is None or not os.path.exists(ppt_path):
+        remove_file(ppt_path)
+        raise HTTPException(status_code=500, detail=error_detail)
     return FileResponse(
         ppt_path,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        filename="generated_presentation.pptx"
+        media_type=PPTX_MEDIA_TYPE,
+        filename=filename,
+        headers={"Server-Timing": trace.server_timing()},
+        background=BackgroundTask(remove_file, ppt_path)
     )
 
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def check_slide_count(slide_count):
+    if slide_count is not None and not 1 <= slide_count <= Config.MAX_SLIDE_COUNT:
+        raise HTTPException(status_code=400, detail=f"slide_count must be between 1 and {Config.MAX_SLIDE_COUNT}.")
+
 @app.post("/upload_pdf/")
-def upload_pdf(file: UploadFile = File(...)):
+def upload_pdf(file: UploadFile = File(...), slide_count: Optional[int] = None, bypass_cache: bool = False):
     """
     Handles PDF upload and converts it into a structured PPT.
     """
-    pdf_path = f"uploads/{file.filename}"
-    os.makedirs("uploads", exist_ok=True)
+    check_slide_count(slide_count)
+    pdf_converter = ToolRegistry.get_tool("pdf_to_ppt_converter")
+    if not pdf_converter:
+        raise HTTPException(status_code=500, detail="PDF to PPT converter tool not found.")
+
+    pdf_path = upload_path(file)
+    save_upload(file, pdf_path)
+    logging.info(f"📥 PDF received: {pdf_path}")
+
+    try:
+        return deck_response(
+            lambda output: pdf_converter.run(pdf_path, output, slide_count=slide_count, bypass_cache=bypass_cache),
+            os.path.splitext(upload_name(file))[0] + "_converted.pptx",
+            "PDF to PPT conversion failed."
+        )
+    finally:
+        remove_file(pdf_path)
+
+def upload_name(file):
+    """The upload's file name without directories; the client may send none."""
+    return os.path.basename(file.filename or "") or "upload.pdf"
+
+def upload_path(file):
+    """
+    Where an upload is stored: a unique name per request under
+    Config.UPLOAD_PATH, so concurrent uploads of the same file never
+    collide, whatever directory the server was started from.
+    """
+    return os.path.join(os.path.abspath(Config.UPLOAD_PATH), f"{uuid.uuid4().hex}_{upload_name(file)}")
+
+def save_upload(file, pdf_path):
+    """
+    Copies an upload to disk in Config.UPLOAD_CHUNK_SIZE pieces so at most
+    one chunk is held in memory. Uploads over Config.MAX_UPLOAD_BYTES are
+    rejected with 413 and the partial file is removed.
+    """
+    os.makedirs(os.path.dirname(pdf_path) or ".", exist_ok=True)
+    written = 0
+    try:
+        with open(pdf_path, "wb") as f:
+            while chunk := file.file.read(Config.UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > Config.MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"PDF exceeds the {Config.MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit."
+                    )
+                f.write(chunk)
+    except BaseException:
+        os.remove(pdf_path)
+        raise
+    return written
+
+def submit_job(kind, fn, *args, **kwargs):
+    """Queues a conversion and returns 202 with the URLs to poll, or 429 when the queue is full."""
+    try:
+        job = jobs.submit(kind, fn, *args, **kwargs)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Too many jobs in progress. Please retry later.")
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status_url": f"/status/{job.id}",
+        "download_url": f"/download/{job.id}",
+    })
 
-    with open(pdf_path, "wb") as f:
-        f.write(file.file.read())
+@app.post("/jobs/generate_ppt/")
+async def submit_generate_ppt(request_data: dict):
+    """
+    Queues PPT generation in the background and returns a job_id at once.
+    """
+    main_topic = request_data.get("main_topic")
+    subtopics = request_data.get("subtopics", [])
+    generated_text = request_data.get("generated_text", {})
 
+    if not main_topic or not subtopics:
+        raise HTTPException(status_code=400, detail="Main topic and subtopics are required.")
+
+    # The first call builds the tool (python-pptx imports), so keep it off the event loop
+    ppt_generator = await run_in_threadpool(ToolRegistry.get_tool, "ppt_generator")
+    if not ppt_generator:
+        raise HTTPException(status_code=500, detail="PPT generator tool not found.")
+    output_path = os.path.join(JOBS_OUTPUT_PATH, f"{uuid.uuid4().hex}.pptx")
+    return submit_job("generate_ppt", ppt_generator.run, main_topic, subtopics, generated_text, output_path)
+
+@app.post("/jobs/upload_pdf/")
+async def submit_upload_pdf(file: UploadFile = File(...), slide_count: Optional[int] = None, bypass_cache: bool = False):
+    """
+    Stores the uploaded PDF and queues its conversion in the background.
+    """
+    check_slide_count(slide_count)
+    pdf_converter = await run_in_threadpool(ToolRegistry.get_tool, "pdf_to_ppt_converter")
+    if not pdf_converter:
+        raise HTTPException(status_code=500, detail="PDF to PPT converter tool not found.")
+
+    pdf_path = upload_path(file)
+    await run_in_threadpool(save_upload, file, pdf_path)
     logging.info(f"📥 PDF received: {pdf_path}")
 
-    pdf_converter = ToolRegistry.get_tool("pdf_to_ppt_converter")
+    output_path = os.path.join(JOBS_OUTPUT_PATH, f"{uuid.uuid4().hex}.pptx")
+    try:
+        return submit_job("upload_pdf", convert_upload, pdf_converter, pdf_path, output_path,
+                          slide_count=slide_count, bypass_cache=bypass_cache)
+    except HTTPException:
+        remove_file(pdf_path)
+        raise
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def convert_upload(pdf_converter, pdf_path, output_path, **kwargs):
+    """Runs a queued conversion and removes the uploaded PDF afterwards."""
+    try:
+        return pdf_converter.run(pdf_path, output_path, **kwargs)
+    finally:
+        remove_file(pdf_path)
+
+def stream_job(kind, events, fmt, cleanup_path=None):
+    """
+    Sends the events of a streamed conversion as NDJSON lines or
+    Server-Sent Events. The conversion is tracked as a job, so the final
+    "done" event carries a download_url for the saved deck, along with the
+    job's trace.
+    """
+    try:
+        if fmt not in STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(STREAM_MEDIA_TYPES)}.")
+        try:
+            job = jobs.track(kind)
+        except JobQueueFull:
+            raise HTTPException(status_code=429, detail="Too many jobs in progress. Please retry later.")
+    except HTTPException:
+        if cleanup_path:
+            remove_file(cleanup_path)
+        raise
+
+    def encode(event):
+        if fmt == "sse":
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    def body():
+        result_path, error = None, "stream closed before the deck was saved"
+        try:
+            yield encode({"event": "job", "job_id": job.id, "status_url": f"/status/{job.id}"})
+            for event in metrics.traced(events, job.trace):
+                if event["event"] == "stage":
+                    job.set_stage(event["stage"])
+                elif event["event"] == "done":
+                    result_path, error = event.pop("path"), None
+                    event["download_url"] = f"/download/{job.id}"
+                    event["trace"] = job.trace.summary()
+                elif event["event"] == "error":
+                    error = event["detail"]
+                yield encode(event)
+        finally:
+            jobs.finish(job, result_path, error)
+            if cleanup_path:
+                remove_file(cleanup_path)
+
+    # Sync generators are iterated in the threadpool, so slow LLM reads never block the event loop
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[fmt], headers={"Cache-Control": "no-cache"})
+
+@app.post("/stream/generate_ppt/")
+def stream_generate_ppt(request_data: dict, format: str = "ndjson"):
+    """
+    Generates the PPT while streaming per-slide events. Subtopics without
+    entries in `generated_text` have their text streamed from the LLM.
+    """
+    main_topic = request_data.get("main_topic")
+    subtopics = request_data.get("subtopics", [])
+    generated_text = request_data.get("generated_text", {})
+
+    if not main_topic or not subtopics:
+        raise HTTPException(status_code=400, detail="Main topic and subtopics are required.")
+
+    ppt_generator = ToolRegistry.get_tool("ppt_generator")
+    if not ppt_generator:
+        raise HTTPException(status_code=500, detail="PPT generator tool not found.")
+    output_path = os.path.join(JOBS_OUTPUT_PATH, f"{uuid.uuid4().hex}.pptx")
+    events = ppt_generator.stream(main_topic, subtopics, generated_text, output_path,
+                                  bypass_cache=request_data.get("bypass_cache", False))
+    return stream_job("generate_ppt", events, format)
+
+@app.post("/stream/upload_pdf/")
+async def stream_upload_pdf(file: UploadFile = File(...), slide_count: Optional[int] = None,
+                            bypass_cache: bool = False, format: str = "ndjson"):
+    """
+    Stores the uploaded PDF and converts it while streaming per-slide events.
+    """
+    check_slide_count(slide_count)
+    pdf_converter = await run_in_threadpool(ToolRegistry.get_tool, "pdf_to_ppt_converter")
     if not pdf_converter:
         raise HTTPException(status_code=500, detail="PDF to PPT converter tool not found.")
 
-    ppt_path = pdf_converter.run(pdf_path)
-    if ppt_path is None or not os.path.exists(ppt_path):
-        raise HTTPException(status_code=500, detail="PDF to PPT conversion failed.")
+    pdf_path = upload_path(file)
+    await run_in_threadpool(save_upload, file, pdf_path)
+    logging.info(f"📥 PDF received: {pdf_path}")
 
-    return FileResponse(
-        ppt_path,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        filename=os.path.basename(ppt_path)
-    )
+    output_path = os.path.join(JOBS_OUTPUT_PATH, f"{uuid.uuid4().hex}.pptx")
+    events = pdf_converter.stream(pdf_path, output_path, slide_count=slide_count, bypass_cache=bypass_cache)
+    return stream_job("upload_pdf", events, format, cleanup_path=pdf_path)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Stage latency histograms, byte, token and cache counters and HTTP client counters, for Prometheus."""
+    return PlainTextResponse(metrics.prometheus(http_client.metrics()), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/http")
+async def http_metrics():
+    """Request, retry and connection pool counters of the shared HTTP client, per host."""
+    return http_client.metrics()
+
+@app.get("/status/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+@app.get("/download/{job_id}")
+async def download(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}.")
+
+    filename = "converted_presentation.pptx" if job.kind == "upload_pdf" else "generated_presentation.pptx"
+    return FileResponse(job.result_path, media_type=PPTX_MEDIA_TYPE, filename=filename)
 
 print("✅ API is running!")
@@ -2,11 +2,13 @@ import streamlit as st
 import requests
 import base64  
 import os
+import time
 
-API_URL = "http://127.0.0.1:8000/generate_ppt/"
-TEXT_API_URL = "http://127.0.0.1:8000/generate_text/"
-UPLOAD_API_URL = "http://127.0.0.1:8000/upload_pdf/"
-DOWNLOAD_URL = "http://127.0.0.1:8000/download_ppt/"
+API_URL = "http://127.0.0.1:8000/jobs/generate_ppt/"
+TEXT_API_URL = "http://127.0.0.1:8000/generate_text_batch/"
+UPLOAD_API_URL = "http://127.0.0.1:8000/jobs/upload_pdf/"
+STATUS_URL = "http://127.0.0.1:8000/status/"
+DOWNLOAD_URL = "http://127.0.0.1:8000/download/"
 BACKGROUND_IMAGE = os.path.join("templates", "pdfbackground.png")
 
 def add_bg_image(image_path):
@@ -35,6 +37,32 @@ def add_bg_image(image_path):
     """
     st.markdown(bg_image_style, unsafe_allow_html=True)
 
+def wait_for_job(response):
+    """
+    Polls a submitted job until it finishes, showing its current stage.
+    Returns the presentation bytes, or None if the job failed.
+    """
+    if response.status_code == 429:
+        st.error("❌ The server is busy. Please try again in a moment.")
+        return None
+    if response.status_code != 202:
+        return None
+
+    job_id = response.json()["job_id"]
+    stage_placeholder = st.empty()
+    while True:
+        status = requests.get(STATUS_URL + job_id).json()
+        if status["status"] in ("done", "failed"):
+            break
+        stage_placeholder.info(f"⏳ {status['status'].capitalize()}: {status['stage'] or 'waiting for a worker'}")
+        time.sleep(1)
+    stage_placeholder.empty()
+
+    if status["status"] == "failed":
+        return None
+    download = requests.get(DOWNLOAD_URL + job_id)
+    return download.content if download.status_code == 200 else None
+
 st.title("AI-Powered PPT Generator")
 
 if os.path.exists(BACKGROUND_IMAGE):
@@ -53,34 +81,35 @@ if option == "Generate PPT from Topics":
     if st.button("Generate PPT"):
         st.info("⏳ Fetching text, images, and generating PPT...")
         generated_text = {}
+        subtopics = [subtopic_1, subtopic_2]
 
-        for subtopic in [subtopic_1, subtopic_2]:
-            text_response = requests.post(TEXT_API_URL, json={"topic": subtopic})
-            if text_response.status_code == 200:
-                try:
-                    resp = text_response.json()
-                    if "data" in resp:
-                        generated_text[subtopic] = resp["data"]
+        # One request generates the text for every subtopic
+        text_response = requests.post(TEXT_API_URL, json={"topics": subtopics})
+        if text_response.status_code == 200:
+            try:
+                resp = text_response.json()
+                for subtopic in subtopics:
+                    if subtopic in resp.get("data", {}):
+                        generated_text[subtopic] = resp["data"][subtopic]
                     else:
                         st.error(f"❌ Unexpected response format for {subtopic}")
                         generated_text[subtopic] = {"title": subtopic, "content": "No content found."}
-                except Exception as e:
-                    st.error(f"❌ Error parsing text generation response for {subtopic}: {e}")
-                    generated_text[subtopic] = {"title": subtopic, "content": "Text generation failed."}
-            else:
-                st.error(f"❌ Text generation failed for {subtopic}")
-                generated_text[subtopic] = {"title": subtopic, "content": "Text generation failed."}
+            except Exception as e:
+                st.error(f"❌ Error parsing text generation response: {e}")
+                generated_text = {s: {"title": s, "content": "Text generation failed."} for s in subtopics}
+        else:
+            st.error("❌ Text generation failed")
+            generated_text = {s: {"title": s, "content": "Text generation failed."} for s in subtopics}
 
         data = {
             "main_topic": main_topic,
-            "subtopics": [subtopic_1, subtopic_2],
+            "subtopics": subtopics,
             "generated_text": generated_text
         }
 
-        response = requests.post(API_URL, json=data)
-        if response.status_code == 200:
+        ppt_bytes = wait_for_job(requests.post(API_URL, json=data))
+        if ppt_bytes:
             st.success("✅ PPT generated successfully with images and text!")
-            ppt_bytes = response.content
             ppt_filename = "generated_presentation.pptx"
             with open(ppt_filename, "wb") as f:
                 f.write(ppt_bytes)
@@ -104,10 +133,9 @@ elif option == "Convert PDF to PPT":
                 "application/pdf"
             )
         }
-        response = requests.post(UPLOAD_API_URL, files=files)
-        if response.status_code == 200:
+        ppt_bytes = wait_for_job(requests.post(UPLOAD_API_URL, files=files))
+        if ppt_bytes:
             st.success("✅ PPT generated successfully from PDF!")
-            ppt_bytes = response.content
             ppt_filename = "converted_presentation.pptx"
             with open(ppt_filename, "wb") as f:
                 f.write(ppt_bytes)
@@ -0,0 +1,71 @@
+import functools
+import io
+import logging
+import os
+from PIL import Image, ImageOps
+from pptx.dml.color import RGBColor
+from pptx.util import Emu
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+
+
+@functools.lru_cache(maxsize=8)
+def render_background(path, mtime, width_px, height_px):
+    """
+    Scales and crops the background asset to the slide's pixel size and
+    returns JPEG bytes. Cached per process; `mtime` invalidates the entry
+    when the file changes.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", (width_px, height_px))  # lets JPEG decode at reduced scale
+        fitted = ImageOps.fit(img.convert("RGB"), (width_px, height_px), Image.LANCZOS)
+    buffer = io.BytesIO()
+    fitted.save(buffer, "JPEG", quality=Config.BACKGROUND_JPEG_QUALITY, optimize=True)
+    logging.info(f"🖼️ Background rendered at {width_px}x{height_px}: {len(buffer.getvalue())} bytes")
+    return buffer.getvalue()
+
+
+def background_image_bytes(prs):
+    """Returns the background asset rendered for this deck's slide size, or None if it is missing."""
+    path = os.path.join(Config.ASSETS_PATH, Config.BACKGROUND_IMAGE)
+    if not os.path.exists(path):
+        return None
+    width_px = round(Emu(prs.slide_width).inches * Config.BACKGROUND_DPI)
+    height_px = round(Emu(prs.slide_height).inches * Config.BACKGROUND_DPI)
+    return render_background(path, os.path.getmtime(path), width_px, height_px)
+
+
+def apply_background(slide, prs):
+    """
+    Gives the slide its background according to Config.BACKGROUND_MODE:
+    "image" (the resized asset as a full-bleed picture behind all shapes),
+    "solid", "gradient" or "none".
+    """
+    if hasattr(slide, "apply_background"):
+        # Slides of an XMLDeck are stamped as text
+        slide.apply_background(prs)
+        return
+    mode = Config.BACKGROUND_MODE
+    if mode == "image":
+        image_bytes = background_image_bytes(prs)
+        if image_bytes is None:
+            logging.warning("Background image not found; skipping background for slide.")
+            return
+        # Identical bytes on every slide share a single image part in the package
+        bg_shape = slide.shapes.add_picture(io.BytesIO(image_bytes), 0, 0, width=prs.slide_width, height=prs.slide_height)
+        # Move background to the back by reordering the shape tree
+        spTree = slide.shapes._spTree
+        spTree.remove(bg_shape._element)
+        spTree.insert(2, bg_shape._element)
+    elif mode == "solid":
+        fill = slide.background.fill
+        fill.solid()
+        fill.fore_color.rgb = RGBColor.from_string(Config.BACKGROUND_COLOR)
+    elif mode == "gradient":
+        fill = slide.background.fill
+        fill.gradient()
+        fill.gradient_angle = Config.BACKGROUND_GRADIENT_ANGLE
+        start, end = Config.BACKGROUND_GRADIENT
+        fill.gradient_stops[0].color.rgb = RGBColor.from_string(start)
+        fill.gradient_stops[1].color.rgb = RGBColor.from_string(end)
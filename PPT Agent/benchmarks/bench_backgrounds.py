@@ -0,0 +1,88 @@
+"""
+Compares output size and build/save time of a 30-slide deck with the old
+background handling (the full-size asset added to every slide) against the
+background pipeline in each mode.
+
+    python benchmarks/bench_backgrounds.py --slides 30
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backgrounds
+import image_fetcher
+import image_store
+import ppt_generator
+from config import Config
+from pptx.presentation import Presentation as PresentationObject
+
+
+def legacy_background(slide, prs):
+    """The background code as it was before the pipeline."""
+    background_path = os.path.join(Config.ASSETS_PATH, "light_blue_gradient.png")
+    bg_shape = slide.shapes.add_picture(background_path, 0, 0, width=prs.slide_width, height=prs.slide_height)
+    spTree = slide.shapes._spTree
+    spTree.remove(bg_shape._element)
+    spTree.insert(2, bg_shape._element)
+
+
+save_times = []
+original_save = PresentationObject.save
+
+
+def timed_save(self, file):
+    start = time.perf_counter()
+    original_save(self, file)
+    save_times.append(time.perf_counter() - start)
+
+
+def build_deck(tool, slide_count, output_path):
+    subtopics = [f"Subtopic {i}" for i in range(slide_count - 1)]
+    generated_text = {s: [{"title": s, "content": "Benchmark content.", "image_query": s}] for s in subtopics}
+    start = time.perf_counter()
+    if tool.run("Benchmark Deck", subtopics, generated_text, output_path=output_path) is None:
+        raise RuntimeError("Deck generation failed")
+    return time.perf_counter() - start
+
+
+def run(tool, args, output_dir):
+    print(f"{args.slides}-slide deck, median of {args.repeat} runs")
+    print(f"{'mode':>9} {'build+save (s)':>15} {'save (s)':>9} {'size (KB)':>10}")
+    for mode in ("legacy", "image", "solid", "gradient"):
+        ppt_generator.apply_background = legacy_background if mode == "legacy" else backgrounds.apply_background
+        Config.BACKGROUND_MODE = mode
+        backgrounds.render_background.cache_clear()
+        output_path = os.path.join(output_dir, f"{mode}.pptx")
+        totals = []
+        save_times.clear()
+        for _ in range(args.repeat):
+            totals.append(build_deck(tool, args.slides, output_path))
+        size_kb = os.path.getsize(output_path) / 1024
+        print(f"{mode:>9} {statistics.median(totals):>15.3f} {statistics.median(save_times):>9.3f} {size_kb:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    PresentationObject.save = timed_save
+    tool = ppt_generator.PPTGeneratorTool()
+    tool.fetch_and_save_image = lambda query: None  # keep the network out of the measurement
+    with tempfile.TemporaryDirectory(prefix="bench_backgrounds_") as output_dir:
+        # Deck builds report image savings from the store; keep them off the real one
+        store = image_store.ImageStore(root=os.path.join(output_dir, "images"))
+        image_fetcher.image_store = image_store.image_store = store
+        run(tool, args, output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmarks hedged image downloads against a local stub server whose image
+hosts are sometimes slow, serve HTML, truncated or tiny images, or 404.
+Compares downloading only the first search result (the old behaviour)
+with racing the top candidates, and prints the hit rate and per-image
+latency of each.
+
+    python benchmarks/bench_image_hedging.py --images 60 --slow 0.15 --broken 0.25
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from stub_server import StubServer
+
+
+def make_photo(size=(1200, 800)):
+    """A photo-sized JPEG, so downloads are not trivially small."""
+    import io
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.radial_gradient("L").resize(size).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(server, fetcher, images, workers, scratch):
+    """Fetches `images` distinct queries on `workers` threads; returns per-image (seconds, path)."""
+    import image_fetcher
+    from image_store import ImageStore
+
+    image_fetcher.image_store = ImageStore(root=tempfile.mkdtemp(prefix="bench_images_", dir=scratch))
+    server.endpoint_counts.clear()
+
+    def fetch(number):
+        start = time.perf_counter()
+        path = fetcher.run(f"benchmark photo {number}")
+        return time.perf_counter() - start, path
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, range(images)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--candidates", type=int, default=5, help="Results per search")
+    parser.add_argument("--slow", type=float, default=0.15, help="Share of slow image hosts")
+    parser.add_argument("--broken", type=float, default=0.25,
+                        help="Share of hosts serving HTML, truncated or tiny images, or 404s")
+    parser.add_argument("--slow-latency", type=float, default=8.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    faults = {"slow": args.slow, **{fault: args.broken / 4 for fault in ("html", "truncated", "tiny", "missing")}}
+    report = sys.__stdout__
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix="bench_image_hedging_") as scratch, StubServer(
+            args.latency, image_bytes=make_photo(), image_results=args.candidates,
+            image_faults=faults, slow_latency=args.slow_latency) as server:
+        Config.SERPAPI_URL = server.search_url
+        # Real candidates are spread over many hosts; here they share one
+        Config.HTTP_MAX_PER_HOST = 1024
+        from image_fetcher import ImageFetcherTool
+
+        fetcher = ImageFetcherTool()
+        print(f"{args.images} images, {args.candidates} results per search, {args.slow:.0%} slow hosts "
+              f"({args.slow_latency}s), {args.broken:.0%} broken hosts", file=report)
+        print(f"{'mode':>14} {'hit rate':>9} {'thumbs':>7} {'p50 (s)':>8} {'p95 (s)':>8} {'max (s)':>8} "
+              f"{'downloads':>10}", file=report)
+
+        modes = (
+            ("first result", {"IMAGE_CANDIDATES": 1, "IMAGE_DOWNLOAD_DEADLINE": Config.IMAGE_FETCH_TIMEOUT,
+                              "IMAGE_THUMBNAIL_DEADLINE": 0}),
+            ("hedged", {}),
+        )
+        defaults = {name: getattr(Config, name) for name in modes[0][1]}
+        for label, overrides in modes:
+            for name, value in {**defaults, **overrides}.items():
+                setattr(Config, name, value)
+            results = run(server, fetcher, args.images, args.workers, scratch)
+            seconds = [elapsed for elapsed, _ in results]
+            hits = sum(1 for _, path in results if path)
+            print(f"{label:>14} {hits / len(results):>9.0%} {server.endpoint_counts['thumb']:>7} "
+                  f"{percentile(seconds, 0.5):>8.2f} {percentile(seconds, 0.95):>8.2f} {max(seconds):>8.2f} "
+                  f"{server.endpoint_counts['img']:>10}", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmarks deck build time against a local stub SerpAPI/image host with
+injected latency, comparing sequential image fetching (one worker) with the
+concurrent prefetch stage.
+
+    python benchmarks/bench_image_prefetch.py --latency 0.1 --slides 5 10 20 40
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import image_fetcher
+import image_store
+from config import Config
+from ppt_generator import PPTGeneratorTool
+from stub_server import StubServer
+
+
+def build_deck(slide_count, workers, scratch):
+    subtopics = [f"Subtopic {i}" for i in range(slide_count)]
+    generated_text = {
+        subtopic: [{"title": subtopic, "content": "Benchmark content.", "image_query": f"query {subtopic}"}]
+        for subtopic in subtopics
+    }
+    Config.IMAGE_PREFETCH_WORKERS = workers
+    # A fresh image store per run so no image is served from the cache, and
+    # an empty assets directory so no background is added, keeping the
+    # measurement on network time. Both the fetcher and the module singleton
+    # (read by log_bytes_saved) are swapped so the real store is untouched.
+    store = image_store.ImageStore(root=tempfile.mkdtemp(prefix="bench_images_", dir=scratch))
+    image_fetcher.image_store = image_store.image_store = store
+    Config.ASSETS_PATH = tempfile.mkdtemp(prefix="bench_assets_", dir=scratch)
+    start = time.perf_counter()
+    path = PPTGeneratorTool().run("Benchmark Deck", subtopics, generated_text)
+    elapsed = time.perf_counter() - start
+    if path is None:
+        raise RuntimeError("Deck generation failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Injected latency per request (seconds)")
+    parser.add_argument("--slides", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--workers", type=int, default=Config.IMAGE_PREFETCH_WORKERS)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix="bench_image_prefetch_") as scratch, StubServer(latency=args.latency) as server:
+        Config.OUTPUT_PATH = tempfile.mkdtemp(prefix="bench_output_", dir=scratch)
+        Config.SERPAPI_URL = server.search_url
+        report = sys.__stdout__
+        print(f"{'slides':>6} {'sequential (s)':>15} {'prefetch (s)':>13} {'speedup':>8}", file=report)
+        for slide_count in args.slides:
+            sequential = build_deck(slide_count, workers=1, scratch=scratch)
+            concurrent = build_deck(slide_count, workers=args.workers, scratch=scratch)
+            print(f"{slide_count:>6} {sequential:>15.2f} {concurrent:>13.2f} {sequential / concurrent:>7.1f}x", file=report)
+
+
+if __name__ == "__main__":
+    main()
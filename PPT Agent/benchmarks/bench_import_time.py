@@ -0,0 +1,89 @@
+"""
+Measures API cold start with `python -X importtime`: the cumulative time
+to `import api` (median of several fresh interpreters), which heavy
+libraries that import pulls in, and how long building each tool takes
+afterwards through the registry (the cost moved to the first request, or
+to the startup warm-up).
+
+    python benchmarks/bench_import_time.py --runs 7
+    python benchmarks/bench_import_time.py --repo /path/to/older/checkout
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pptx", "fitz", "PIL", "openai", "langgraph", "numpy")
+TOOLS = ("text_generation", "image_fetcher", "ppt_generator", "pdf_to_ppt_converter")
+
+BUILD_SCRIPT = """
+import json, sys, time
+import api
+from tool_registry import ToolRegistry
+timings = {}
+for name in %r:
+    start = time.perf_counter()
+    ToolRegistry.get_tool(name)
+    timings[name] = time.perf_counter() - start
+sys.__stdout__.write(json.dumps(timings))
+"""
+
+
+def import_profile(repo, module):
+    """Runs one fresh interpreter and returns {top-level module: cumulative seconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            value = int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].strip()
+        if "." not in name:
+            cumulative[name] = cumulative.get(name, 0) + value / 1e6
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="directory holding api.py (defaults to this checkout)")
+    parser.add_argument("--module", default="api")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.repo, args.module) for _ in range(args.runs)]
+    totals = [profile.get(args.module, 0.0) for profile in profiles]
+    heavy = {name: statistics.median(p.get(name, 0.0) for p in profiles)
+             for name in HEAVY_MODULES if any(name in p for p in profiles)}
+
+    build = subprocess.run([sys.executable, "-c", BUILD_SCRIPT % (TOOLS,)], cwd=args.repo,
+                           capture_output=True, text=True)
+    try:
+        tool_builds = json.loads(build.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        tool_builds = {}
+
+    print(f"import {args.module} ({args.repo}), {args.runs} runs")
+    print(f"  cumulative: median {statistics.median(totals) * 1000:.0f} ms, "
+          f"min {min(totals) * 1000:.0f} ms, max {max(totals) * 1000:.0f} ms")
+    if heavy:
+        print("  heavy imports pulled in: " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                                          for name, seconds in heavy.items()))
+    else:
+        print("  heavy imports pulled in: none")
+    if tool_builds:
+        print("  first get_tool after import: " + ", ".join(f"{name} {seconds * 1000:.1f} ms"
+                                                             for name, seconds in tool_builds.items()))
+
+
+if __name__ == "__main__":
+    main()
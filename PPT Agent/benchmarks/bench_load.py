@@ -0,0 +1,301 @@
+"""
+Load-tests the API offline. Starts the stub OpenAI, SerpAPI and image
+host server, then for each workload a fresh API server process
+(uvicorn) pointed at it through OPENAI_BASE_URL and SERPAPI_URL, with its
+caches and outputs in a scratch directory. Drives concurrent
+/generate_text/, /generate_ppt/ and /upload_pdf/ requests (or a mix of
+the three), and writes throughput, p50/p95/p99 latency, upstream
+requests and the server's peak RSS per workload to a JSON file that can
+be diffed across versions. Server output goes to --server-log, or to a
+fresh file in the temp directory whose path is printed; the scratch
+directories are removed when each server exits.
+
+    python benchmarks/bench_load.py --requests 40 --concurrency 8 --output load.json
+    python benchmarks/bench_load.py --workloads generate_ppt --latency lognormal:0.2,0.6 --error-rate 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from stub_server import StubServer
+
+WORKLOADS = ("generate_text", "generate_ppt", "upload_pdf", "mixed")
+# Warm-up requests are numbered from here, apart from the measured ones
+WARMUP_START = 1_000_000
+PARAGRAPH = (
+    "Quarterly operating results improved across all regions, driven by higher "
+    "volumes and disciplined cost management in the distribution network. "
+)
+
+
+def make_photo(size):
+    """A photo-sized JPEG for the stub image host."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.radial_gradient("L").resize(size).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def make_pdf(pages, upload):
+    """
+    A text PDF of `pages` pages, as bytes. The text is tagged with the
+    `upload` number, so every upload is summarized afresh rather than
+    served from the caches.
+    """
+    import fitz
+
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        body = "".join(f"Result {upload}-{number}-{k} shows that {PARAGRAPH}" for k in range(12))
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Section {number}\n{body}", fontsize=9)
+    return doc.tobytes()
+
+
+def serve(port, state_dir):
+    """Runs the API on `port` (in the server process), keeping all state in `state_dir`."""
+    from config import Config
+
+    Config.OUTPUT_PATH = os.path.join(state_dir, "output")
+    Config.LLM_CACHE_PATH = os.path.join(state_dir, "cache", "llm_cache.sqlite3")
+    Config.IMAGE_STORE_PATH = os.path.join(state_dir, "cache", "images")
+    Config.CHECKPOINT_PATH = os.path.join(state_dir, "cache", "checkpoints")
+    Config.UPLOAD_PATH = os.path.join(state_dir, "uploads")
+    os.makedirs(Config.OUTPUT_PATH, exist_ok=True)
+    # Uploads are saved relative to the working directory
+    os.chdir(state_dir)
+    import uvicorn
+    import api
+
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid):
+    """The peak resident set size of process `pid`, from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+@contextlib.contextmanager
+def api_server(stub, renderer, log_path, startup_timeout=120):
+    """A fresh API server process using `stub`; yields (base_url, pid)."""
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="bench_load_")
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": stub.openai_base_url,
+        "SERPAPI_URL": stub.search_url,
+        "OPENAI_API_KEY": "load-test",
+        "SERP_API_KEY": "load-test",
+        "SLIDE_RENDERER": renderer,
+    }
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port), state_dir],
+                                   env=env, stdout=log, stderr=log)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"API server exited with {process.returncode}; see {log_path}")
+            try:
+                if requests.get(f"{base_url}/metrics", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"API server did not start in {startup_timeout}s; see {log_path}")
+            time.sleep(0.2)
+        yield base_url, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def request_factory(name, pdfs, content_words):
+    """Returns request(base_url, number) -> response for workload `name`."""
+    def generate_text(base_url, number):
+        return requests.post(f"{base_url}/generate_text/", json={"topic": f"Load test topic {number}"}, timeout=600)
+
+    def generate_ppt(base_url, number):
+        subtopics = [f"Deck {number} part {part}" for part in range(3)]
+        content = "Stub slide content. " + " ".join(f"word{i % 50}" for i in range(content_words or 0))
+        generated_text = {
+            subtopic: [{"title": f"{subtopic} slide {slide}", "content": content,
+                        "image_query": f"{subtopic} image {slide}"} for slide in range(3)]
+            for subtopic in subtopics
+        }
+        return requests.post(f"{base_url}/generate_ppt/", timeout=600, json={
+            "main_topic": f"Deck {number}", "subtopics": subtopics, "generated_text": generated_text})
+
+    def upload_pdf(base_url, number):
+        return requests.post(f"{base_url}/upload_pdf/", timeout=600,
+                             files={"file": (f"upload_{number}.pdf", pdfs[number], "application/pdf")})
+
+    single = {"generate_text": generate_text, "generate_ppt": generate_ppt, "upload_pdf": upload_pdf}
+    if name != "mixed":
+        return single[name]
+    mix = list(single.values())
+    return lambda base_url, number: mix[number % len(mix)](base_url, number)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def run_workload(base_url, request, count, concurrency, first_number):
+    """Sends `count` requests from `concurrency` threads; returns (wall seconds, [(seconds, status)])."""
+    def send(number):
+        start = time.perf_counter()
+        try:
+            response = request(base_url, number)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(first_number, first_number + count)))
+    return time.perf_counter() - start, results
+
+
+def summarize(wall, results, upstream, upstream_errors, rss):
+    seconds = [elapsed for elapsed, _ in results]
+    statuses = Counter(str(status) for _, status in results)
+    return {
+        "requests": len(results),
+        "ok": statuses.get("200", 0),
+        "statuses": dict(statuses),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 3),
+        "latency_seconds": {
+            "mean": round(sum(seconds) / len(seconds), 4),
+            **{name: round(percentile(seconds, fraction), 4)
+               for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+            "max": round(max(seconds), 4),
+        },
+        "upstream_requests": dict(upstream),
+        "upstream_errors_injected": dict(upstream_errors),
+        "server_peak_rss_mb": rss,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]), sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--requests", type=int, default=24, help="Measured requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per workload")
+    parser.add_argument("--latency", default="lognormal:0.1,0.5",
+                        help="Stub latency: seconds or fixed:S, uniform:LOW,HIGH, exponential:MEAN, lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Extra stub seconds per 1000 prompt tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream requests failing")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--content-words", type=int, default=40, help="Words per generated slide content")
+    parser.add_argument("--image-size", default="1200x800", help="Stub image size (WIDTHxHEIGHT)")
+    parser.add_argument("--image-results", type=int, default=3, help="Image search results per query")
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--renderer", default=os.getenv("SLIDE_RENDERER", "pptx"), choices=("pptx", "xml"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test.json")
+    parser.add_argument("--server-log", help="API server output (default: a new file in the temp directory)")
+    args = parser.parse_args()
+
+    report = sys.__stdout__
+    width, height = (int(value) for value in args.image_size.lower().split("x"))
+    error_rates = {endpoint: args.error_rate for endpoint in ("search", "img", "thumb", "v1/chat/completions")}
+    if args.server_log:
+        log_path = args.server_log
+        open(log_path, "wb").close()
+    else:
+        fd, log_path = tempfile.mkstemp(prefix="bench_load_server_", suffix=".log")
+        os.close(fd)
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "server_log")},
+        "workloads": {},
+    }
+    with contextlib.redirect_stdout(sys.stderr), StubServer(
+            args.latency, image_bytes=make_photo((width, height)), token_latency=args.token_latency,
+            image_results=args.image_results, error_rates=error_rates, error_status=args.error_status,
+            content_words=args.content_words, seed=args.seed) as stub:
+        # Built up front so PDF generation is not timed
+        numbers = [*range(WARMUP_START, WARMUP_START + args.warmup), *range(args.requests)]
+        pdfs = ({number: make_pdf(args.pdf_pages, number) for number in numbers}
+                if {"upload_pdf", "mixed"} & set(args.workloads) else {})
+        print(f"{args.requests} requests per workload at concurrency {args.concurrency}, stub latency "
+              f"{args.latency}, {args.error_rate:.0%} upstream errors; server log {log_path}", file=report)
+        print(f"{'workload':>14} {'ok':>5} {'req/s':>7} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} "
+              f"{'upstream':>9} {'RSS (MB)':>9}", file=report)
+        for name in args.workloads:
+            request = request_factory(name, pdfs, args.content_words)
+            with api_server(stub, args.renderer, log_path) as (base_url, pid):
+                # Warm-up requests build the tools and templates
+                run_workload(base_url, request, args.warmup, args.concurrency, WARMUP_START)
+                before, errors_before = Counter(stub.endpoint_counts), Counter(stub.error_counts)
+                wall, outcomes = run_workload(base_url, request, args.requests, args.concurrency, 0)
+                summary = summarize(wall, outcomes, stub.endpoint_counts - before, stub.error_counts - errors_before,
+                                    peak_rss_mb(pid))
+            results["workloads"][name] = summary
+            latency = summary["latency_seconds"]
+            print(f"{name:>14} {summary['ok']:>5} {summary['throughput_rps']:>7.2f} {latency['p50']:>8.2f} "
+                  f"{latency['p95']:>8.2f} {latency['p99']:>8.2f} {sum(summary['upstream_requests'].values()):>9} "
+                  f"{summary['server_peak_rss_mb'] or 0:>9.0f}", file=report)
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}", file=report)
+
+
+if __name__ == "__main__":
+    main()
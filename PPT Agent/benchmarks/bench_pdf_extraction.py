@@ -0,0 +1,108 @@
+"""
+Benchmarks page-parallel PDF text extraction on a synthetic PDF, offline:
+pages per second with the old single-process loop and with
+pdf_extraction.extract_pages at 1, 2, 4 and 8 worker processes, and how
+many pages were routed to OCR. Every --scanned-every'th page is an image
+of text with no text layer, as a scanner produces.
+
+    python benchmarks/bench_pdf_extraction.py --pages 400 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+PARAGRAPH = (
+    "Quarterly operating results improved across all regions, driven by higher "
+    "volumes and disciplined cost management in the distribution network. "
+)
+
+
+def make_pdf(path, pages, scanned_every):
+    """Writes a PDF of text pages, with every `scanned_every`'th page an image-only scan."""
+    import fitz
+
+    doc = fitz.open()
+    scan = fitz.open()
+    scan_page = scan.new_page()
+    scan_page.insert_textbox(fitz.Rect(50, 50, 550, 800), PARAGRAPH * 25, fontsize=10)
+    scan_image = scan_page.get_pixmap(dpi=100).tobytes("png")
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        if scanned_every and number % scanned_every == 0:
+            page.insert_image(page.rect, stream=scan_image)
+        else:
+            page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {number}\n" + PARAGRAPH * 25, fontsize=8)
+    doc.save(path)
+
+
+def sequential(pdf_path):
+    """The extraction loop before pdf_extraction: one process, text layer only."""
+    import fitz
+
+    texts = []
+    with fitz.open(pdf_path) as doc:
+        for number, page in enumerate(doc, start=1):
+            texts.append(page.get_text())
+            if number % Config.PDF_STORE_SHRINK_PAGES == 0:
+                fitz.TOOLS.store_shrink(100)
+    return texts
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--scanned-every", type=int, default=10, help="Every n'th page is scanned (0 for none)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    report = sys.__stdout__
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory() as directory:
+        from pdf_extraction import extract_pages, load_ocr_backend
+
+        pdf_path = os.path.join(directory, "synthetic.pdf")
+        make_pdf(pdf_path, args.pages, args.scanned_every)
+        backend = load_ocr_backend(Config.PDF_OCR_BACKEND)
+        print(f"{args.pages} pages, every {args.scanned_every}th scanned, {os.cpu_count()} CPUs, "
+              f"OCR backend: {backend.__name__ if backend else 'none installed'}", file=report)
+        print(f"{'mode':>12} {'pages/s':>9} {'time (ms)':>10} {'speedup':>8} {'text':>6} {'scanned':>8} "
+              f"{'in order':>9}", file=report)
+
+        baseline, expected = timed(lambda: sequential(pdf_path), args.repeat)
+        print(f"{'sequential':>12} {args.pages / baseline:>9.0f} {baseline * 1000:>10.1f} {1:>7.1f}x "
+              f"{len(expected):>6} {'-':>8} {'-':>9}", file=report)
+        for workers in args.workers:
+            routes = {}
+
+            def run():
+                routes.clear()
+                return list(extract_pages(pdf_path, workers=workers, routes=routes))
+
+            seconds, texts = timed(run, args.repeat)
+            # Without OCR every page must match the text layer, in page order
+            in_order = texts == expected if backend is None else len(texts) == len(expected)
+            print(f"{f'{workers} workers':>12} {args.pages / seconds:>9.0f} {seconds * 1000:>10.1f} "
+                  f"{baseline / seconds:>7.1f}x {routes.get('text', 0):>6} {routes.get('scanned', 0):>8} "
+                  f"{'yes' if in_order else 'NO':>9}", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Measures peak RSS while ingesting a synthetic 500-page PDF, comparing the
+old path (read the whole upload, concatenate every page into one string)
+with chunked upload copying and page-by-page extraction, and with the
+summary path that also compresses the pages and cuts them into map
+chunks, as PDF_COMPRESS does before the LLM calls. Pages are extracted
+inline (PDF_EXTRACT_WORKERS=0): RUSAGE_SELF does not see memory used in
+extraction worker processes, so a pool would hide part of the cost.
+
+    python benchmarks/bench_pdf_ingestion_memory.py --pages 500
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PARAGRAPH = (
+    "Quarterly operating results improved across all regions, driven by higher "
+    "volumes and disciplined cost management in the distribution network. "
+)
+
+MODES = ("legacy", "streaming", "summary")
+
+
+def make_pdf(path, pages):
+    """Writes a PDF whose pages each carry ~3 KB of text and a distinct scanned-like image."""
+    import fitz
+    from PIL import Image
+
+    doc = fitz.open()
+    rng = random.Random(0)
+    for number in range(pages):
+        page = doc.new_page()
+        # Distinct sentences, so compression has real text to rank
+        text = "".join(PARAGRAPH.replace("results", f"results {number + 1}.{item}") for item in range(20))
+        page.insert_textbox(fitz.Rect(50, 50, 550, 450), f"Page {number + 1}\n" + text, fontsize=8)
+        noise = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256))
+        buffer = io.BytesIO()
+        noise.save(buffer, "JPEG", quality=90)
+        page.insert_image(fitz.Rect(50, 460, 306, 716), stream=buffer.getvalue())
+    doc.save(path)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Upload:
+    """Stands in for FastAPI's UploadFile, which exposes the spooled body as `.file`."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+
+
+def run_mode(mode, src):
+    from config import Config
+    Config.PDF_EXTRACT_WORKERS = 0
+    from api import save_upload
+    from pdf_to_ppt_converter import PDFToPPTConverterTool
+    import fitz
+
+    converter = PDFToPPTConverterTool()
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_ingestion_") as directory:
+        dest = os.path.join(directory, "upload.pdf")
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+
+        if mode == "legacy":
+            upload = Upload(src)
+            with open(dest, "wb") as f:
+                f.write(upload.file.read())
+            doc = fitz.open(dest)
+            text = ""
+            for page in doc:
+                text += page.get_text()
+            chars = len(text)
+        elif mode == "streaming":
+            save_upload(Upload(src), dest)
+            chars = sum(len(page_text) for page_text in converter.extract_text(dest))
+        else:
+            from text_compression import compress_pages
+
+            save_upload(Upload(src), dest)
+            pages = (f"[Page {number}]\n{text}" for number, text in enumerate(converter.extract_text(dest), start=1))
+            chars = sum(len(chunk) for chunk in converter.iter_chunks(compress_pages(pages)))
+
+        elapsed = time.perf_counter() - start
+        print(f"{mode},{peak_rss_mb() - baseline:.1f},{elapsed:.2f},{chars}")
+
+
+def compare_modes(pdf_path, pages):
+    make_pdf(pdf_path, pages)
+    print(f"Synthetic PDF: {pages} pages, {os.path.getsize(pdf_path) / 1024 / 1024:.1f} MB")
+    print(f"{'mode':>10} {'peak RSS growth (MB)':>21} {'time (s)':>9} {'chars':>9}")
+    # Each mode runs in a fresh interpreter so the peak RSS readings are independent
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--pdf", pdf_path],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        name, rss, elapsed, chars = output.split(",")
+        print(f"{name:>10} {float(rss):>21.1f} {float(elapsed):>9.2f} {int(chars):>9}")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_ingestion_") as directory:
+        compare_modes(os.path.join(directory, "synthetic.pdf"), args.pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmarks PDF summarization against a local fake chat-completions server,
+comparing the single-prompt mode with chunked map-reduce at a few chunk
+sizes, and prints per-chunk latency to help tune SUMMARY_CHUNK_TOKENS.
+Fails if a mode returns the wrong number of slides, if a chunk splits a
+page that would fit in it, drops text or splits a word, or if a chunk is
+not summarized. Chunking is also checked on an oversized page and on
+compressed text.
+
+    python benchmarks/bench_pdf_summary.py --pages 200 --chunk-tokens 1500 3000 6000
+"""
+import argparse
+import contextlib
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from pdf_to_ppt_converter import PDFToPPTConverterTool
+from stub_server import StubServer
+from text_compression import PAGE_MARKER, compress_pages
+
+PARAGRAPH = (
+    "The committee reviewed the annual budget, the hiring plan and the roadmap "
+    "for the next two quarters, and recorded the open risks for each program. "
+)
+
+
+def synthetic_pages(count):
+    return [f"[Page {number + 1}]\n" + PARAGRAPH * 20 for number in range(count)]
+
+
+def report_pages(count):
+    """Marked pages of distinct sentences under a running title, as compression sees a real report."""
+    subjects = ("budget", "hiring plan", "roadmap", "open risks", "vendor contracts", "audit findings")
+    return [
+        f"[Page {number}]\nAnnual Review\n" + "\n".join(
+            f"Item {number}.{item} of the {subjects[(number + item) % len(subjects)]} was reviewed, "
+            f"with {item * number % 97} actions recorded for quarter {item % 4 + 1}."
+            for item in range(40)
+        ) + f"\n{number}"
+        for number in range(1, count + 1)
+    ]
+
+
+def oversized_page(chunk_chars):
+    """One marked page several chunks long, with a paragraph longer than a chunk."""
+    paragraphs = [PARAGRAPH * (3 + number % 5) for number in range(chunk_chars // len(PARAGRAPH))]
+    paragraphs.insert(2, "long " * (chunk_chars // 2))
+    return "[Page 7]\n" + "\n\n".join(paragraphs)
+
+
+def summarize(converter, pages, mode, slide_count):
+    stats = {}
+    start = time.perf_counter()
+    slides = converter.generate_slides_summary(iter(pages), slide_count=slide_count, mode=mode, stats=stats)
+    elapsed = time.perf_counter() - start
+    assert len(slides) == slide_count, f"{mode}: {len(slides)} slides, expected {slide_count}"
+    return elapsed, stats.get("chunks", [])
+
+
+def check_chunks(converter, pages, chunk_tokens, timings=None):
+    """
+    The map step must see every page, in order: pages that fit in a chunk
+    stay whole, and a larger page is split between words, each of its
+    chunks starting with its "[Page N]" marker. Each chunk must be
+    summarized once, in order; reduce levels (if any) are recorded after
+    the map step's chunks.
+    """
+    chunk_chars = chunk_tokens * Config.CHARS_PER_TOKEN
+    chunks = list(converter.iter_chunks(iter(pages), chunk_tokens))
+    text, page = "", None
+    for chunk in chunks:
+        match = PAGE_MARKER.match(chunk)
+        assert match, f"chunk at {chunk_tokens} tokens without a page marker: {chunk[:40]!r}"
+        if match.group(1) == page:
+            assert text[-1].isspace(), f"word split at {chunk_tokens} tokens: {text[-20:]!r} | {chunk[:40]!r}"
+            chunk = chunk[match.end():]
+        text += chunk
+        page = re.findall(r"\[Page (\d+)\]\n", chunk)[-1] if "[Page " in chunk else page
+    assert text == "".join(pages), f"chunks at {chunk_tokens} tokens lose or reorder text"
+    assert all(len(chunk) <= chunk_chars for chunk in chunks), f"chunk over {chunk_chars} chars"
+    whole = [page for page in pages if len(page) <= chunk_chars]
+    assert all(any(page in chunk for chunk in chunks) for page in whole), f"a page was split at {chunk_tokens} tokens"
+    if timings is not None:
+        mapped = [(timing["chunk"], timing["chars"]) for timing in timings[:len(chunks)]]
+        expected = [(index, len(chunk)) for index, chunk in enumerate(chunks)]
+        assert mapped == expected, f"{len(expected)} chunks at {chunk_tokens} tokens, but summarized {mapped}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[1500, 3000, 6000])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fixed latency per LLM request (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.1, help="Extra latency per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Compares the summarization modes on the full text; the repeated
+    # paragraphs would otherwise be compressed away
+    Config.PDF_COMPRESS = False
+    pages = synthetic_pages(args.pages)
+    total_tokens = sum(len(page) for page in pages) // Config.CHARS_PER_TOKEN
+    converter = PDFToPPTConverterTool()
+    for chunk_tokens in args.chunk_tokens:
+        chunk_chars = chunk_tokens * Config.CHARS_PER_TOKEN
+        check_chunks(converter, pages[:3] + [oversized_page(chunk_chars)] + pages[3:6], chunk_tokens)
+        compressed = list(compress_pages(iter(report_pages(args.pages)), token_budget=4 * chunk_tokens))
+        assert sum(map(len, compressed)) > chunk_chars, "compressed text fits in one chunk"
+        check_chunks(converter, compressed, chunk_tokens)
+        check_chunks(converter, ["".join(compressed)], chunk_tokens)
+
+    with contextlib.redirect_stdout(sys.stderr), StubServer(args.latency, token_latency=args.token_latency) as server:
+        Config.OPENAI_BASE_URL = server.openai_base_url
+        report = sys.__stdout__
+        print(f"{args.pages} pages, ~{total_tokens} tokens, {args.slides} slides, "
+              f"concurrency {Config.SUMMARY_CONCURRENCY}", file=report)
+        print(f"{'mode':>22} {'time (s)':>9} {'chunks':>7} {'chunk p50 (s)':>14} {'chunk max (s)':>14}", file=report)
+
+        # Single mode sends the whole document, as the old code did
+        Config.PDF_MAX_PROMPT_CHARS = sum(len(page) for page in pages)
+        elapsed, _ = summarize(converter, pages, "single", args.slides)
+        print(f"{'single':>22} {elapsed:>9.2f} {'-':>7} {'-':>14} {'-':>14}", file=report)
+
+        for chunk_tokens in args.chunk_tokens:
+            Config.SUMMARY_CHUNK_TOKENS = chunk_tokens
+            elapsed, chunks = summarize(converter, pages, "map_reduce", args.slides)
+            check_chunks(converter, pages, chunk_tokens, chunks)
+            seconds = sorted(chunk["seconds"] for chunk in chunks)
+            label = f"map_reduce@{chunk_tokens}"
+            print(f"{label:>22} {elapsed:>9.2f} {len(chunks):>7} "
+                  f"{seconds[len(seconds) // 2]:>14.2f} {seconds[-1]:>14.2f}", file=report)
+        print("Slide counts, chunk boundaries and chunk coverage checked", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures end-to-end LangGraph pipeline latency for N subtopics against a
+local stub LLM/SerpAPI server, running the branches one at a time
+(max_concurrency=1) and then fanned out concurrently.
+
+    python benchmarks/bench_pipeline_fanout.py --subtopics 2 4 8
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from stub_server import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subtopics", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.3, help="Injected latency per request (seconds)")
+    parser.add_argument("--concurrency", type=int, default=Config.PIPELINE_MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    report = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix="bench_pipeline_fanout_") as scratch, \
+            StubServer(latency=args.latency) as server:
+        Config.OPENAI_BASE_URL = server.openai_base_url
+        Config.SERPAPI_URL = server.search_url
+        Config.ASSETS_PATH = tempfile.mkdtemp(prefix="bench_assets_", dir=scratch)
+        Config.OUTPUT_PATH = tempfile.mkdtemp(prefix="bench_output_", dir=scratch)
+
+        import image_fetcher
+        import image_store
+        import llm_cache
+        from register_tools import register_all_tools
+        register_all_tools()
+        import langgraph_pipeline
+        logging.getLogger().setLevel(logging.ERROR)
+
+        print(f"{'subtopics':>9} {'sequential (s)':>15} {'fan-out (s)':>12} {'one branch (s)':>15}", file=report)
+        for count in args.subtopics:
+            timings = []
+            for concurrency in (1, args.concurrency):
+                # Fresh caches so every run pays for its LLM calls and downloads
+                llm_cache.llm_cache.path = os.path.join(tempfile.mkdtemp(dir=scratch), "llm_cache.sqlite3")
+                llm_cache.llm_cache._conn = None
+                store = image_store.ImageStore(root=tempfile.mkdtemp(prefix="bench_images_", dir=scratch))
+                image_fetcher.image_store = image_store.image_store = store
+                subtopics = [f"Subtopic {i} {concurrency}" for i in range(count)]
+                start = time.perf_counter()
+                state = langgraph_pipeline.run_pipeline("Benchmark Deck", subtopics, max_concurrency=concurrency)
+                timings.append(time.perf_counter() - start)
+                assert state["ppt_path"], "pipeline produced no deck"
+            # One text call, then a search and a download for the images
+            print(f"{count:>9} {timings[0]:>15.2f} {timings[1]:>12.2f} {3 * args.latency:>15.2f}", file=report)
+
+
+if __name__ == "__main__":
+    main()
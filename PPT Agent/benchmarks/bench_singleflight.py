@@ -0,0 +1,101 @@
+"""
+Benchmarks single-flight coalescing under a burst of identical requests:
+many threads fetch images and generate slide text for a few distinct
+topics at once, against a local stub server. Prints the upstream
+requests and wall time with coalescing on and off.
+
+    python benchmarks/bench_singleflight.py --callers 64 --keys 4 --latency 0.3
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from stub_server import StubServer
+
+
+class Passthrough:
+    """Stands in for a SingleFlight group with coalescing off."""
+
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def burst(callers, fn, topics):
+    """Runs fn(topic) on `callers` threads released at the same moment."""
+    barrier = threading.Barrier(callers)
+    results = [None] * callers
+
+    def call(index):
+        barrier.wait()
+        results[index] = fn(topics[index % len(topics)])
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--keys", type=int, default=4, help="Distinct topics among the callers")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub server latency per request (seconds)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = sys.__stdout__
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix="bench_singleflight_") as scratch, StubServer(args.latency) as server:
+        Config.OPENAI_BASE_URL = server.openai_base_url
+        Config.SERPAPI_URL = server.search_url
+        Config.IMAGE_PROCESS_WORKERS = 0
+        # Stub responses must not land in the real LLM cache
+        Config.LLM_CACHE_PATH = os.path.join(scratch, "llm_cache.sqlite3")
+        import image_fetcher
+        import text_generation
+        from image_store import ImageStore
+        from llm_cache import llm_cache
+        from metrics import metrics
+        from singleflight import image_flight, llm_flight
+
+        llm_cache.path = Config.LLM_CACHE_PATH
+
+        images = image_fetcher.ImageFetcherTool()
+        text = text_generation.OpenAITextGenerationTool()
+        topics = [f"Popular topic {number}" for number in range(args.keys)]
+        print(f"{args.callers} concurrent callers, {args.keys} distinct topics, "
+              f"{args.latency}s upstream latency", file=report)
+        print(f"{'tool':>16} {'coalescing':>10} {'upstream':>9} {'time (s)':>9} {'failed':>7}", file=report)
+
+        for coalescing in (False, True):
+            image_fetcher.image_flight = image_flight if coalescing else Passthrough()
+            text_generation.llm_flight = llm_flight if coalescing else Passthrough()
+            cases = (
+                ("image_fetcher", images.run),
+                ("text_generation", lambda topic: text.run(topic, bypass_cache=True)),
+            )
+            for name, fn in cases:
+                # Every run starts with an empty image store
+                image_fetcher.image_store = ImageStore(root=tempfile.mkdtemp(dir=scratch))
+                server.request_count = 0
+                results, elapsed = burst(args.callers, fn, topics)
+                failed = sum(1 for result in results if not result or "error" in result)
+                print(f"{name:>16} {'on' if coalescing else 'off':>10} {server.request_count:>9} "
+                      f"{elapsed:>9.2f} {failed:>7}", file=report)
+
+        print("", file=report)
+        print("\n".join(line for line in metrics.prometheus().splitlines() if "singleflight" in line), file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmarks deck rendering with python-pptx against the XML renderer
+(Config.SLIDE_RENDERER = "xml"), offline: slides per second to build and
+save decks of content slides with text and images, and a check that both
+renderers produce the same slides when read back with python-pptx.
+
+    python benchmarks/bench_slide_render.py --slides 10 100 1000 --images 20
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+RENDERERS = ("pptx", "xml")
+
+
+def make_images(count, directory):
+    """`count` distinct slide-sized JPEGs, alternating landscape and portrait."""
+    from PIL import Image
+
+    paths = []
+    for number in range(count):
+        size = (600, 450) if number % 2 else (450, 600)
+        path = os.path.join(directory, f"image_{number}.jpg")
+        Image.radial_gradient("L").resize(size).convert("RGB").rotate(number * 7).save(path, "JPEG", quality=85)
+        paths.append(path)
+    return paths
+
+
+def build_deck(slides, images):
+    """Builds and saves a deck the way PPTGeneratorTool does; returns the saved bytes."""
+    from ppt_generator import PPTGeneratorTool, save_presentation
+    from template_cache import template_cache
+
+    tool = PPTGeneratorTool()
+    prs = template_cache.get().new_presentation()
+    tool.add_title_slide(prs, "Benchmark deck", images[0])
+    for number in range(1, slides):
+        entry = {
+            "title": f"Slide {number}: results & findings",
+            "content": "\n".join(f"Point {point} of slide {number}, with <markup> characters" for point in range(5)),
+        }
+        tool.add_content_slide(prs, f"Subtopic {number}", entry, images[number % len(images)])
+    output = io.BytesIO()
+    save_presentation(prs, output)
+    return output.getvalue()
+
+
+def describe(deck):
+    """What python-pptx reads back from a deck: every shape's kind, position, text and image."""
+    from pptx import Presentation
+
+    shapes = []
+    for slide in Presentation(io.BytesIO(deck)).slides:
+        shapes.append((slide.slide_layout.name,))
+        for shape in slide.shapes:
+            image = hashlib.sha1(shape.image.blob).hexdigest() if hasattr(shape, "image") else None
+            text = shape.text_frame.text if shape.has_text_frame else None
+            shapes.append((shape.shape_id, shape.name, shape.shape_type, shape.left, shape.top,
+                           shape.width, shape.height, text, image))
+    return shapes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--images", type=int, default=20, help="Distinct images, cycled over the slides")
+    parser.add_argument("--background", default=Config.BACKGROUND_MODE, choices=("image", "solid", "gradient", "none"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    Config.BACKGROUND_MODE = args.background
+    report = sys.__stdout__
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory() as directory:
+        images = make_images(args.images, directory)
+        print(f"{args.images} distinct images, background {args.background}", file=report)
+        print(f"{'slides':>7} {'renderer':>9} {'slides/s':>9} {'time (ms)':>10} {'size (KB)':>10} {'speedup':>8} "
+              f"{'equivalent':>10}", file=report)
+        for slides in args.slides:
+            decks, times = {}, {}
+            for renderer in RENDERERS:
+                Config.SLIDE_RENDERER = renderer
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    decks[renderer] = build_deck(slides, images)
+                    best = min(best, time.perf_counter() - start)
+                times[renderer] = best
+            equivalent = describe(decks["pptx"]) == describe(decks["xml"])
+            for renderer in RENDERERS:
+                speedup = times["pptx"] / times[renderer]
+                print(f"{slides:>7} {renderer:>9} {slides / times[renderer]:>9.0f} {times[renderer] * 1000:>10.1f} "
+                      f"{len(decks[renderer]) / 1024:>10.0f} {speedup:>7.1f}x "
+                      f"{'yes' if equivalent else 'NO':>10}", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Measures time-to-first-slide through the API against a local stub
+LLM/SerpAPI server that emits tokens at a fixed rate: the blocking
+endpoints (the slide text request followed by /generate_ppt/, and
+/upload_pdf/) against their /stream/ variants. For a blocking request the
+first slide is only visible once the whole deck has been returned.
+
+    python benchmarks/bench_streaming.py --subtopics 2 4 8 --pdf-slides 10
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from stub_server import StubServer
+from bench_pdf_ingestion_memory import make_pdf
+
+
+@contextlib.contextmanager
+def serve(app):
+    """Runs the app under uvicorn on a free port; the test client would buffer whole responses."""
+    import httpx
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def read_stream(response, start):
+    """Returns (first slide_text, first slide_rendered, total) seconds for an NDJSON stream."""
+    first_text = first_render = None
+    for line in response.iter_lines():
+        event = json.loads(line)
+        if event["event"] == "slide_text" and first_text is None:
+            first_text = time.perf_counter() - start
+        elif event["event"] == "slide_rendered" and event["slide"] and first_render is None:
+            first_render = time.perf_counter() - start
+        elif event["event"] == "error":
+            raise RuntimeError(event["detail"])
+        elif event["event"] == "done":
+            assert event["download_url"], "stream finished without a download_url"
+    return first_text, first_render, time.perf_counter() - start
+
+
+def run_requests(client, args, report, scratch):
+    print(f"{'request':>24} {'first slide (s)':>16} {'first render (s)':>17} {'total (s)':>10}", file=report)
+    for count in args.subtopics:
+        subtopics = [f"Blocking subtopic {i} of {count}" for i in range(count)]
+        start = time.perf_counter()
+        text = client.post("/generate_text_batch/", json={"topics": subtopics}).json()["data"]
+        response = client.post("/generate_ppt/", json={
+            "main_topic": "Benchmark Deck", "subtopics": subtopics, "generated_text": text,
+        })
+        assert response.status_code == 200, response.text
+        total = time.perf_counter() - start
+        print(f"{f'{count} subtopics blocking':>24} {total:>16.2f} {total:>17.2f} {total:>10.2f}", file=report)
+
+        subtopics = [f"Streamed subtopic {i} of {count}" for i in range(count)]
+        start = time.perf_counter()
+        with client.stream("POST", "/stream/generate_ppt/", json={
+            "main_topic": "Benchmark Deck", "subtopics": subtopics,
+        }) as response:
+            first_text, first_render, total = read_stream(response, start)
+        print(f"{f'{count} subtopics streamed':>24} {first_text:>16.2f} {first_render:>17.2f} {total:>10.2f}",
+              file=report)
+
+    pdf_path = os.path.join(scratch, "bench.pdf")
+    make_pdf(pdf_path, args.pdf_pages)
+    params = {"slide_count": args.pdf_slides, "bypass_cache": True}
+    label = f"{args.pdf_slides}-slide PDF"
+    start = time.perf_counter()
+    with open(pdf_path, "rb") as f:
+        response = client.post("/upload_pdf/", params=params, files={"file": ("bench.pdf", f)})
+    assert response.status_code == 200, response.text
+    total = time.perf_counter() - start
+    print(f"{label + ' blocking':>24} {total:>16.2f} {total:>17.2f} {total:>10.2f}", file=report)
+
+    start = time.perf_counter()
+    with open(pdf_path, "rb") as f, client.stream("POST", "/stream/upload_pdf/", params=params,
+                                                  files={"file": ("bench.pdf", f)}) as response:
+        first_text, first_render, total = read_stream(response, start)
+    print(f"{label + ' streamed':>24} {first_text:>16.2f} {first_render:>17.2f} {total:>10.2f}", file=report)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subtopics", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--pdf-slides", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latency before the first token (seconds)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds per generated token")
+    args = parser.parse_args()
+
+    report = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr), \
+            tempfile.TemporaryDirectory(prefix="bench_streaming_") as scratch, \
+            StubServer(latency=args.latency, generation_delay=args.token_delay) as server:
+        Config.OPENAI_BASE_URL = server.openai_base_url
+        Config.SERPAPI_URL = server.search_url
+        Config.ASSETS_PATH = os.path.join(scratch, "assets")
+        Config.OUTPUT_PATH = os.path.join(scratch, "output")
+        Config.UPLOAD_PATH = os.path.join(scratch, "uploads")
+        Config.LLM_CACHE_PATH = os.path.join(scratch, "llm_cache.sqlite3")
+        Config.IMAGE_STORE_PATH = os.path.join(scratch, "images")
+        Config.CHECKPOINT_PATH = os.path.join(scratch, "checkpoints")
+
+        import llm_cache
+        import image_fetcher
+        from image_store import ImageStore
+        llm_cache.llm_cache.path = Config.LLM_CACHE_PATH
+        image_fetcher.image_store = ImageStore(root=Config.IMAGE_STORE_PATH)
+        import api
+        logging.getLogger().setLevel(logging.ERROR)
+        with serve(api.app) as client:
+            run_requests(client, args, report, scratch)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares per-deck construction time when every deck is loaded with
+Presentation() and built from hand-positioned textboxes (the old approach)
+against copying the cached, pre-parsed template and filling placeholders.
+Decks are saved to memory, and images and backgrounds are left out so only
+deck construction is measured.
+
+    python benchmarks/bench_templates.py --slides 1 10 30 --template path/to/brand.pptx
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pptx import Presentation
+from pptx.util import Inches
+from config import Config
+from template_cache import template_cache
+
+
+def legacy_deck(template_path, slide_count):
+    """The deck construction code as it was before the template cache."""
+    prs = Presentation(template_path)
+    title_slide = prs.slides.add_slide(prs.slide_layouts[6])
+    title_box = title_slide.shapes.add_textbox(Inches(1), Inches(1), Inches(8), Inches(1.5))
+    title_box.text_frame.text = "Benchmark Deck"
+    for i in range(slide_count - 1):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(1))
+        title_box.text_frame.text = f"Slide {i}"
+        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(4.5), Inches(4))
+        content_box.text_frame.text = "Benchmark content."
+    prs.save(io.BytesIO())
+
+
+def cached_deck(template_path, slide_count):
+    template = template_cache.get(template_path)
+    prs = template.new_presentation()
+    template.add_slide(prs, "title", "Benchmark Deck")
+    for i in range(slide_count - 1):
+        template.add_slide(prs, "content", f"Slide {i}", "Benchmark content.")
+    prs.save(io.BytesIO())
+
+
+def median_ms(build, template_path, slide_count, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(template_path, slide_count)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--template", default=Config.TEMPLATE_PATH,
+                        help="Template .pptx (the python-pptx default is used if it does not exist)")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    template_path = args.template if os.path.exists(args.template) else None
+    start = time.perf_counter()
+    template_cache.get(args.template)
+    print(f"Template: {template_path or 'python-pptx default'}, parsed once in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms; median of {args.repeat} decks")
+    print(f"{'slides':>6} {'Presentation() (ms)':>20} {'cached template (ms)':>21} {'speedup':>8}")
+    for slide_count in args.slides:
+        legacy = median_ms(legacy_deck, template_path, slide_count, args.repeat)
+        cached = median_ms(cached_deck, args.template, slide_count, args.repeat)
+        print(f"{slide_count:>6} {legacy:>20.1f} {cached:>21.1f} {legacy / cached:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares per-topic text generation with batched generation against a local
+stub chat-completions server, counting LLM requests and prompt tokens per
+deck.
+
+    python benchmarks/bench_text_batch.py --topics 4 8 16
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from stub_server import StubServer
+
+
+def measure(server, generate):
+    requests_before, tokens_before = server.request_count, server.prompt_tokens
+    start = time.perf_counter()
+    generate()
+    return time.perf_counter() - start, server.request_count - requests_before, server.prompt_tokens - tokens_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.3, help="Injected latency per request (seconds)")
+    args = parser.parse_args()
+
+    report = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix="bench_text_batch_") as scratch, \
+            StubServer(latency=args.latency) as server:
+        Config.OPENAI_BASE_URL = server.openai_base_url
+        Config.LLM_CACHE_PATH = os.path.join(scratch, "llm_cache.sqlite3")
+        from llm_cache import llm_cache
+        from text_generation import OpenAITextGenerationTool
+        llm_cache.path = Config.LLM_CACHE_PATH
+        logging.getLogger().setLevel(logging.WARNING)
+        tool = OpenAITextGenerationTool()
+
+        print(f"{'topics':>6} {'mode':>10} {'time (s)':>9} {'requests':>9} {'prompt tokens':>14}", file=report)
+        for count in args.topics:
+            for mode in ("per-topic", "batch"):
+                topics = [f"{mode} topic {i} of {count}" for i in range(count)]
+                if mode == "per-topic":
+                    elapsed, requests, tokens = measure(server, lambda: [tool.run(t, bypass_cache=True) for t in topics])
+                else:
+                    elapsed, requests, tokens = measure(server, lambda: tool.run_batch(topics, bypass_cache=True))
+                print(f"{count:>6} {mode:>10} {elapsed:>9.2f} {requests:>9} {tokens:>14}", file=report)
+
+
+if __name__ == "__main__":
+    main()
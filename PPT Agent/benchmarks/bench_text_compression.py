@@ -0,0 +1,100 @@
+"""
+Benchmarks the compression of extracted PDF text before summarization,
+offline: pages per second and prompt tokens before and after, on
+synthetic papers with running headers, page-number footers, hyphenated
+line wraps and a reference list.
+
+    python benchmarks/bench_text_compression.py --pages 10 100 1000 --budget 12000
+    python benchmarks/bench_text_compression.py --pdf paper.pdf
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import textwrap
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from text_compression import compress_pages
+
+VOCABULARY = (
+    "model data training results method network layer performance accuracy loss baseline dataset "
+    "evaluation experiment parameter gradient optimization architecture attention feature signal "
+    "sample distribution error benchmark latency memory throughput inference encoder decoder token "
+    "sequence representation learning transfer robustness generalization variance estimate policy"
+).split()
+FILLER = "the of and to in a is that for with as on by this we are from".split()
+
+
+def synthetic_pages(count, seed=0):
+    """Page texts laid out like a paper extracted line by line."""
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+    pages = []
+    for number in range(1, count + 1):
+        sentences = []
+        for _ in range(30):
+            words = [str(word) for word in rng.choice(VOCABULARY, size=rng.integers(8, 20), p=weights)]
+            for position in rng.integers(0, len(words), size=len(words) // 2):
+                words.insert(position, str(rng.choice(FILLER)))
+            sentences.append(" ".join(words).capitalize() + ".")
+        body = textwrap.wrap(" ".join(sentences), 80, break_on_hyphens=False)
+        # Breaks some words across lines, as justified PDF text does
+        body = [f"{line[:-3]}-\n{line[-3:]}" if index % 4 == 0 and line[-4:].isalpha() else line
+                for index, line in enumerate(body)]
+        lines = ["Proceedings of the Workshop on Examples 2024", "A. Author and B. Author", "", *body,
+                 "", f"Page {number} of {count}"]
+        if number == count:
+            lines += ["References", *(f"[{i}] Author, Title of paper {i}. Venue, 2020." for i in range(40))]
+        pages.append(f"[Page {number}]\n" + "\n".join(lines))
+    return pages
+
+
+def pdf_pages(pdf_path):
+    from pdf_to_ppt_converter import PDFToPPTConverterTool
+
+    converter = PDFToPPTConverterTool()
+    return [f"[Page {number}]\n{text}" for number, text in enumerate(converter.extract_text(pdf_path), start=1)]
+
+
+def run(label, pages, budget, report, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        stats = {}
+        start = time.perf_counter()
+        text = "".join(compress_pages(iter(pages), token_budget=budget, stats=stats))
+        best = min(best, time.perf_counter() - start)
+    compression = stats["compression"]
+    assert "Proceedings of the Workshop" not in text and "Title of paper" not in text or label == "pdf"
+    reduction = 1 - compression["output_tokens"] / max(1, compression["input_tokens"])
+    print(f"{label:>8} {len(pages) / best:>10.0f} {best * 1000:>9.1f} {compression['input_tokens']:>10} "
+          f"{compression['output_tokens']:>10} {reduction:>9.1%}", file=report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--budget", type=int, default=Config.PDF_TOKEN_BUDGET, help="Token budget")
+    parser.add_argument("--pdf", help="Also compress the text of this PDF")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = sys.__stdout__
+    with contextlib.redirect_stdout(sys.stderr):
+        print(f"token budget {args.budget}", file=report)
+        print(f"{'pages':>8} {'pages/s':>10} {'time (ms)':>9} {'tokens in':>10} {'tokens out':>10} "
+              f"{'reduction':>9}", file=report)
+        for count in args.pages:
+            run(str(count), synthetic_pages(count), args.budget, report, args.repeat)
+        if args.pdf:
+            run("pdf", pdf_pages(args.pdf), args.budget, report, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Local stand-ins for the external services used by the tools, so benchmarks
+can run offline with a controlled latency, error rate and payload size.
+"""
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+from PIL import Image
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under a burst of parallel clients
+    request_queue_size = 256
+
+
+def make_png(size=(64, 64), color=(70, 130, 180)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def latency_distribution(spec, seed=0):
+    """
+    Returns a function sampling a delay in seconds from `spec`: a number
+    (always that delay), "fixed:SECONDS", "uniform:LOW,HIGH",
+    "exponential:MEAN" or "lognormal:MEDIAN,SIGMA". Samples repeat for a
+    given seed.
+    """
+    if isinstance(spec, (int, float)):
+        return lambda: spec
+    kind, _, values = str(spec).partition(":")
+    if not values:
+        return latency_distribution(float(kind))
+    params = [float(value) for value in values.split(",")]
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    samplers = {
+        "fixed": lambda: params[0],
+        "uniform": lambda: rng.uniform(params[0], params[1]),
+        "exponential": lambda: rng.expovariate(1 / params[0]) if params[0] else 0.0,
+        "lognormal": lambda: params[0] * rng.lognormvariate(0, params[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution {spec!r}")
+
+    def sample():
+        with lock:
+            return samplers[kind]()
+
+    return sample
+
+
+def stub_words(count):
+    return " ".join(f"word{i % 50}" for i in range(count))
+
+
+def fake_completion(prompt, content_words=None):
+    """
+    Answers like the model would: a JSON object of slide arrays for a
+    batch of topics, a slide array when slides are requested, and bullet
+    points otherwise. `content_words` pads every slide content and bullet
+    point to that many words.
+    """
+    batch = re.search(r"^Topics: (\[.*\])$", prompt, re.MULTILINE)
+    match = re.search(r"exactly\W+(\d+|three) slides", prompt)
+    padding = f" {stub_words(content_words)}" if content_words else ""
+    # Distinct prompts get distinct answers, like real topics would
+    tag = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+    if batch:
+        content = json.dumps({
+            topic: [
+                {"title": f"{topic} {i + 1}", "content": f"Stub slide content.{padding}",
+                 "image_query": f"{topic} image {i + 1}"}
+                for i in range(3)
+            ]
+            for topic in json.loads(batch.group(1))
+        })
+    elif match:
+        count = 3 if match.group(1) == "three" else int(match.group(1))
+        slides = [
+            {"title": f"Slide {i + 1}", "content": f"Stub summary content.{padding}",
+             "image_query": f"stub image {tag} {i + 1}"}
+            for i in range(count)
+        ]
+        content = json.dumps(slides)
+    else:
+        content = "\n".join(f"- Stub key point {i + 1} ({tag}){padding}" for i in range(8))
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class StubServer:
+    """
+    Serves a SerpAPI-compatible `/search` endpoint, an `/img/<name>` image
+    host and an OpenAI-compatible `/v1/chat/completions` endpoint, sleeping
+    `latency` seconds before every response (a number, or a distribution
+    spec for `latency_distribution`). Chat completions additionally
+    sleep `token_latency` seconds per 1000 prompt tokens, so large prompts
+    are slower like they are upstream, and `generation_delay` seconds per
+    completion token. Requests with `"stream": true` are answered with
+    Server-Sent Events carrying one token (about 4 characters) each.
+
+    Searches return `image_results` candidates, each with an original and
+    a (always healthy) thumbnail URL. `image_faults` maps a fault to the
+    share of originals that have it: "slow" (answers after `slow_latency`
+    seconds), "html", "truncated", "tiny" or "missing" (404). Faults are
+    assigned by a hash of the URL, so runs are repeatable.
+
+    `error_rates` maps an endpoint ("search", "img", "thumb",
+    "v1/chat/completions") to the share of its requests answered with
+    `error_status` instead; `content_words` pads completions (see
+    `fake_completion`).
+
+    Requests are counted in `request_count`, and per endpoint in
+    `endpoint_counts`; injected errors in `error_counts`.
+    """
+
+    FAULTS = ("slow", "html", "truncated", "tiny", "missing")
+
+    def __init__(self, latency=0.1, image_bytes=None, token_latency=0.0, generation_delay=0.0,
+                 image_results=1, image_faults=None, slow_latency=5.0, error_rates=None, error_status=503,
+                 content_words=None, seed=0):
+        self.latency = latency
+        self.delay = latency_distribution(latency, seed)
+        self.error_rates = error_rates or {}
+        self.error_status = error_status
+        self.content_words = content_words
+        self.error_counts = Counter()
+        self._rng = random.Random(seed)
+        self.token_latency = token_latency
+        self.generation_delay = generation_delay
+        self.image_bytes = image_bytes or make_png()
+        self.thumbnail_bytes = make_png((32, 32))
+        self.image_results = image_results
+        self.image_faults = image_faults or {}
+        self.slow_latency = slow_latency
+        self.request_count = 0
+        self.endpoint_counts = Counter()
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+        self._httpd = _Server(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self):
+        return f"{self.base_url}/search"
+
+    @property
+    def openai_base_url(self):
+        return f"{self.base_url}/v1"
+
+    def inject_error(self, endpoint):
+        """Whether this request to `endpoint` should fail, per `error_rates`."""
+        rate = self.error_rates.get(endpoint, 0.0)
+        with self._lock:
+            failed = rate > 0 and self._rng.random() < rate
+            if failed:
+                self.error_counts[endpoint] += 1
+        return failed
+
+    def image_fault(self, path):
+        """The fault (or None) of the original image served at `path`."""
+        position = int(hashlib.sha1(path.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        for fault in self.FAULTS:
+            position -= self.image_faults.get(fault, 0.0)
+            if position < 0:
+                return fault
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.split("/")[1]
+                with server._lock:
+                    server.request_count += 1
+                    server.endpoint_counts[endpoint] += 1
+                time.sleep(server.delay())
+                if server.inject_error(endpoint):
+                    self._send(server.error_status, b'{"error": "injected"}', "application/json")
+                elif url.path == "/search":
+                    query = quote(parse_qs(url.query).get("q", [""])[0])
+                    body = json.dumps({"images_results": [
+                        {"original": f"{server.base_url}/img/{query}-{rank}.png",
+                         "thumbnail": f"{server.base_url}/thumb/{query}-{rank}.png"}
+                        for rank in range(server.image_results)
+                    ]}).encode()
+                    self._send(200, body, "application/json")
+                elif url.path.startswith("/img/"):
+                    self._send_image(server.image_fault(url.path))
+                elif url.path.startswith("/thumb/"):
+                    self._send(200, server.thumbnail_bytes, "image/png")
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def _send_image(self, fault):
+                if fault == "slow":
+                    time.sleep(server.slow_latency)
+                if fault == "html":
+                    self._send(200, b"<html><body>Access denied</body></html>", "text/html")
+                elif fault == "truncated":
+                    self._send(200, server.image_bytes[:len(server.image_bytes) // 2], "image/png")
+                elif fault == "tiny":
+                    self._send(200, make_png((8, 8)), "image/png")
+                elif fault == "missing":
+                    self._send(404, b"not found", "text/plain")
+                else:
+                    self._send(200, server.image_bytes, "image/png")
+
+            def do_POST(self):
+                endpoint = urlparse(self.path).path.strip("/")
+                with server._lock:
+                    server.request_count += 1
+                    server.endpoint_counts[endpoint] += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if urlparse(self.path).path != "/v1/chat/completions":
+                    self._send(404, b"not found", "text/plain")
+                    return
+                prompt = body["messages"][-1]["content"]
+                with server._lock:
+                    server.prompt_tokens += len(prompt) // 4
+                time.sleep(server.delay() + server.token_latency * len(prompt) / 4000)
+                if server.inject_error(endpoint):
+                    self._send(server.error_status, b'{"error": {"message": "injected"}}', "application/json")
+                    return
+                completion = fake_completion(prompt, server.content_words)
+                if body.get("stream"):
+                    self._stream(completion, (body.get("stream_options") or {}).get("include_usage"))
+                    return
+                time.sleep(server.generation_delay * completion["usage"]["completion_tokens"])
+                self._send(200, json.dumps(completion).encode(), "application/json")
+
+            def _stream(self, completion, include_usage=False):
+                # HTTP/1.0 without Content-Length: the body ends when the connection closes
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                content = completion["choices"][0]["message"]["content"]
+                for start in range(0, len(content), 4):
+                    time.sleep(server.generation_delay)
+                    chunk = {
+                        "id": completion["id"],
+                        "object": "chat.completion.chunk",
+                        "model": completion["model"],
+                        "choices": [{"index": 0, "delta": {"content": content[start:start + 4]}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                final = {
+                    "id": completion["id"],
+                    "object": "chat.completion.chunk",
+                    "model": completion["model"],
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+                if include_usage:
+                    usage = {"id": completion["id"], "object": "chat.completion.chunk", "model": completion["model"],
+                             "choices": [], "usage": completion["usage"]}
+                    self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from config import Config
+from image_store import atomic_write
+
+logging.basicConfig(level=logging.INFO)
+
+
+class Checkpoint:
+    """
+    Outputs of the completed stages of one job, saved as a JSON file after
+    every change. A retried job finds them under the same key and resumes
+    after its last completed stage; the file is removed once the job
+    succeeds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stages = self._load()
+        if self._stages:
+            logging.info(f"♻️ Resuming from checkpoint with stages: {', '.join(self._stages)}")
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Ignoring unreadable checkpoint {self.path}: {e}")
+            return {}
+
+    def get(self, stage, default=None):
+        with self._lock:
+            return self._stages.get(stage, default)
+
+    def save(self, stage, value):
+        """Records the output of a completed stage."""
+        with self._lock:
+            self._stages[stage] = value
+            self._write()
+
+    def update(self, stage, key, value):
+        """Records one finished part of a stage, e.g. one chunk summary."""
+        with self._lock:
+            self._stages.setdefault(stage, {})[key] = value
+            self._write()
+
+    def clear(self):
+        with self._lock:
+            self._stages = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _write(self):
+        atomic_write(self.path, json.dumps(self._stages).encode())
+
+
+class CheckpointStore:
+    """
+    Checkpoints on disk, keyed by a hash of the job's inputs (e.g. the PDF
+    content hash and slide count), so a retry of the same job finds them.
+    Callers working on the same key at once share one Checkpoint.
+    Checkpoints left behind by jobs that were never retried expire after
+    `ttl` seconds.
+    """
+
+    PRUNE_INTERVAL = 600
+
+    def __init__(self, root=None, ttl=None):
+        self.root = root
+        self.ttl = ttl
+        self._open = weakref.WeakValueDictionary()
+        self._pruned_at = 0
+        self._lock = threading.Lock()
+
+    def open(self, *parts):
+        root = self.root or Config.CHECKPOINT_PATH
+        key = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+        path = os.path.join(root, f"{key}.json")
+        with self._lock:
+            os.makedirs(root, exist_ok=True)
+            if time.time() - self._pruned_at > self.PRUNE_INTERVAL:
+                self._prune(root)
+            checkpoint = self._open.get(path)
+            if checkpoint is None:
+                checkpoint = self._open[path] = Checkpoint(path)
+            return checkpoint
+
+    def _prune(self, root):
+        self._pruned_at = time.time()
+        cutoff = self._pruned_at - (self.ttl or Config.CHECKPOINT_TTL)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+checkpoint_store = CheckpointStore()
@@ -1,15 +1,190 @@
 import os
+from dotenv import load_dotenv
+
+# Settings below can be overridden from the environment or a .env file
+load_dotenv()
 
 class Config:
     
-    SERP_API_KEY = "key"
+    SERP_API_KEY = os.getenv("SERP_API_KEY", "key")
     
-    OPENAI_API_KEY= "key"
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "key")
+
+    SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    LLM_TIMEOUT = 60
 
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     OUTPUT_PATH = os.path.join(BASE_DIR, "output")
     ASSETS_PATH = os.path.join(BASE_DIR, "assets")
     TEMPLATE_PATH = os.path.join(BASE_DIR, "templates/basic_template.pptx")
+    # Layouts (by name) used for title and content slides; when the template
+    # has no layout of that name, one is picked by its placeholders
+    TEMPLATE_LAYOUTS = {"title": "Title Slide", "content": "Two Content"}
+
+    # Tools the API builds in the background at startup (True for all, or a
+    # list of names); others are built on their first request
+    TOOL_WARMUP = False
+
+    # Image prefetching: worker pool size and per-request timeout (seconds)
+    IMAGE_PREFETCH_WORKERS = 16
+    IMAGE_FETCH_TIMEOUT = 10
+
+    # Image downloads race the top IMAGE_CANDIDATES search results: another
+    # candidate starts every IMAGE_HEDGE_DELAY seconds (or as soon as one is
+    # rejected) and the first valid image wins. Past IMAGE_DOWNLOAD_DEADLINE
+    # seconds the thumbnails are raced instead, for up to
+    # IMAGE_THUMBNAIL_DEADLINE (0 disables the fallback). Valid images are
+    # image/*, at most IMAGE_MAX_BYTES, with both sides >= IMAGE_MIN_SIDE px.
+    IMAGE_CANDIDATES = 3
+    IMAGE_HEDGE_DELAY = 0.5
+    IMAGE_DOWNLOAD_DEADLINE = 4
+    IMAGE_THUMBNAIL_DEADLINE = 2
+    IMAGE_MAX_BYTES = 15 * 1024 * 1024
+    IMAGE_MIN_SIDE = 64
+    IMAGE_DOWNLOAD_WORKERS = 64
+
+    # Background jobs: concurrent workers, extra jobs allowed to wait, how
+    # long (seconds) finished results stay downloadable and how often
+    # (seconds) expired results are removed from disk
+    JOB_MAX_WORKERS = 4
+    JOB_MAX_QUEUED = 32
+    JOB_RESULT_TTL = 3600
+    JOB_PRUNE_INTERVAL = 60
+
+    # PDF ingestion: uploads are copied to UPLOAD_PATH in chunks and capped
+    # in size; without compression (PDF_COMPRESS below), at most
+    # PDF_MAX_PROMPT_CHARS of extracted text is read into a single prompt,
+    # and MuPDF's object cache is emptied every PDF_STORE_SHRINK_PAGES pages
+    UPLOAD_PATH = os.path.join(BASE_DIR, "uploads")
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+    PDF_MAX_PROMPT_CHARS = 48000
+    PDF_STORE_SHRINK_PAGES = 25
+
+    # PDF text extraction: documents over PDF_EXTRACT_SHARD_PAGES pages are
+    # split into page ranges read by PDF_EXTRACT_WORKERS processes. Pages
+    # with under PDF_SCANNED_MAX_CHARS characters of text and images over
+    # PDF_SCANNED_MIN_IMAGE_COVERAGE of their area count as scanned and go
+    # to PDF_OCR_BACKEND ("auto", "docling", "tesseract" or "none")
+    PDF_EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+    PDF_EXTRACT_SHARD_PAGES = 16
+    PDF_SCANNED_MAX_CHARS = 50
+    PDF_SCANNED_MIN_IMAGE_COVERAGE = 0.5
+    PDF_OCR_BACKEND = "auto"
+    PDF_OCR_LANGUAGE = "eng"
+    PDF_OCR_DPI = 300
+
+    # PDF summarization: number of slides per converted deck, and the
+    # map-reduce settings ("single", "map_reduce" or "auto") used for long
+    # documents. Token counts are estimated as characters / CHARS_PER_TOKEN.
+    SLIDE_COUNT = 3
+    MAX_SLIDE_COUNT = 20
+    SUMMARY_MODE = "auto"
+    SUMMARY_CHUNK_TOKENS = 3000
+    SUMMARY_CONCURRENCY = 4
+    SUMMARY_PARTIAL_MAX_TOKENS = 250
+    CHARS_PER_TOKEN = 4
+
+    # Extracted PDF text is compressed before summarization: headers and
+    # footers repeated on PDF_BOILERPLATE_MIN_SHARE of the pages (within
+    # PDF_BOILERPLATE_MARGIN_LINES of the page edge), page numbers and a
+    # trailing reference list are dropped, and if the text is still over
+    # PDF_TOKEN_BUDGET tokens only its most central sentences are kept. At
+    # most PDF_COMPRESS_MAX_CHARS of text is read from a document.
+    PDF_COMPRESS = True
+    PDF_TOKEN_BUDGET = 12000
+    PDF_BOILERPLATE_MIN_SHARE = 0.5
+    PDF_BOILERPLATE_MARGIN_LINES = 3
+    PDF_COMPRESS_MAX_CHARS = 4 * 1024 * 1024
+
+    # LLM response cache: SQLite file, entry lifetime (seconds) and the size
+    # budget past which least recently used entries are evicted
+    LLM_CACHE_PATH = os.path.join(BASE_DIR, "cache", "llm_cache.sqlite3")
+    LLM_CACHE_TTL = 7 * 24 * 3600
+    LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+    # Fetched images live in their own content-addressed store, apart from
+    # the static assets, with an LRU disk budget
+    IMAGE_STORE_PATH = os.path.join(BASE_DIR, "cache", "images")
+    IMAGE_STORE_MAX_BYTES = 500 * 1024 * 1024
+
+    # Stage outputs of unfinished PDF conversions (chunk summaries, slide
+    # JSON, resolved images), kept so a retry resumes where it failed
+    CHECKPOINT_PATH = os.path.join(BASE_DIR, "cache", "checkpoints")
+    CHECKPOINT_TTL = 24 * 3600
+
+    # Slide backgrounds: "image" renders BACKGROUND_IMAGE (in ASSETS_PATH)
+    # once per process at BACKGROUND_DPI; "solid", "gradient" and "none" use
+    # a lightweight fill instead
+    BACKGROUND_MODE = "image"
+    BACKGROUND_IMAGE = "light_blue_gradient.png"
+    BACKGROUND_DPI = 96
+    BACKGROUND_JPEG_QUALITY = 85
+    BACKGROUND_COLOR = "DCEBF7"
+    BACKGROUND_GRADIENT = ("EAF3FB", "A9CBEA")
+    BACKGROUND_GRADIENT_ANGLE = 45
+
+    # Fetched images are downscaled to fit the largest slide image box
+    # (width, height in inches) at IMAGE_DPI and re-encodes as IMAGE_FORMAT
+    # ("JPEG" or "PNG") in a pool of IMAGE_PROCESS_WORKERS processes (0 runs
+    # it inline, e.g. in processes that are already workers)
+    IMAGE_BOXES = ((4, 4), (5, 2.5))
+    IMAGE_DPI = 150
+    IMAGE_FORMAT = "JPEG"
+    IMAGE_JPEG_QUALITY = 85
+    IMAGE_PROCESS_WORKERS = min(4, os.cpu_count() or 1)
+
+    # PDF conversion reuses figures embedded in the PDF; images under
+    # PDF_IMAGE_MIN_AREA pixels are skipped, and PDF_IMAGES_OFFLINE turns off
+    # the web search fallback for slides without a figure
+    PDF_EXTRACT_IMAGES = True
+    PDF_IMAGE_MIN_AREA = 150 * 150
+    PDF_IMAGES_OFFLINE = False
+
+    # Shared HTTP client: timeouts (seconds), retries with exponential
+    # backoff on 429/5xx, pool sizes and the concurrent request cap per host
+    HTTP_CONNECT_TIMEOUT = 5
+    HTTP_READ_TIMEOUT = 30
+    HTTP_MAX_RETRIES = 3
+    HTTP_BACKOFF_FACTOR = 0.5
+    HTTP_POOL_HOSTS = 32
+    HTTP_POOL_MAXSIZE = 16
+    HTTP_MAX_PER_HOST = 16
+
+    # Concurrent identical image fetches and LLM prompts are sent once; the
+    # other callers wait up to this many seconds for the shared result
+    SINGLEFLIGHT_TIMEOUTS = {"image": 60, "llm": 2 * LLM_TIMEOUT}
+
+    # Histogram bucket bounds (seconds) for the stage timings served at /metrics
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    # LangGraph pipeline: branches (text or image) allowed to run at once
+    PIPELINE_MAX_CONCURRENCY = 16
+
+    # Batched text generation: output token budget per request, the starting
+    # estimate of tokens per topic (refined from usage), a safety margin on
+    # that estimate and a cap on topics per request
+    TEXT_BATCH_MAX_TOKENS = 2000
+    TEXT_BATCH_TOKENS_PER_TOPIC = 150
+    TEXT_BATCH_TOKEN_MARGIN = 1.3
+    TEXT_BATCH_MAX_TOPICS = 12
+
+    # Streamed PPT generation: subtopics whose text is streamed from the LLM
+    # at the same time (slides are still emitted in subtopic order)
+    STREAM_TEXT_CONCURRENCY = 4
+
+    # Decks returned directly by /generate_ppt/ and /upload_pdf/ are rendered
+    # in memory and spill to an anonymous temporary file past
+    # RENDER_SPOOL_MAX_BYTES; with RENDER_IN_MEMORY off they are written to a
+    # unique per-request file that is removed once it has been sent
+    RENDER_IN_MEMORY = True
+    RENDER_SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+    # Slide rendering: "pptx" builds decks with python-pptx; "xml" stamps
+    # slide XML precompiled from the template and writes the package in one
+    # pass, which is much faster for large decks
+    SLIDE_RENDERER = os.getenv("SLIDE_RENDERER", "pptx")
 
     os.makedirs(OUTPUT_PATH, exist_ok=True)
     os.makedirs(ASSETS_PATH, exist_ok=True)
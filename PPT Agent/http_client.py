@@ -0,0 +1,178 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A POST is not idempotent (a chat completion is billed once per send), so
+# it is only resent when the server says it was not processed and when to
+# come back: one of these statuses with a Retry-After header
+POST_RETRY_STATUSES = (429, 503)
+
+_retry_counts = Counter()
+_retry_lock = threading.Lock()
+
+
+class CountingRetry(Retry):
+    """
+    urllib3 Retry that records every retry per host for the metrics, and
+    retries a POST response only as POST_RETRY_STATUSES allows. Read
+    errors after a POST was sent are never retried (POST is not in
+    allowed_methods); connection errors are, since nothing was sent.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST":
+            return bool(self.total) and has_retry_after and status_code in POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        host = _pool.host if _pool is not None else "unknown"
+        with _retry_lock:
+            _retry_counts[host] += 1
+        status = response.status if response is not None else error
+        logging.info(f"🔁 Retrying {method} {host}{url or ''} after {status}")
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class HTTPClient:
+    """
+    Shared HTTP client for all tools. It has:
+    - keep-alive connection pools per host
+    - default connect/read timeouts
+    - exponential-backoff retries on 429 and 5xx responses, honouring
+      Retry-After (for POST, see POST_RETRY_STATUSES)
+    - a limit on concurrent requests to any one host. A streamed
+      response (stream=True) holds its slot until it is closed, so
+      callers must close it (or use it as a context manager)
+    """
+
+    def __init__(self):
+        retry = CountingRetry(
+            total=Config.HTTP_MAX_RETRIES,
+            backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=Config.HTTP_POOL_HOSTS,
+            pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(Config.HTTP_MAX_PER_HOST))
+        self._stats = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).hostname
+        kwargs.setdefault("timeout", (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT))
+        with self._lock:
+            limit = self._host_limits[host]
+            self._stats[host]["waiting"] += 1
+        limit.acquire()
+        with self._lock:
+            self._stats[host]["waiting"] -= 1
+            self._stats[host]["in_flight"] += 1
+            self._stats[host]["requests"] += 1
+        released = []
+
+        def release():
+            with self._lock:
+                if released:
+                    return
+                released.append(True)
+                self._stats[host]["in_flight"] -= 1
+            limit.release()
+
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                with self._lock:
+                    self._stats[host]["error_responses"] += 1
+        except requests.RequestException:
+            with self._lock:
+                self._stats[host]["failures"] += 1
+            raise
+        finally:
+            if response is None or not kwargs.get("stream"):
+                release()
+        if not kwargs.get("stream"):
+            return response
+
+        # The body is still to be read: keep the slot until the response is closed
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+
+        response.close = close_and_release
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self):
+        """Per-host request, retry and connection pool counters."""
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                pools[pool.host] = {
+                    "connections_opened": pool.num_connections,
+                    "requests_sent": pool.num_requests,
+                    "max_size": pool.pool.maxsize if pool.pool else 0,
+                }
+        with self._lock, _retry_lock:
+            hosts = set(self._stats) | set(pools) | set(_retry_counts)
+            return {
+                host: {**self._stats.get(host, {}), "retries": _retry_counts[host], "pool": pools.get(host, {})}
+                for host in hosts
+            }
+
+
+http_client = HTTPClient()
+
+_openai_client = None
+_openai_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI SDK client, created on first use. It keeps its
+    own httpx pool, sized and configured to match the settings above.
+    """
+    global _openai_client
+    with _openai_lock:
+        if _openai_client is None:
+            import httpx
+            from openai import OpenAI
+
+            _openai_client = OpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                base_url=Config.OPENAI_BASE_URL,
+                max_retries=Config.HTTP_MAX_RETRIES,
+                timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT),
+                http_client=httpx.Client(limits=httpx.Limits(
+                    max_connections=Config.HTTP_MAX_PER_HOST,
+                    max_keepalive_connections=Config.HTTP_POOL_MAXSIZE,
+                )),
+            )
+        return _openai_client
@@ -1,46 +1,108 @@
-import requests
-import os
 import io
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
 from PIL import Image
 from config import Config
 from base_tool import BaseTool
-from tool_registry import ToolRegistry
+from image_store import image_store
+from http_client import http_client
+from metrics import metrics
+from image_processing import normalize_in_pool
+from singleflight import image_flight
+
+# Bytes read before giving up on recognizing an image header
+HEADER_PROBE_BYTES = 64 * 1024
+
+_download_pool = None
+_download_pool_lock = threading.Lock()
+
+
+def get_download_pool():
+    global _download_pool
+    with _download_pool_lock:
+        if _download_pool is None:
+            _download_pool = ThreadPoolExecutor(max_workers=Config.IMAGE_DOWNLOAD_WORKERS,
+                                                thread_name_prefix="image-download")
+        return _download_pool
+
+
+class ImageRejected(Exception):
+    """A candidate URL that did not serve a usable image."""
+
+
+class DownloadRace:
+    """State shared by the downloads of one `download_first` call."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        # Set while a candidate has all its bytes; no more hedges are needed
+        self.downloaded = threading.Event()
+        # Candidates decode one at a time, so losers are cancelled instead
+        self.decode_lock = threading.Lock()
+
 
 class ImageFetcherTool(BaseTool):
     """
-    Fetches an image from SerpAPI and converts it to JPEG.
+    Fetches an image from SerpAPI and normalizes it to the slide image size.
+    Concurrent fetches of the same query share one search and download.
     """
 
     def run(self, topic):
-        # Always store the final image as .jpeg
-        image_path = os.path.join(
-            Config.ASSETS_PATH, f"{topic.lower().replace(' ', '_')}.jpeg"
-        )
-
         # ✅ Return existing image if found
-        if os.path.exists(image_path):
+        image_path = image_store.lookup(topic)
+        metrics.cache("image", image_path is not None)
+        if image_path:
             print(f"✅ Using cached image for {topic}")
-            return image_path  
+            return image_path
+
+        try:
+            return image_flight.do(image_store.normalize_query(topic), self.fetch, topic)
+        except Exception as e:
+            print(f"❌ Image Fetch Failed: {e}")
+            return None
+
+    def fetch(self, topic):
+        # A fetch of the same query may have finished since the lookup above
+        image_path = image_store.lookup(topic)
+        if image_path:
+            return image_path
 
         # Query SerpAPI for images
-        url = (
-            f"https://serpapi.com/search?engine=google_images&q={topic}"
-            f"&api_key={Config.SERP_API_KEY}"
-        )
-        response = requests.get(url)
+        params = {"engine": "google_images", "q": topic, "api_key": Config.SERP_API_KEY}
+        try:
+            with metrics.stage("image_search"):
+                response = http_client.get(Config.SERPAPI_URL, params=params, timeout=Config.IMAGE_FETCH_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"⚠️ SerpAPI request failed: {e}")
+            return None
 
         if response.status_code != 200:
             print(f"⚠️ SerpAPI Error {response.status_code}: {response.text}")
             return None
 
         try:
-            # Get the first image's original URL
-            image_url = response.json()["images_results"][0]["original"]
-            img_data = requests.get(image_url).content
-
-            # Convert whatever format we get into JPEG
-            img = Image.open(io.BytesIO(img_data)).convert("RGB")
-            img.save(image_path, "JPEG")
+            results = response.json().get("images_results", [])[:Config.IMAGE_CANDIDATES]
+            with metrics.stage("image_download"):
+                image = self.download_first(
+                    [result["original"] for result in results if result.get("original")],
+                    Config.IMAGE_DOWNLOAD_DEADLINE,
+                    Config.IMAGE_MIN_SIDE,
+                )
+                if image is None and Config.IMAGE_THUMBNAIL_DEADLINE:
+                    print(f"⏱️ No full-size image for {topic} in time; trying thumbnails")
+                    # Thumbnails are small by design, so any size is accepted
+                    image = self.download_first(
+                        [result["thumbnail"] for result in results if result.get("thumbnail")],
+                        Config.IMAGE_THUMBNAIL_DEADLINE,
+                        1,
+                    )
+            if image is None:
+                print(f"⚠️ No usable image found for {topic}")
+                return None
+            image_bytes, extension, original_size = image
+            image_path = image_store.put(topic, image_bytes, extension, original_size=original_size)
 
             print(f"✅ Image saved: {image_path}")
             return image_path
@@ -48,6 +110,102 @@ class ImageFetcherTool(BaseTool):
             print(f"❌ Image Fetch Failed: {e}")
             return None
 
-# Register the tool
-ToolRegistry.register("image_fetcher", ImageFetcherTool())
-print("✅ image_fetcher tool registered successfully.")
+    def download_first(self, urls, deadline, min_side):
+        """
+        Races downloads of `urls` and returns the first valid image as
+        (normalized bytes, extension, downloaded size), or None if none
+        arrives within `deadline` seconds. Requests are hedged: the next URL
+        is tried every Config.IMAGE_HEDGE_DELAY seconds until a candidate
+        has been downloaded, or straight away when one is rejected. The
+        other downloads are cancelled once one wins.
+        """
+        pending = {}
+        queue = list(urls)
+        race = DownloadRace()
+        end = time.monotonic() + deadline
+        next_start = 0.0
+        try:
+            while queue or pending:
+                now = time.monotonic()
+                if now >= end:
+                    return None
+                hedging = bool(queue) and not race.downloaded.is_set()
+                if hedging and now >= next_start:
+                    url = queue.pop(0)
+                    pending[metrics.submit(get_download_pool(), self.download, url, race, min_side)] = url
+                    next_start = now + Config.IMAGE_HEDGE_DELAY
+                    continue
+
+                timeout = min(end, next_start) if hedging else end
+                done, _ = wait(pending, timeout=max(0.0, timeout - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        print(f"⚠️ Skipping image candidate {url}: {e}")
+                        race.downloaded.clear()
+                        next_start = 0.0
+            return None
+        finally:
+            race.cancelled.set()
+
+    def download(self, url, race, min_side):
+        """
+        Downloads one candidate, checking the content type, size and image
+        header as the bytes arrive, then resizes and re-encodes it to fit
+        the slide; an image only counts as valid once it has decoded.
+        Raises ImageRejected for anything that is not a usable image;
+        returns None if the race is cancelled first.
+        """
+        with http_client.get(url, timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.IMAGE_FETCH_TIMEOUT),
+                             stream=True) as response:
+            if response.status_code != 200:
+                raise ImageRejected(f"HTTP {response.status_code}")
+            content_type = response.headers.get("Content-Type", "")
+            if content_type and not content_type.startswith("image/"):
+                raise ImageRejected(f"content type {content_type}")
+            if int(response.headers.get("Content-Length") or 0) > Config.IMAGE_MAX_BYTES:
+                raise ImageRejected("image too large")
+
+            parts = []
+            length = 0
+            size = None
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                if race.cancelled.is_set():
+                    return None
+                parts.append(chunk)
+                length += len(chunk)
+                if length > Config.IMAGE_MAX_BYTES:
+                    raise ImageRejected("image too large")
+                if size is None:
+                    size = self.check_header(b"".join(parts), min_side, final=length >= HEADER_PROBE_BYTES)
+        data = b"".join(parts)
+        if size is None:
+            self.check_header(data, min_side, final=True)
+        metrics.add_bytes("image_download", len(data))
+        race.downloaded.set()
+        with race.decode_lock:
+            if race.cancelled.is_set():
+                return None
+            try:
+                image_bytes, extension = normalize_in_pool(data)
+            except Exception as e:
+                raise ImageRejected(f"image does not decode ({e})")
+        return image_bytes, extension, len(data)
+
+    def check_header(self, data, min_side, final):
+        """
+        Returns the image size once `data` holds a recognizable image
+        header, or None if more bytes are needed (and `final` is False).
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size
+        except Exception:
+            if final:
+                raise ImageRejected("not a recognizable image")
+            return None
+        if min(width, height) < min_side:
+            raise ImageRejected(f"image too small ({width}x{height})")
+        return width, height
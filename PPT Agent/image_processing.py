@@ -0,0 +1,102 @@
+import atexit
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps
+from config import Config
+from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+# python-pptx can only embed these formats, so WebP is not offered
+EXTENSIONS = {"JPEG": "jpeg", "PNG": "png"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def current_settings():
+    """Snapshot of the normalization settings, passed explicitly to worker processes."""
+    dpi = Config.IMAGE_DPI
+    max_width = max(width for width, _ in Config.IMAGE_BOXES)
+    max_height = max(height for _, height in Config.IMAGE_BOXES)
+    return {
+        "size": (round(max_width * dpi), round(max_height * dpi)),
+        "format": Config.IMAGE_FORMAT,
+        "quality": Config.IMAGE_JPEG_QUALITY,
+    }
+
+
+def normalize_image(data, settings):
+    """
+    Decodes image bytes, applies the EXIF orientation, downscales to fit
+    the largest slide image box (keeping the aspect ratio) and re-encodes
+    without metadata. Returns (bytes, extension).
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", settings["size"])  # lets JPEG decode at reduced scale
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(settings["size"], Image.LANCZOS)
+        fmt = settings["format"]
+        if fmt == "PNG":
+            img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            options = {"optimize": True}
+        else:
+            img = img.convert("RGB")
+            options = {"quality": settings["quality"], "optimize": True}
+        buffer = io.BytesIO()
+        # No exif/icc arguments, so the output carries no metadata
+        img.save(buffer, fmt, **options)
+    return buffer.getvalue(), EXTENSIONS[fmt]
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.IMAGE_PROCESS_WORKERS)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def normalize_in_pool(data):
+    """
+    Runs normalize_image in the shared process pool so CPU-heavy decoding
+    does not hold the GIL of the request-handling process. Falls back to
+    running inline if the pool is unavailable or disabled.
+    """
+    global _pool
+    settings = current_settings()
+    with metrics.stage("image_transcode"):
+        try:
+            if not Config.IMAGE_PROCESS_WORKERS:
+                image_bytes, extension = normalize_image(data, settings)
+            else:
+                image_bytes, extension = _get_pool().submit(normalize_image, data, settings).result()
+        except BrokenProcessPool:
+            logging.warning("⚠️ Image process pool broke; normalizing inline.")
+            with _pool_lock:
+                _pool = None
+            image_bytes, extension = normalize_image(data, settings)
+    metrics.add_bytes("image_transcoded", len(image_bytes))
+    return image_bytes, extension
+
+
+def log_bytes_saved(image_paths, label):
+    """Logs how many bytes normalization saved for the images used in a deck."""
+    from image_store import image_store
+
+    original = stored = count = 0
+    for path in set(filter(None, image_paths)):
+        info = image_store.blob_info(path)
+        if info and info.get("original_size"):
+            original += info["original_size"]
+            stored += info["size"]
+            count += 1
+    if count:
+        logging.info(
+            f"🗜️ {label}: image normalization saved {(original - stored) / 1024:.0f} KB "
+            f"({original / 1024:.0f} KB -> {stored / 1024:.0f} KB across {count} images)"
+        )
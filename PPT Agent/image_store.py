@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+
+
+def atomic_write(path, data):
+    """Writes bytes to `path` via a temp file and rename, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ImageStore:
+    """
+    Content-addressed store for fetched images.
+
+    Queries are normalized and hashed; index.json maps each query key to the
+    SHA-256 of the image bytes, and each content hash to its file, size and
+    last access time. Identical images fetched for different queries are
+    stored once. When the store exceeds `max_bytes`, the least recently used
+    images (and the queries pointing at them) are evicted.
+    """
+
+    INDEX_FLUSH_INTERVAL = 30
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or Config.IMAGE_STORE_PATH
+        self.max_bytes = max_bytes or Config.IMAGE_STORE_MAX_BYTES
+        self.index_path = os.path.join(self.root, "index.json")
+        self._index = None
+        self._index_mtime = None
+        self._flushed_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query):
+        """'  Machine-Learning! ' and 'machine learning' map to the same key."""
+        query = unicodedata.normalize("NFKC", query).casefold()
+        return " ".join(re.sub(r"[\W_]+", " ", query).split())
+
+    def query_key(self, query):
+        return hashlib.sha256(self.normalize_query(query).encode()).hexdigest()
+
+    @contextmanager
+    def _locked(self):
+        """Serializes index updates across threads and, where supported, processes."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        """Reloads the index if another process has rewritten it."""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._index is None or mtime != self._index_mtime:
+            if mtime is None:
+                self._index = {"queries": {}, "blobs": {}}
+            else:
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+            self._index_mtime = mtime
+        return self._index
+
+    def _save_index(self):
+        atomic_write(self.index_path, json.dumps(self._index).encode())
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
+        self._flushed_at = time.time()
+
+    def lookup(self, query):
+        """Returns the stored image path for `query`, or None."""
+        with self._locked():
+            index = self._load_index()
+            content_hash = index["queries"].get(self.query_key(query))
+            blob = index["blobs"].get(content_hash)
+            if not blob:
+                return None
+            path = os.path.join(self.root, blob["path"])
+            if not os.path.exists(path):
+                del index["blobs"][content_hash]
+                self._save_index()
+                return None
+            blob["last_access"] = time.time()
+            # Access times only drive eviction, so they are flushed lazily
+            if time.time() - self._flushed_at > self.INDEX_FLUSH_INTERVAL:
+                self._save_index()
+            return path
+
+    def put(self, query, data, extension="jpeg", original_size=None):
+        """
+        Stores image bytes for `query` and returns the file path.
+        `original_size` records the size of the image before normalization.
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        relative_path = os.path.join(content_hash[:2], f"{content_hash}.{extension}")
+        path = os.path.join(self.root, relative_path)
+        with self._locked():
+            index = self._load_index()
+            if content_hash not in index["blobs"] or not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write(path, data)
+            index["blobs"][content_hash] = {
+                "path": relative_path,
+                "size": len(data),
+                "original_size": original_size or len(data),
+                "last_access": time.time(),
+            }
+            index["queries"][self.query_key(query)] = content_hash
+            self._evict(index, keep=content_hash)
+            self._save_index()
+        return path
+
+    def blob_info(self, path):
+        """Returns the index entry (size, original_size, ...) for a stored image path, or None."""
+        content_hash = os.path.splitext(os.path.basename(path))[0]
+        with self._locked():
+            return self._load_index()["blobs"].get(content_hash)
+
+    def _evict(self, index, keep):
+        total = sum(blob["size"] for blob in index["blobs"].values())
+        if total <= self.max_bytes:
+            return
+        evicted = set()
+        for content_hash, blob in sorted(index["blobs"].items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if content_hash == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.root, blob["path"]))
+            except FileNotFoundError:
+                pass
+            total -= blob["size"]
+            evicted.add(content_hash)
+        for content_hash in evicted:
+            del index["blobs"][content_hash]
+        index["queries"] = {key: value for key, value in index["queries"].items() if value not in evicted}
+        logging.info(f"🧹 Image store evicted {len(evicted)} images")
+
+
+image_store = ImageStore()
@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from metrics import Trace, metrics
+
+logging.basicConfig(level=logging.INFO)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """
+    Tracks one background conversion: its status, the stage it is in, the
+    path of the finished presentation and a trace of where its time went.
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.result_path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.trace = Trace()
+
+    def set_stage(self, stage):
+        """Progress callback handed to the tools; closes the previous stage."""
+        now = time.time()
+        if self.stages:
+            self.stages[-1]["finished_at"] = now
+        self.stage = stage
+        self.stages.append({"name": stage, "started_at": now, "finished_at": None})
+        logging.info(f"🔄 Job {self.id} ({self.kind}): {stage}")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "trace": self.trace.summary(),
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded background executor. At most `max_workers` jobs
+    run at once and at most `max_queued` more may wait; beyond that
+    `submit` raises JobQueueFull so the API can push back on clients.
+    Results expire after `result_ttl` seconds; they are pruned on every
+    admission and lookup, and every Config.JOB_PRUNE_INTERVAL seconds by a
+    background thread, so an idle server does not keep old decks on disk.
+    """
+
+    def __init__(self, max_workers=None, max_queued=None, result_ttl=None):
+        self.max_workers = max_workers or Config.JOB_MAX_WORKERS
+        self.max_queued = Config.JOB_MAX_QUEUED if max_queued is None else max_queued
+        self.result_ttl = result_ttl or Config.JOB_RESULT_TTL
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._prune_periodically, name="job-prune", daemon=True).start()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queues `fn(*args, progress=job.set_stage, **kwargs)`. `fn` must
+        return the path of the generated file, or None on failure.
+        """
+        job = self._admit(kind)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def track(self, kind):
+        """
+        Registers a job that the caller runs itself, such as a streamed
+        conversion, so it counts against the queue limits and its result can
+        be polled and downloaded like any other. Close it with `finish`.
+        """
+        job = self._admit(kind)
+        job.status = "running"
+        return job
+
+    def finish(self, job, result_path=None, error=None):
+        """Records the outcome of a job and frees its slot in the queue."""
+        if error is None and (result_path is None or not os.path.exists(result_path)):
+            error = f"{job.kind} produced no output"
+        if error is None:
+            job.result_path = result_path
+            job.status = "done"
+        else:
+            logging.error(f"❌ Job {job.id} ({job.kind}) failed: {error}")
+            job.status = "failed"
+            job.error = str(error)
+        if job.stages:
+            job.stages[-1]["finished_at"] = time.time()
+        job.finished_at = time.time()
+        with self._lock:
+            self._pending -= 1
+
+    def get(self, job_id):
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def _admit(self, kind):
+        self._prune()
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queued:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            job = Job(kind)
+            self._jobs[job.id] = job
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            with metrics.trace(job.trace):
+                result_path = fn(*args, progress=job.set_stage, **kwargs)
+        except Exception as e:
+            self.finish(job, error=e)
+        else:
+            self.finish(job, result_path)
+
+    def _prune_periodically(self):
+        while True:
+            time.sleep(Config.JOB_PRUNE_INTERVAL)
+            try:
+                self._prune()
+            except Exception as e:
+                logging.warning(f"⚠️ Pruning expired jobs failed: {e}")
+
+    def _prune(self):
+        """Forgets finished jobs older than the result TTL and removes their files."""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished_at and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.remove(job.result_path)
+                logging.info(f"🧹 Removed expired result of job {job.id}")
@@ -1,37 +1,107 @@
+from typing import Annotated, Optional
 from tool_registry import ToolRegistry
-from langgraph.graph import StateGraph
+from config import Config
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from pydantic import BaseModel
 
-if not ToolRegistry.get_tool("text_generation") or not ToolRegistry.get_tool("ppt_generator"):
+if not ToolRegistry.has_tool("text_generation") or not ToolRegistry.has_tool("ppt_generator"):
     raise ValueError("Error: Required tools are not found in ToolRegistry!")
 
+
+def merge_dicts(left, right):
+    """Reducer that lets parallel branches each contribute their own keys."""
+    return {**left, **right}
+
+
 class PipelineState(BaseModel):
     main_topic: str
     subtopics: list
-    generated_text: dict = {}
+    generated_text: Annotated[dict, merge_dicts] = {}
+    images: Annotated[dict, merge_dicts] = {}
+    ppt_path: Optional[str] = None
+
+
+class SubtopicTask(BaseModel):
+    subtopic: str
+
+
+class ImageTask(BaseModel):
+    query: str
+
+
+def fan_out_subtopics(state: PipelineState):
+    """Starts one text-generation branch per subtopic."""
+    return [Send("generate_text", SubtopicTask(subtopic=subtopic)) for subtopic in state.subtopics]
+
+
+def generate_text_node(task: SubtopicTask):
+    print(f"Generating text for subtopic: {task.subtopic}")
 
-def generate_text_node(state: PipelineState):
-    print(f"Generating text for topic: {state.main_topic}")
-    
     text_tool = ToolRegistry.get_tool("text_generation")
-    generated_text = text_tool.run(state.main_topic)
-    
-    print("Generated text:", generated_text)  
-    
-    return {"generated_text": generated_text}
+    generated_text = text_tool.run(task.subtopic)
+    slides = generated_text.get("data") if generated_text else None
+    if not slides:
+        print(f"Text generation failed for {task.subtopic}: {generated_text}")
+        slides = [{"title": task.subtopic, "content": "Text generation failed.", "image_query": task.subtopic}]
+
+    return {"generated_text": {task.subtopic: slides}}
 
 
+def plan_images_node(state: PipelineState):
+    """Join point for the text branches; the image fan-out starts from here."""
+    print(f"Generated text for {len(state.generated_text)} subtopics")
+    return {}
+
+
+def fan_out_images(state: PipelineState):
+    """Starts one image-resolution branch per distinct image query in the deck."""
+    ppt_tool = ToolRegistry.get_tool("ppt_generator")
+    queries = ppt_tool.collect_image_queries(state.main_topic, state.subtopics, state.generated_text)
+    return [Send("resolve_image", ImageTask(query=query)) for query in queries] or ["generate_ppt"]
+
+
+def resolve_image_node(task: ImageTask):
+    ppt_tool = ToolRegistry.get_tool("ppt_generator")
+    return {"images": {task.query: ppt_tool.fetch_and_save_image(task.query)}}
+
 
 def generate_ppt_node(state: PipelineState):
     print(f"Generating PPT for topic: {state.main_topic} with subtopics: {state.subtopics}")
     ppt_tool = ToolRegistry.get_tool("ppt_generator")
-    ppt_path = ppt_tool.run(state.main_topic, state.subtopics, state.generated_text)
+    ppt_path = ppt_tool.run(state.main_topic, state.subtopics, state.generated_text, images=state.images)
     return {"ppt_path": ppt_path}
 
+
 def create_pipeline():
+    """
+    Builds the fan-out/fan-in graph:
+
+        START -> generate_text x N -> plan_images -> resolve_image x M -> generate_ppt -> END
+
+    Branches of each fan-out run concurrently, so latency follows the
+    slowest branch rather than the sum of all of them.
+    """
     workflow = StateGraph(state_schema=PipelineState)
     workflow.add_node("generate_text", generate_text_node)
+    workflow.add_node("plan_images", plan_images_node)
+    workflow.add_node("resolve_image", resolve_image_node)
     workflow.add_node("generate_ppt", generate_ppt_node)
-    workflow.add_edge("generate_text", "generate_ppt")
-    workflow.set_entry_point("generate_text")
+    workflow.add_conditional_edges(START, fan_out_subtopics, ["generate_text"])
+    workflow.add_edge("generate_text", "plan_images")
+    workflow.add_conditional_edges("plan_images", fan_out_images, ["resolve_image", "generate_ppt"])
+    workflow.add_edge("resolve_image", "generate_ppt")
+    workflow.add_edge("generate_ppt", END)
     return workflow.compile()
+
+
+def run_pipeline(main_topic, subtopics, max_concurrency=None):
+    """
+    Runs the pipeline with at most `max_concurrency` branches in flight
+    (Config.PIPELINE_MAX_CONCURRENCY by default) and returns the final state.
+    """
+    pipeline = create_pipeline()
+    return pipeline.invoke(
+        {"main_topic": main_topic, "subtopics": subtopics},
+        config={"max_concurrency": max_concurrency or Config.PIPELINE_MAX_CONCURRENCY},
+    )
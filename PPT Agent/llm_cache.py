@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache for LLM responses. Entries expire after `ttl`
+    seconds, and the least recently used entries are evicted once the stored
+    values exceed `max_bytes`. The database is opened on first use.
+    """
+
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        self.path = path or Config.LLM_CACHE_PATH
+        self.ttl = ttl or Config.LLM_CACHE_TTL
+        self.max_bytes = max_bytes or Config.LLM_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts):
+        """Hashes the parts that determine a response, e.g. (model, prompt, temperature, max_tokens)."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        return self._conn
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                metrics.cache("llm", True)
+                return json.loads(row[0])
+            if row:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            metrics.cache("llm", False)
+            return None
+
+    def set(self, key, value):
+        """Stores a JSON-serializable value and evicts LRU entries over the size budget."""
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+            if total <= self.max_bytes:
+                break
+        logging.info(f"🧹 LLM cache evicted {evicted} entries")
+
+    def stats(self):
+        with self._lock:
+            conn = self._connection()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+def file_sha256(path):
+    """Hashes a file in chunks so large PDFs are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(Config.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+llm_cache = LLMCache()
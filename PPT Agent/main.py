@@ -1,14 +1,300 @@
 # main.py
+"""
+Builds decks from the command line, without going through the API.
+
+    python main.py "Main topic" "Subtopic 1" "Subtopic 2"
+    python main.py --manifest decks.jsonl --output-dir out/
+    python main.py --pdf-dir papers/ --output-dir out/ --slide-count 8
+
+A manifest has one JSON object per line with "main_topic" and
+"subtopics", and optionally "generated_text" ({subtopic: [slides]}) and
+"output" (the file name to write in the output directory).
+
+Batches run as a pipeline. Network-bound steps (LLM calls, image search
+and download) run on --net-workers threads. CPU-bound steps (PDF text
+extraction, slide layout, saving) run in --cpu-workers processes. Decks
+whose output file already exists are skipped, so an interrupted batch
+can be started again with the same arguments.
+"""
 import argparse
-from ppt_generator import create_presentation
+import functools
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from config import Config
+from register_tools import register_all_tools
+from tool_registry import ToolRegistry
+
+logging.basicConfig(level=logging.INFO)
+
+
+class BatchItem:
+    """
+    One deck of a batch: where it is written and the steps that build it,
+    each a ("net" or "cpu", function) pair. The first function is called
+    with no arguments and every later one with the previous result; the
+    last one returns the saved path, or None on failure.
+    """
+
+    def __init__(self, name, output_path, steps):
+        self.name = name
+        self.output_path = output_path
+        self.steps = steps
+        self.step = 0
+        self.seconds = 0.0
+        self.error = None
+
+
+def timed(fn, *args):
+    """Runs `fn` and returns (result, seconds spent in it)."""
+    start = time.perf_counter()
+    return fn(*args), time.perf_counter() - start
+
+
+def init_worker():
+    # Worker processes are already parallel, so images are transcoded and
+    # PDF pages extracted inline; tools are built once per process on first use
+    Config.IMAGE_PROCESS_WORKERS = 0
+    Config.PDF_EXTRACT_WORKERS = 1
+    register_all_tools()
+
+
+def partial_path(output_path):
+    """Decks are written here first, so only complete files count as done."""
+    return f"{output_path}.partial"
+
+
+def publish(output_path, saved_path):
+    if saved_path is None:
+        return None
+    os.replace(saved_path, output_path)
+    return output_path
+
+
+# Topic decks: text and images over the network, then layout in a worker
+
+def prepare_deck(entry, bypass_cache=False):
+    """Generates the missing slide text of a deck and fetches its images."""
+    main_topic, subtopics = entry["main_topic"], entry["subtopics"]
+    generated_text = dict(entry.get("generated_text") or {})
+    missing = [subtopic for subtopic in subtopics if not generated_text.get(subtopic)]
+    if missing:
+        results = ToolRegistry.get_tool("text_generation").run_batch(missing, bypass_cache=bypass_cache)
+        for subtopic, result in results.items():
+            generated_text[subtopic] = result.get("data") or [{"title": subtopic, "content": "Text generation failed."}]
+
+    ppt_generator = ToolRegistry.get_tool("ppt_generator")
+    images = ppt_generator.prefetch_images(ppt_generator.collect_image_queries(main_topic, subtopics, generated_text))
+    return generated_text, images
+
+
+def render_deck(entry, output_path, prepared):
+    generated_text, images = prepared
+    ppt_generator = ToolRegistry.get_tool("ppt_generator")
+    saved = ppt_generator.run(entry["main_topic"], entry["subtopics"], generated_text,
+                              partial_path(output_path), images=images)
+    return publish(output_path, saved)
+
+
+# PDF decks: text extraction in a worker, the summary over the network,
+# then images and layout in a worker
+
+def extract_pdf(pdf_path, slide_count, bypass_cache=False):
+    """Returns the marked-up page texts of the PDF, or None if its summary is cached."""
+    from llm_cache import llm_cache
+
+    converter = ToolRegistry.get_tool("pdf_to_ppt_converter")
+    if not bypass_cache and llm_cache.get(converter.summary_cache_key(pdf_path, slide_count)) is not None:
+        return None
+    return [f"[Page {number}]\n{text}" for number, text in enumerate(converter.extract_text(pdf_path), start=1)]
+
+
+def summarize_pdf(pdf_path, slide_count, pages):
+    """Writes the slide summary to the cache, where `render_pdf` picks it up."""
+    from checkpoints import checkpoint_store
+    from llm_cache import llm_cache
+
+    if pages is None:
+        return None
+    converter = ToolRegistry.get_tool("pdf_to_ppt_converter")
+    cache_key = converter.summary_cache_key(pdf_path, slide_count)
+    # Shares the conversion's checkpoint, so finished chunk summaries survive a failed run
+    slides_data = converter.generate_slides_summary(pages, slide_count,
+                                                    checkpoint=checkpoint_store.open("pdf_to_ppt", cache_key))
+    llm_cache.set(cache_key, slides_data)
+    return None
+
+
+def render_pdf(pdf_path, slide_count, output_path, _):
+    converter = ToolRegistry.get_tool("pdf_to_ppt_converter")
+    return publish(output_path, converter.run(pdf_path, partial_path(output_path), slide_count=slide_count))
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60] or "deck"
+
+
+def manifest_items(manifest_path, output_dir, bypass_cache=False):
+    items = []
+    with open(manifest_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.warning(f"⚠️ Skipping manifest line {line_number}: {e}")
+                continue
+            if not entry.get("main_topic") or not entry.get("subtopics"):
+                logging.warning(f"⚠️ Skipping manifest line {line_number}: main_topic and subtopics are required")
+                continue
+            # Named after the content, so the same entry maps to the same file on every run
+            digest = hashlib.sha1(json.dumps(entry, sort_keys=True).encode()).hexdigest()[:8]
+            name = entry.get("output") or f"{slugify(entry['main_topic'])}-{digest}.pptx"
+            output_path = os.path.join(output_dir, name)
+            items.append(BatchItem(name, output_path, [
+                ("net", functools.partial(prepare_deck, entry, bypass_cache)),
+                ("cpu", functools.partial(render_deck, entry, output_path)),
+            ]))
+    return items
+
+
+def pdf_items(pdf_dir, output_dir, slide_count, bypass_cache=False):
+    items = []
+    for pdf_path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+        name = f"{os.path.splitext(os.path.basename(pdf_path))[0]}.pptx"
+        output_path = os.path.join(output_dir, name)
+        items.append(BatchItem(name, output_path, [
+            ("cpu", functools.partial(extract_pdf, pdf_path, slide_count, bypass_cache)),
+            ("net", functools.partial(summarize_pdf, pdf_path, slide_count)),
+            ("cpu", functools.partial(render_pdf, pdf_path, slide_count, output_path)),
+        ]))
+    return items
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def run_batch(items, net_workers, cpu_workers, resume=True):
+    """
+    Builds every item, moving each one between the network thread pool and
+    the CPU process pool as its steps require. Returns a summary dict.
+    """
+    todo = [item for item in items if not (resume and os.path.exists(item.output_path))]
+    skipped = len(items) - len(todo)
+    if skipped:
+        logging.info(f"⏭️ Skipping {skipped} decks whose output already exists")
+
+    start = time.perf_counter()
+    built, failed = [], []
+    context = multiprocessing.get_context("spawn")  # the parent runs threads, so never fork it
+    with ThreadPoolExecutor(max_workers=net_workers, thread_name_prefix="net") as net_pool, \
+            ProcessPoolExecutor(max_workers=cpu_workers, mp_context=context, initializer=init_worker) as cpu_pool:
+        pools = {"net": net_pool, "cpu": cpu_pool}
+        running = {}
+
+        def advance(item, *previous):
+            kind, fn = item.steps[item.step]
+            running[pools[kind].submit(timed, fn, *previous)] = item
+
+        for item in todo:
+            advance(item)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    item.error = e
+                else:
+                    item.seconds += seconds
+                    item.step += 1
+                    if item.step < len(item.steps):
+                        advance(item, result)
+                        continue
+                    if result is None:
+                        item.error = "no output was saved"
+
+                finished = len(built) + len(failed) + 1
+                if item.error is None:
+                    built.append(item)
+                    print(f"✅ [{finished}/{len(todo)}] {item.name} in {item.seconds:.1f}s")
+                else:
+                    failed.append(item)
+                    print(f"❌ [{finished}/{len(todo)}] {item.name}: {item.error}")
+
+    elapsed = time.perf_counter() - start
+    seconds = [item.seconds for item in built]
+    return {
+        "built": len(built),
+        "skipped": skipped,
+        "failed": [item.name for item in failed],
+        "elapsed": elapsed,
+        "decks_per_minute": len(built) / elapsed * 60 if elapsed else 0.0,
+        "p50": percentile(seconds, 0.5) if seconds else None,
+        "p95": percentile(seconds, 0.95) if seconds else None,
+    }
+
+
+def print_summary(summary):
+    print(f"📊 Batch finished in {summary['elapsed']:.1f}s: {summary['built']} built, "
+          f"{summary['skipped']} skipped, {len(summary['failed'])} failed")
+    if summary["built"]:
+        print(f"   Throughput: {summary['decks_per_minute']:.1f} decks/min")
+        print(f"   Per deck: p50 {summary['p50']:.1f}s, p95 {summary['p95']:.1f}s")
+    for name in summary["failed"]:
+        print(f"   Failed: {name}")
+
 
 def main():
-    
-    parser = argparse.ArgumentParser(description="Generate a PowerPoint presentation using Gemini API.")
-    parser.add_argument("topics", nargs="+", help="List of topics for the presentation")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", nargs="*", help="Main topic followed by its subtopics, for a single deck")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--manifest", help="JSONL file with one deck per line")
+    source.add_argument("--pdf-dir", help="Directory of PDFs to convert")
+    parser.add_argument("--output-dir", default=Config.OUTPUT_PATH)
+    parser.add_argument("--slide-count", type=int, default=Config.SLIDE_COUNT, help="Slides per converted PDF")
+    parser.add_argument("--net-workers", type=int, default=8, help="Decks in their network-bound steps at once")
+    parser.add_argument("--cpu-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for the CPU-bound steps")
+    parser.add_argument("--no-resume", action="store_true", help="Rebuild decks whose output already exists")
+    parser.add_argument("--bypass-cache", action="store_true", help="Ignore cached LLM responses")
     args = parser.parse_args()
 
-    create_presentation(args.topics)
+    if not args.manifest and not args.pdf_dir and len(args.topics) < 2:
+        parser.error("give a main topic and at least one subtopic, --manifest or --pdf-dir")
+    if args.topics and (args.manifest or args.pdf_dir):
+        parser.error("topics cannot be combined with --manifest or --pdf-dir")
+    os.makedirs(args.output_dir, exist_ok=True)
+    register_all_tools()
+
+    if args.topics:
+        entry = {"main_topic": args.topics[0], "subtopics": args.topics[1:]}
+        output_path = os.path.join(args.output_dir, f"{slugify(entry['main_topic'])}.pptx")
+        saved = render_deck(entry, output_path, prepare_deck(entry, args.bypass_cache))
+        print(f"✅ Saved {saved}" if saved else "❌ PPT generation failed")
+        return 0 if saved else 1
+
+    if args.manifest:
+        items = manifest_items(args.manifest, args.output_dir, args.bypass_cache)
+    else:
+        items = pdf_items(args.pdf_dir, args.output_dir, args.slide_count, args.bypass_cache)
+    summary = run_batch(items, args.net_workers, args.cpu_workers, resume=not args.no_resume)
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from config import Config
+
+# Pipeline stages timed by the tools
+STAGES = (
+    "pdf_extract", "llm_call", "image_search", "image_download",
+    "image_transcode", "slide_layout", "save",
+)
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, count of observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+
+class Trace:
+    """
+    What one request or job spent its time on: per-stage call counts and
+    seconds, bytes, tokens, cache lookups and coalesced calls.
+    """
+
+    def __init__(self):
+        self.stages = defaultdict(lambda: {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+        self.bytes = Counter()
+        self.tokens = Counter()
+        self.cache = defaultdict(Counter)
+        self.singleflight = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def summary(self):
+        with self._lock:
+            return {
+                "stages": {stage: {**values, "seconds": round(values["seconds"], 4),
+                                   "max_seconds": round(values["max_seconds"], 4)}
+                           for stage, values in self.stages.items()},
+                "bytes": dict(self.bytes),
+                "tokens": dict(self.tokens),
+                "cache": {name: dict(results) for name, results in self.cache.items()},
+                "singleflight": {name: dict(roles) for name, roles in self.singleflight.items()},
+            }
+
+    def server_timing(self):
+        """The stage totals as a Server-Timing header value (milliseconds)."""
+        with self._lock:
+            return ", ".join(
+                f'{stage};dur={values["seconds"] * 1000:.1f};desc="{values["count"]} calls"'
+                for stage, values in self.stages.items()
+            )
+
+
+class Metrics:
+    """
+    Process-wide stage latency histograms and byte, token, cache and
+    single-flight counters, rendered in the Prometheus text format. Everything recorded
+    is also added to the trace active in the current context, if any.
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets or Config.METRICS_BUCKETS
+        self._histograms = {name: Histogram(self.buckets) for name in STAGES}
+        self._bytes = Counter()
+        self._tokens = Counter()
+        self._cache = defaultdict(Counter)
+        self._singleflight = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as one call of stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace._lock:
+                values = trace.stages[name]
+                values["count"] += 1
+                values["seconds"] += seconds
+                values["max_seconds"] = max(values["max_seconds"], seconds)
+
+    def add_bytes(self, kind, count):
+        with self._lock:
+            self._bytes[kind] += count
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace._lock:
+                trace.bytes[kind] += count
+
+    def add_usage(self, usage):
+        """Counts the tokens of an OpenAI `usage` object or dict (None is ignored)."""
+        if usage is None:
+            return
+        if not isinstance(usage, dict):
+            usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+        counts = {kind: usage.get(f"{kind}_tokens") or 0 for kind in ("prompt", "completion")}
+        with self._lock:
+            self._tokens.update(counts)
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace._lock:
+                trace.tokens.update(counts)
+
+    def cache(self, name, hit):
+        """Records a lookup in cache `name`."""
+        result = "hit" if hit else "miss"
+        with self._lock:
+            self._cache[name][result] += 1
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace._lock:
+                trace.cache[name][result] += 1
+
+    def coalesce(self, name, coalesced):
+        """Records a call in single-flight group `name`: one that did the work, or one that waited on it."""
+        role = "coalesced" if coalesced else "leader"
+        with self._lock:
+            self._singleflight[name][role] += 1
+        trace = _current_trace.get()
+        if trace is not None:
+            with trace._lock:
+                trace.singleflight[name][role] += 1
+
+    @contextmanager
+    def trace(self, trace=None):
+        """Makes `trace` (a new Trace by default) current for the enclosed block."""
+        trace = trace or Trace()
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+
+    def traced(self, events, trace):
+        """Wraps an event generator so each step runs under `trace`."""
+        iterator = iter(events)
+        while True:
+            with self.trace(trace):
+                try:
+                    event = next(iterator)
+                except StopIteration:
+                    return
+            yield event
+
+    def submit(self, executor, fn, *args, **kwargs):
+        """executor.submit that runs `fn` under the caller's trace."""
+        return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def prometheus(self, http_metrics=None):
+        """Renders all metrics (and optional per-host HTTP counters) as Prometheus text."""
+        with self._lock:
+            histograms = {name: (list(h.cumulative()), h.sum, h.count) for name, h in self._histograms.items()}
+            byte_counts = dict(self._bytes)
+            tokens = dict(self._tokens)
+            cache = {name: dict(results) for name, results in self._cache.items()}
+            singleflight = {name: dict(roles) for name, roles in self._singleflight.items()}
+
+        lines = [
+            "# HELP ppt_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE ppt_stage_seconds histogram",
+        ]
+        for name in sorted(histograms):
+            buckets, total, count = histograms[name]
+            for bound, cumulative in buckets:
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'ppt_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'ppt_stage_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'ppt_stage_seconds_count{{stage="{name}"}} {count}')
+
+        lines += ["# HELP ppt_bytes_total Bytes read, downloaded or written, by kind.",
+                  "# TYPE ppt_bytes_total counter"]
+        lines += [f'ppt_bytes_total{{kind="{kind}"}} {value}' for kind, value in sorted(byte_counts.items())]
+
+        lines += ["# HELP ppt_llm_tokens_total Tokens reported by the LLM API.",
+                  "# TYPE ppt_llm_tokens_total counter"]
+        lines += [f'ppt_llm_tokens_total{{kind="{kind}"}} {value}' for kind, value in sorted(tokens.items())]
+
+        lines += ["# HELP ppt_cache_requests_total Cache lookups by cache and result.",
+                  "# TYPE ppt_cache_requests_total counter"]
+        for name in sorted(cache):
+            for result in ("hit", "miss"):
+                lines.append(f'ppt_cache_requests_total{{cache="{name}",result="{result}"}} {cache[name].get(result, 0)}')
+        lines += ["# HELP ppt_cache_hit_ratio Share of cache lookups that were hits.",
+                  "# TYPE ppt_cache_hit_ratio gauge"]
+        for name in sorted(cache):
+            lookups = sum(cache[name].values())
+            lines.append(f'ppt_cache_hit_ratio{{cache="{name}"}} {cache[name].get("hit", 0) / lookups if lookups else 0}')
+
+        lines += ["# HELP ppt_singleflight_requests_total Calls that did the work (leader) or waited on an identical one.",
+                  "# TYPE ppt_singleflight_requests_total counter"]
+        for name in sorted(singleflight):
+            for role in ("leader", "coalesced"):
+                lines.append(f'ppt_singleflight_requests_total{{group="{name}",role="{role}"}} '
+                             f'{singleflight[name].get(role, 0)}')
+
+        if http_metrics:
+            for metric, key, kind in (
+                ("ppt_http_requests_total", "requests", "counter"),
+                ("ppt_http_retries_total", "retries", "counter"),
+                ("ppt_http_failures_total", "failures", "counter"),
+                ("ppt_http_in_flight", "in_flight", "gauge"),
+            ):
+                lines.append(f"# TYPE {metric} {kind}")
+                lines += [f'{metric}{{host="{host}"}} {values.get(key, 0)}'
+                          for host, values in sorted(http_metrics.items())]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
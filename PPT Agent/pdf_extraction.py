@@ -0,0 +1,221 @@
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Per process: OCR backends by name, loaded on the first scanned page
+_ocr_backends = {}
+# Per worker process: the last document opened, as ((path, mtime), handle).
+# Reused by the next range of the same file, since a fresh handle parses
+# fonts and other shared resources again
+_document = None
+
+
+def current_settings():
+    """Snapshot of the extraction settings, passed explicitly to worker processes."""
+    return {
+        "scanned_max_chars": Config.PDF_SCANNED_MAX_CHARS,
+        "scanned_min_coverage": Config.PDF_SCANNED_MIN_IMAGE_COVERAGE,
+        "ocr_backend": Config.PDF_OCR_BACKEND,
+        "ocr_language": Config.PDF_OCR_LANGUAGE,
+        "ocr_dpi": Config.PDF_OCR_DPI,
+        "shrink_pages": Config.PDF_STORE_SHRINK_PAGES,
+    }
+
+
+def image_coverage(page):
+    """Share of the page area covered by images (overlapping images count twice, capped at 1)."""
+    area = abs(page.rect)
+    if not area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / area)
+
+
+def classify_page(page, text, settings):
+    """
+    "scanned" for a page that is mostly image with (almost) no text layer,
+    which only OCR can read; "text" for anything else. Images are only
+    looked at when the text is short, so born-digital pages cost nothing.
+    """
+    if len(text.strip()) >= settings["scanned_max_chars"]:
+        return "text"
+    return "scanned" if image_coverage(page) >= settings["scanned_min_coverage"] else "text"
+
+
+def load_ocr_backend(name):
+    """
+    Returns fn(doc, pdf_path, index, settings) -> text for the OCR backend
+    `name` ("auto" tries docling, then Tesseract through PyMuPDF), or None
+    if none is installed.
+    """
+    if name in ("auto", "docling"):
+        try:
+            from docling.document_converter import DocumentConverter
+        except ImportError:
+            if name == "docling":
+                logging.warning("⚠️ docling is not installed")
+        else:
+            converter = DocumentConverter()
+
+            def docling_page(doc, pdf_path, index, settings):
+                result = converter.convert(pdf_path, page_range=(index + 1, index + 1))
+                return result.document.export_to_markdown()
+
+            return docling_page
+    if name in ("auto", "tesseract"):
+        try:
+            fitz.get_tessdata()
+        except RuntimeError:
+            if name == "tesseract":
+                logging.warning("⚠️ Tesseract language data not found")
+        else:
+            def tesseract_page(doc, pdf_path, index, settings):
+                page = doc[index]
+                textpage = page.get_textpage_ocr(language=settings["ocr_language"], dpi=settings["ocr_dpi"], full=True)
+                return page.get_text(textpage=textpage)
+
+            return tesseract_page
+    return None
+
+
+def ocr_page(doc, pdf_path, index, text, settings):
+    """The OCR text of a scanned page, or its own `text` if OCR is unavailable or fails."""
+    name = settings["ocr_backend"]
+    if name == "none":
+        return text
+    if name not in _ocr_backends:
+        _ocr_backends[name] = load_ocr_backend(name)
+        if _ocr_backends[name] is None:
+            logging.warning(f"⚠️ No OCR backend available ({name}); scanned pages keep their text layer")
+    backend = _ocr_backends[name]
+    if backend is None:
+        return text
+    try:
+        return backend(doc, pdf_path, index, settings) or text
+    except Exception as e:
+        logging.warning(f"⚠️ OCR failed on page {index + 1} of {pdf_path}: {e}")
+        return text
+
+
+def iter_range(doc, pdf_path, start, stop, settings, routes=None):
+    """
+    Yields the text of pages [start, stop) of an open document, sending
+    scanned pages through OCR. If `routes` is a dict, it counts the pages
+    taken by each route.
+    """
+    for index in range(start, stop):
+        page = doc[index]
+        text = page.get_text()
+        route = classify_page(page, text, settings)
+        if route == "scanned":
+            text = ocr_page(doc, pdf_path, index, text, settings)
+        if routes is not None:
+            routes[route] = routes.get(route, 0) + 1
+        yield text
+        # MuPDF caches parsed objects for the whole document; empty the
+        # cache periodically so memory tracks the page, not the file
+        if (index + 1) % settings["shrink_pages"] == 0:
+            fitz.TOOLS.store_shrink(100)
+
+
+def open_document(pdf_path):
+    """This worker's own handle on the PDF, kept open for its next range of the same file."""
+    global _document
+    key = (pdf_path, os.path.getmtime(pdf_path))
+    if _document is None or _document[0] != key:
+        if _document is not None:
+            _document[1].close()
+        _document = (key, fitz.open(pdf_path))
+    return _document[1]
+
+
+def extract_range(pdf_path, start, stop, settings):
+    """Worker task: returns (page texts, route counts) for pages [start, stop) of the PDF."""
+    routes = {}
+    texts = list(iter_range(open_document(pdf_path), pdf_path, start, stop, settings, routes))
+    return texts, routes
+
+
+def _get_pool():
+    """The shared pool, sized once from Config.PDF_EXTRACT_WORKERS."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.PDF_EXTRACT_WORKERS)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def extract_pages(pdf_path, workers=None, routes=None):
+    """
+    Yields the text of each page of the PDF in order. Scanned pages
+    (little text, mostly image) go through OCR; born-digital pages only
+    pay for PyMuPDF's text extraction.
+
+    With more than one worker (Config.PDF_EXTRACT_WORKERS by default),
+    ranges of Config.PDF_EXTRACT_SHARD_PAGES pages are extracted in a
+    process pool, each worker with its own fitz handle, and at most two
+    ranges per worker run ahead of the caller. Calls share one pool; a
+    call asking for another worker count gets a pool of its own. Otherwise pages are read
+    one at a time in this process, so pages the caller never asks for are
+    never extracted. If `routes` is a dict, it counts pages per route.
+    """
+    settings = current_settings()
+    routes = {} if routes is None else routes
+    workers = Config.PDF_EXTRACT_WORKERS if workers is None else workers
+    shard = Config.PDF_EXTRACT_SHARD_PAGES
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if workers <= 1 or page_count <= shard:
+            yield from iter_range(doc, pdf_path, 0, page_count, settings, routes)
+            return
+
+    ranges = [(start, min(start + shard, page_count)) for start in range(0, page_count, shard)]
+    pending = []
+    # Resizing the shared pool would cancel other uploads' ranges
+    own_pool = workers != Config.PDF_EXTRACT_WORKERS
+    pool = ProcessPoolExecutor(max_workers=workers) if own_pool else _get_pool()
+    try:
+        for start, stop in ranges:
+            pending.append((start, stop, pool.submit(extract_range, pdf_path, start, stop, settings)))
+            if len(pending) < 2 * workers:
+                continue
+            yield from _collect(pool, pending.pop(0), pdf_path, settings, routes)
+        while pending:
+            yield from _collect(pool, pending.pop(0), pdf_path, settings, routes)
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        if own_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect(pool, task, pdf_path, settings, routes):
+    start, stop, future = task
+    try:
+        texts, counts = future.result()
+    except BrokenProcessPool:
+        logging.warning("⚠️ PDF extraction pool broke; extracting inline.")
+        _reset_pool(pool)
+        counts = {}
+        with fitz.open(pdf_path) as doc:
+            texts = list(iter_range(doc, pdf_path, start, stop, settings, counts))
+    for route, count in counts.items():
+        routes[route] = routes.get(route, 0) + count
+    return texts
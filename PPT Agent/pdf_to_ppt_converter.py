@@ -1,92 +1,324 @@
-from pptx import Presentation
-from pptx.util import Inches
 import fitz 
 import os
+import contextlib
 import json
 import logging
-import requests
-from dotenv import load_dotenv
-from tool_registry import ToolRegistry
+import itertools
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from base_tool import BaseTool
+from checkpoints import checkpoint_store
+from config import Config
+from llm_cache import llm_cache, file_sha256
 from image_fetcher import ImageFetcherTool
+from image_processing import log_bytes_saved, normalize_in_pool
+from image_store import image_store
+from http_client import http_client
+from metrics import metrics
+from pdf_extraction import extract_pages
+from singleflight import llm_flight
+from ppt_generator import save_presentation
+from template_cache import template_cache
+from text_compression import MARKER_CHARS, PAGE_MARKER, compress_pages
+from text_generation import JSONArrayStream
 
 logging.basicConfig(level=logging.INFO)
 
 class PDFToPPTConverterTool(BaseTool):
+    MODEL = "gpt-4o-mini"
+
     def __init__(self):
-        load_dotenv()  
-        try:
-            from config import Config
-            self.api_key = os.getenv("OPENAI_API_KEY") or Config.OPENAI_API_KEY
-        except Exception:
-            self.api_key = os.getenv("OPENAI_API_KEY")
+        # .env is loaded once, when config is imported
+        self.api_key = Config.OPENAI_API_KEY
         if not self.api_key:
             raise Exception("OPENAI_API_KEY is not set.")
 
-    def run(self, pdf_path):
+    def run(self, pdf_path, output_path=None, progress=None, slide_count=None, bypass_cache=False):
+        """
+        Converts the PDF into `slide_count` slides (Config.SLIDE_COUNT by
+        default) and saves the deck to `output_path`, a path or a writable
+        binary file object (defaults to the PDF path with a _converted.pptx
+        suffix). Returns `output_path`, or None on failure. `progress`, if
+        given, is called with the name of each stage as it starts.
+
+        Slide summaries are cached by the PDF's content hash, so the same
+        document skips extraction and the LLM entirely; `bypass_cache`
+        forces a fresh summary. Chunk summaries, the slide JSON and resolved
+        images are checkpointed as they complete, so retrying a failed
+        conversion resumes after its last completed stage. A slide that
+        cannot be built is left out instead of failing the deck.
+        """
         logging.info(f"📥 PDF received: {pdf_path}")
         logging.info(f"📄 Converting PDF to PPT: {pdf_path}")
-        prs = Presentation()
+        progress = progress or (lambda stage: None)
+        prs = template_cache.get().new_presentation()
 
         try:
-            # Step 1: Extract text from the PDF using PyMuPDF
-            text_content = self.extract_text(pdf_path)
-            logging.info(f"Extracted text length: {len(text_content)}")
+            slide_count = slide_count or Config.SLIDE_COUNT
+            cache_key = self.summary_cache_key(pdf_path, slide_count)
+            checkpoint = checkpoint_store.open("pdf_to_ppt", cache_key)
+            slides_data = self.resume_slides(checkpoint, cache_key, bypass_cache)
+            if slides_data is not None:
+                logging.info(f"⚡ Reusing the slide summary of: {pdf_path}")
+            else:
+                # Step 1: Extract text from the PDF using PyMuPDF
+                # (pages are read lazily while the prompt is being built)
+                progress("extracting_text")
+                pages = (f"[Page {number}]\n{text}" for number, text in enumerate(self.extract_text(pdf_path), start=1))
 
-            # Step 2: Use the LLM to generate a structured summary for exactly 3 slides.
-            slides_data = self.generate_slides_summary(text_content)
+                # Step 2: Use the LLM to generate a structured summary, one object per slide.
+                progress("summarizing")
+                slides_data = self.generate_slides_summary(pages, slide_count, checkpoint=checkpoint)
+                llm_cache.set(cache_key, slides_data)
+                # Images saved by an earlier attempt belong to another summary
+                checkpoint.save("images", {})
+                checkpoint.save("slides", slides_data)
             logging.info(f"Generated slides data: {slides_data}")
 
-            # Step 3: Create one slide per generated slide object.
-            for slide_obj in slides_data:
-                self.add_slide(prs, slide_obj['title'], slide_obj['content'], slide_obj.get('image_query', slide_obj['title']))
+            # Step 3: Pull figures out of the pages each slide summarizes; only
+            # slides without one fall back to a web image search.
+            progress("extracting_images")
+            resolved = self.resolved_images(checkpoint)
+            if len(resolved) < len(slides_data):
+                pdf_images = self.extract_slide_images(pdf_path, slides_data)
+            else:
+                pdf_images = [None] * len(slides_data)
+
+            # Step 4: Create one slide per generated slide object.
+            progress("building_slides")
+            image_paths = []
+            for index, (slide_obj, pdf_image) in enumerate(zip(slides_data, pdf_images)):
+                image_paths.append(self.build_slide(prs, checkpoint, index, slide_obj, resolved.get(index) or pdf_image))
+            log_bytes_saved(image_paths, "Converted deck")
 
-            # Step 4: Save the PPTX file.
-            ppt_path = pdf_path.replace(".pdf", "_converted.pptx")
-            prs.save(ppt_path)
-            logging.info(f"✅ PPT saved successfully at: {ppt_path}")
+            # Step 5: Save the PPTX file.
+            progress("saving")
+            ppt_path = output_path or pdf_path.replace(".pdf", "_converted.pptx")
+            save_presentation(prs, ppt_path)
+            checkpoint.clear()
             return ppt_path
 
         except Exception as e:
             logging.error(f"❌ Error during PDF to PPT conversion: {e}", exc_info=True)
             return None
 
+    def stream(self, pdf_path, output_path=None, slide_count=None, bypass_cache=False):
+        """
+        Converts the PDF like `run` but yields an event dict as the work
+        progresses: "stage" at each stage, then per slide "slide_text" as
+        soon as the model has written it, "image" once its picture is
+        resolved and "slide_rendered", and finally "done" with the saved
+        path (or "error"). Every event carries the seconds elapsed since the
+        start.
+        """
+        start = time.perf_counter()
+
+        def event(name, **fields):
+            return {"event": name, **fields, "elapsed": round(time.perf_counter() - start, 3)}
+
+        first = {}
+        try:
+            prs = template_cache.get().new_presentation()
+            slide_count = slide_count or Config.SLIDE_COUNT
+            cache_key = self.summary_cache_key(pdf_path, slide_count)
+            checkpoint = checkpoint_store.open("pdf_to_ppt", cache_key)
+            slides_data = self.resume_slides(checkpoint, cache_key, bypass_cache)
+            if slides_data is not None:
+                logging.info(f"⚡ Reusing the slide summary of: {pdf_path}")
+                slides = iter(slides_data)
+                resolved = self.resolved_images(checkpoint)
+            else:
+                yield event("stage", stage="extracting_text")
+                pages = (f"[Page {number}]\n{text}" for number, text in enumerate(self.extract_text(pdf_path), start=1))
+                yield event("stage", stage="summarizing")
+                slides = self.stream_slides_summary(pages, slide_count, checkpoint=checkpoint)
+                # Images saved by an earlier attempt belong to slides that were never finished
+                checkpoint.save("images", {})
+                resolved = {}
+
+            # Images are looked up per slide while later slides are still being written
+            if slides_data is not None and len(resolved) >= len(slides_data):
+                slide_images = ((slide_obj, None) for slide_obj in slides)
+            else:
+                slide_images = self.iter_slide_images(pdf_path, slides, slide_count)
+            generated = []
+            image_paths = []
+            for slide_obj, pdf_image in slide_images:
+                generated.append(slide_obj)
+                index = len(generated)
+                if "text" not in first:
+                    first["text"] = time.perf_counter() - start
+                image_query = slide_obj.get('image_query', slide_obj['title'])
+                yield event("slide_text", slide=index, title=slide_obj['title'], content=slide_obj['content'],
+                            image_query=image_query)
+                image_path = self.build_slide(prs, checkpoint, index - 1, slide_obj,
+                                              resolved.get(index - 1) or pdf_image)
+                image_paths.append(image_path)
+                yield event("image", slide=index, image_query=image_query, resolved=bool(image_path),
+                            source="pdf" if pdf_image else "web")
+                first.setdefault("render", time.perf_counter() - start)
+                yield event("slide_rendered", slide=index)
+            if not generated:
+                raise Exception("The summary produced no slides")
+            if slides_data is None and len(generated) == slide_count:
+                llm_cache.set(cache_key, generated)
+                checkpoint.save("slides", generated)
+            log_bytes_saved(image_paths, "Converted deck")
+
+            yield event("stage", stage="saving")
+            ppt_path = output_path or pdf_path.replace(".pdf", "_converted.pptx")
+            save_presentation(prs, ppt_path)
+            checkpoint.clear()
+            logging.info(f"⏱️ First slide text after {first['text']:.2f}s, rendered after {first['render']:.2f}s")
+            yield event(
+                "done", path=ppt_path, slides=len(generated),
+                time_to_first_slide=round(first["text"], 3), time_to_first_render=round(first["render"], 3),
+            )
+
+        except Exception as e:
+            logging.error(f"❌ Error during streamed PDF to PPT conversion: {e}", exc_info=True)
+            yield event("error", detail=str(e))
+
+    def summary_cache_key(self, pdf_path, slide_count):
+        """Cache key of the slide summary of a PDF, by its content hash."""
+        return llm_cache.make_key("pdf_slides", file_sha256(pdf_path), slide_count, self.MODEL)
+
+    def resume_slides(self, checkpoint, cache_key, bypass_cache=False):
+        """The slide summary saved by an earlier attempt, else the cached one unless `bypass_cache`."""
+        slides_data = checkpoint.get("slides")
+        if slides_data is None and not bypass_cache:
+            slides_data = llm_cache.get(cache_key)
+        return slides_data
+
+    def resolved_images(self, checkpoint):
+        """Slide index -> image path resolved by an earlier attempt, for images still on disk."""
+        return {int(index): path for index, path in checkpoint.get("images", {}).items()
+                if path and os.path.exists(path)}
+
+    def build_slide(self, prs, checkpoint, index, slide_obj, image_path=None):
+        """
+        Adds the slide at `index` (see `add_slide`) and checkpoints its
+        resolved image. A slide that cannot be built is left out with a
+        warning. Returns the image path used, or None.
+        """
+        title = slide_obj['title']
+        try:
+            image_path = self.add_slide(prs, title, slide_obj['content'], slide_obj.get('image_query', title),
+                                        image_path=image_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Skipping slide {title!r}: {e}")
+            return None
+        if image_path:
+            checkpoint.update("images", str(index), image_path)
+        return image_path
+
     def extract_text(self, pdf_path):
-        """Extracts text from all pages of the PDF using PyMuPDF."""
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        """
+        Yields the text of each page of the PDF in order, with scanned pages
+        read by OCR (see pdf_extraction.extract_pages).
+        """
+        metrics.add_bytes("pdf_input", os.path.getsize(pdf_path))
+        # Only time spent extracting counts, not time the caller holds a page
+        extract_seconds = 0.0
+        resumed = time.perf_counter()
+        routes = {}
+        try:
+            with contextlib.closing(extract_pages(pdf_path, routes=routes)) as pages:
+                for text in pages:
+                    extract_seconds += time.perf_counter() - resumed
+                    yield text
+                    resumed = time.perf_counter()
+        finally:
+            metrics.observe("pdf_extract", extract_seconds)
+            if routes.get("scanned"):
+                logging.info(f"🔎 {routes['scanned']} of {sum(routes.values())} pages read were scanned")
+
+    def read_prompt_text(self, pages):
+        """
+        Joins page texts until Config.PDF_MAX_PROMPT_CHARS is reached. Pages
+        past the budget are never extracted.
+        """
+        parts = []
+        length = 0
+        for page_text in pages:
+            parts.append(page_text[:Config.PDF_MAX_PROMPT_CHARS - length])
+            length += len(parts[-1])
+            if length >= Config.PDF_MAX_PROMPT_CHARS:
+                logging.info("Prompt text budget reached; skipping remaining pages.")
+                break
+        return "".join(parts)
+
+    def iter_chunks(self, pages, chunk_tokens=None):
+        """
+        Groups page texts into chunks of about `chunk_tokens` tokens, breaking
+        on page boundaries. A page that is larger than a chunk on its own is
+        split on paragraph (blank line) boundaries, and a paragraph larger
+        than a chunk between words. A chunk that continues a page starts with
+        the "[Page N]" marker it continues again (text joining several pages
+        is split at their markers too), so its pages can still be cited.
+        """
+        chunk_chars = (chunk_tokens or Config.SUMMARY_CHUNK_TOKENS) * Config.CHARS_PER_TOKEN
+        parts = []
+        length = 0
+        for page_text in pages:
+            marker = ""
+            if len(page_text) <= chunk_chars:
+                sections = [page_text]
+            else:
+                # Room for the longest marker a continuation can repeat
+                sections = self.split_sections(page_text, chunk_chars - MARKER_CHARS)
+            for number, section in enumerate(sections):
+                match = PAGE_MARKER.match(section)
+                if parts and length + len(section) > chunk_chars:
+                    yield "".join(parts)
+                    parts, length = [], 0
+                    if number and not match:
+                        parts, length = [marker], len(marker)
+                marker = match.group(0) if match else marker
+                parts.append(section)
+                length += len(section)
+        if parts:
+            yield "".join(parts)
+
+    @staticmethod
+    def split_sections(text, limit):
+        """
+        Splits `text` into pieces of at most `limit` characters that join
+        back into it: at blank lines, else after the last whitespace that
+        fits, else (a single word longer than `limit`) at `limit`.
+        """
+        sections = []
+        paragraphs = text.split("\n\n")
+        for index, paragraph in enumerate(paragraphs):
+            if index < len(paragraphs) - 1:
+                paragraph += "\n\n"
+            while len(paragraph) > limit:
+                cut = max(paragraph.rfind(" ", 0, limit), paragraph.rfind("\n", 0, limit)) + 1 or limit
+                sections.append(paragraph[:cut])
+                paragraph = paragraph[cut:]
+            if paragraph:
+                sections.append(paragraph)
+        return sections
 
-    def generate_slides_summary(self, text):
+    def generate_slides_summary(self, pages, slide_count=None, mode=None, stats=None, checkpoint=None):
         """
-        Calls OpenAI's chat completions endpoint to generate a JSON array of exactly 3 slide objects.
+        Calls OpenAI's chat completions endpoint to generate a JSON array of `slide_count` slide objects
+        (Config.SLIDE_COUNT by default).
         Each object must include:
           - "title": a concise slide title,
           - "content": a brief summary (max ~30 words),
           - "image_query": a term for fetching a representative image (if omitted, defaults to the title).
+        `pages` is an iterable of page texts (or a single string).
+
+        `mode` selects how the text is condensed first (see `summary_text`).
+        If `stats` is a dict, it is filled with the chunk count and per-chunk
+        latencies. With a `checkpoint`, chunk summaries are saved as they
+        finish and reused by a retry.
         """
-        api_url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        prompt = (
-            "You are a PowerPoint presentation specialist. Summarize the following content into exactly 3 slides. "
-            "For each slide, output a JSON object with keys 'title', 'content', and 'image_query'. "
-            "The 'title' should be a concise slide title; 'content' a brief summary (max ~30 words); "
-            "and 'image_query' a term suitable for fetching a representative image. "
-            "Return only a valid JSON array of 3 objects with no markdown formatting or extra commentary.\n\n"
-            f"Content: {text}"
-        )
-        data = {
-            "model": "gpt-4o-mini",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 300,  
-            "temperature": 0.3
-        }
-        response = requests.post(api_url, json=data, headers=headers).json()
+        slide_count = slide_count or Config.SLIDE_COUNT
+        prompt = self.slides_prompt(self.summary_text(pages, mode, stats, checkpoint), slide_count)
+        response = self.chat_completion(prompt, max_tokens=100 * slide_count, temperature=0.3)
         try:
             slides = response["choices"][0]["message"]["content"].strip()
             if slides.startswith("```"):
@@ -95,32 +327,292 @@ class PDFToPPTConverterTool(BaseTool):
             if not slides.endswith("]"):
                 slides += "]"
             slides_data = json.loads(slides)
-            if isinstance(slides_data, list) and len(slides_data) == 3:
+            if isinstance(slides_data, list) and len(slides_data) == slide_count:
                 return slides_data
             else:
-                logging.error(f"Generated slides data is not a list of 3 objects: {slides_data}")
+                logging.error(f"Generated slides data is not a list of {slide_count} objects: {slides_data}")
                 raise Exception("Invalid slides data")
         except Exception as e:
             logging.error(f"Unexpected response from OpenAI: {response}")
             raise Exception(f"Unexpected response from OpenAI: {response}")
 
-    def add_slide(self, prs, title, content, image_query):
-        """
-        Adds a slide with a title, content, and an image.
-        The slide layout places the title at the top, the content on the left, and the image on the right.
-        """
-        # Create a blank slide layout (use layout index 6; adjust if necessary)
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        # Add title at the top
-        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(1))
-        title_box.text_frame.text = title
-        # Add content on the left half
-        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(4.5), Inches(4))
-        content_box.text_frame.text = content
-        # Fetch and add an image on the right half
-        image_path = self.fetch_and_save_image(image_query)
-        if image_path:
-            slide.shapes.add_picture(image_path, Inches(5.5), Inches(1.5), width=Inches(4), height=Inches(4))
+    def stream_slides_summary(self, pages, slide_count=None, mode=None, stats=None, checkpoint=None):
+        """
+        Streaming variant of `generate_slides_summary`: yields each slide
+        object as soon as the model has finished writing it.
+        """
+        slide_count = slide_count or Config.SLIDE_COUNT
+        prompt = self.slides_prompt(self.summary_text(pages, mode, stats, checkpoint), slide_count)
+        parser = JSONArrayStream()
+        count = 0
+        for delta in self.stream_completion(prompt, max_tokens=100 * slide_count, temperature=0.3):
+            for slide_obj in parser.feed(delta):
+                if isinstance(slide_obj, dict) and slide_obj.get("title"):
+                    count += 1
+                    yield slide_obj
+        if count != slide_count:
+            logging.warning(f"⚠️ Streamed summary has {count} slides instead of {slide_count}")
+
+    def summary_text(self, pages, mode=None, stats=None, checkpoint=None):
+        """
+        Returns the text the slide prompt is built from. `mode`
+        (Config.SUMMARY_MODE by default) is "single" to send one prompt
+        capped at Config.PDF_MAX_PROMPT_CHARS, "map_reduce" to summarize
+        token-budgeted chunks in parallel and then combine the partial
+        summaries, or "auto" to use map-reduce only when the text does not
+        fit in one chunk. With Config.PDF_COMPRESS, the pages are first
+        compressed to Config.PDF_TOKEN_BUDGET tokens (see `compress_pages`).
+        """
+        mode = mode or Config.SUMMARY_MODE
+        if isinstance(pages, str):
+            pages = [pages]
+        if Config.PDF_COMPRESS:
+            pages = compress_pages(pages, stats=stats)
+
+        if mode == "single":
+            text = self.read_prompt_text(pages)
+        else:
+            chunks = self.iter_chunks(pages)
+            first_chunks = list(itertools.islice(chunks, 2))
+            if mode == "auto" and len(first_chunks) < 2:
+                text = "".join(first_chunks)
+            else:
+                partials = self.map_chunks(itertools.chain(first_chunks, chunks), stats, checkpoint)
+                text = self.reduce_partials(partials, stats, checkpoint)
+        logging.info(f"Extracted text length: {len(text)}")
+        return text
+
+    def slides_prompt(self, text, slide_count):
+        return (
+            f"You are a PowerPoint presentation specialist. Summarize the following content into exactly {slide_count} slides. "
+            "For each slide, output a JSON object with keys 'title', 'content', 'image_query' and 'pages'. "
+            "The 'title' should be a concise slide title; 'content' a brief summary (max ~30 words); "
+            "'image_query' a term suitable for fetching a representative image; "
+            "and 'pages' the list of page numbers the slide is based on, taken from the [Page N] markers "
+            "or (pages ...) references. "
+            f"Return only a valid JSON array of {slide_count} objects with no markdown formatting or extra commentary.\n\n"
+            f"Content: {text}"
+        )
+
+    def map_chunks(self, chunks, stats=None, checkpoint=None):
+        """
+        Summarizes each chunk with at most Config.SUMMARY_CONCURRENCY requests
+        in flight. Chunks are pulled from the iterator only as workers free
+        up, so pages are never extracted far ahead of the requests.
+        Returns the partial summaries in document order. Summaries found in
+        `checkpoint` (by chunk content hash) are reused without a request.
+        """
+        def summarize(index, chunk):
+            start = time.perf_counter()
+            chunk_hash = hashlib.sha256(chunk.encode()).hexdigest()
+            saved = checkpoint.get("partials", {}).get(chunk_hash) if checkpoint else None
+            if saved is not None:
+                return saved, {"chunk": index, "chars": len(chunk), "seconds": 0.0, "checkpointed": True}
+            prompt = (
+                "Summarize the key facts and arguments of this document excerpt as concise bullet points "
+                "(at most 8 bullets, plain text, no commentary). End each bullet with the page numbers it "
+                "comes from, taken from the [Page N] markers, like (pages 3, 4).\n\n"
+                f"Excerpt: {chunk}"
+            )
+            response = self.chat_completion(prompt, max_tokens=Config.SUMMARY_PARTIAL_MAX_TOKENS, temperature=0.3)
+            try:
+                summary = response["choices"][0]["message"]["content"].strip()
+            except (KeyError, IndexError, TypeError):
+                raise Exception(f"Unexpected response from OpenAI for chunk {index}: {response}")
+            if checkpoint:
+                checkpoint.update("partials", chunk_hash, summary)
+            latency = time.perf_counter() - start
+            logging.info(f"🧩 Chunk {index}: {len(chunk)} chars summarized in {latency:.2f}s")
+            return summary, {"chunk": index, "chars": len(chunk), "seconds": round(latency, 3)}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=Config.SUMMARY_CONCURRENCY) as executor:
+            in_flight = {}
+            for index, chunk in enumerate(chunks):
+                if len(in_flight) >= Config.SUMMARY_CONCURRENCY:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[in_flight.pop(future)] = future.result()
+                in_flight[metrics.submit(executor, summarize, index, chunk)] = index
+            for future, index in in_flight.items():
+                results[index] = future.result()
+
+        timings = [results[index][1] for index in sorted(results)]
+        if stats is not None:
+            stats.setdefault("chunks", []).extend(timings)
+        if timings:
+            seconds = [timing["seconds"] for timing in timings]
+            logging.info(
+                f"🧩 Mapped {len(timings)} chunks: mean {sum(seconds) / len(seconds):.2f}s, max {max(seconds):.2f}s per chunk"
+            )
+        return [results[index][0] for index in sorted(results)]
+
+    def reduce_partials(self, partials, stats=None, checkpoint=None):
+        """
+        Joins partial summaries for the final slide prompt. If they still do
+        not fit in one chunk, they are summarized again level by level.
+        """
+        text = "\n\n".join(partials)
+        while len(partials) > 1 and len(text) > Config.SUMMARY_CHUNK_TOKENS * Config.CHARS_PER_TOKEN:
+            reduced = self.map_chunks(self.iter_chunks(partial + "\n\n" for partial in partials), stats, checkpoint)
+            if len(reduced) >= len(partials):
+                # Summaries are no longer shrinking; send what we have
+                break
+            partials = reduced
+            text = "\n\n".join(partials)
+        return text
+
+    def chat_completion(self, prompt, max_tokens, temperature):
+        """
+        Sends a single-message chat completion request and returns the
+        decoded JSON response. Concurrent identical requests (e.g. the same
+        PDF uploaded twice) share one call.
+        """
+        key = llm_cache.make_key(self.MODEL, prompt, temperature, max_tokens)
+        return llm_flight.do(key, self.post_completion, prompt, max_tokens, temperature)
+
+    def post_completion(self, prompt, max_tokens, temperature):
+        api_url = f"{Config.OPENAI_BASE_URL}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": self.MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        with metrics.stage("llm_call"):
+            response = http_client.post(api_url, json=data, headers=headers, timeout=Config.LLM_TIMEOUT).json()
+        if isinstance(response, dict):
+            metrics.add_usage(response.get("usage"))
+        return response
+
+    def stream_completion(self, prompt, max_tokens, temperature):
+        """Like `chat_completion` with "stream": true; yields the content deltas as they arrive."""
+        api_url = f"{Config.OPENAI_BASE_URL}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": self.MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        # Time spent waiting on the model, not on the consumer of the deltas
+        llm_seconds = 0.0
+        resumed = time.perf_counter()
+        try:
+            with http_client.post(api_url, json=data, headers=headers, timeout=Config.LLM_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    payload = line[len("data: "):]
+                    if payload == "[DONE]":
+                        break
+                    message = json.loads(payload)
+                    metrics.add_usage(message.get("usage"))
+                    choices = message.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        llm_seconds += time.perf_counter() - resumed
+                        yield delta
+                        resumed = time.perf_counter()
+        finally:
+            metrics.observe("llm_call", llm_seconds + time.perf_counter() - resumed)
+
+    def extract_slide_images(self, pdf_path, slides_data):
+        """
+        Picks an embedded raster image for each slide from the pages it
+        summarizes. Images are deduplicated by xref and content hash, so a
+        figure is used on at most one slide, and images smaller than
+        Config.PDF_IMAGE_MIN_AREA pixels (icons, logos, rules) are ignored.
+        Returns one image path or None per slide.
+        """
+        paths = [path for _, path in self.iter_slide_images(pdf_path, slides_data, len(slides_data))]
+        logging.info(f"🖼️ Reused {sum(1 for path in paths if path)}/{len(paths)} slide images from the PDF")
+        return paths
+
+    def iter_slide_images(self, pdf_path, slides, slide_total):
+        """
+        Lazy form of `extract_slide_images`: consumes `slides` one at a time
+        (e.g. while they are still being streamed) and yields
+        (slide_obj, image path or None) pairs.
+        """
+        if not Config.PDF_EXTRACT_IMAGES:
+            for slide_obj in slides:
+                yield slide_obj, None
+            return
+
+        pdf_hash = file_sha256(pdf_path)
+        seen_xrefs = set()
+        seen_hashes = set()
+        with fitz.open(pdf_path) as doc:
+            for index, slide_obj in enumerate(slides):
+                path = None
+                candidates = []
+                for page_number in self.slide_pages(slide_obj, index, slide_total, doc.page_count):
+                    for image in doc.get_page_images(page_number - 1):
+                        xref, width, height = image[0], image[2], image[3]
+                        if xref in seen_xrefs or width * height < Config.PDF_IMAGE_MIN_AREA:
+                            continue
+                        seen_xrefs.add(xref)
+                        candidates.append((width * height, xref))
+
+                # Largest figure first; the next one is tried if it cannot be decoded
+                for _, xref in sorted(candidates, reverse=True):
+                    try:
+                        data = doc.extract_image(xref)["image"]
+                        content_hash = hashlib.sha256(data).hexdigest()
+                        if content_hash in seen_hashes:
+                            continue
+                        seen_hashes.add(content_hash)
+                        image_bytes, extension = normalize_in_pool(data)
+                        path = image_store.put(
+                            f"pdf:{pdf_hash}:{content_hash}", image_bytes, extension, original_size=len(data)
+                        )
+                        break
+                    except Exception as e:
+                        logging.warning(f"⚠️ Could not use PDF image xref {xref}: {e}")
+                yield slide_obj, path
+
+    def slide_pages(self, slide_obj, index, slide_total, page_count):
+        """
+        Returns the 1-based page numbers a slide summarizes: the 'pages' the
+        LLM reported, or else the slide's even share of the document.
+        """
+        pages = []
+        for page in slide_obj.get("pages") or []:
+            try:
+                pages.append(int(page))
+            except (TypeError, ValueError):
+                continue
+        pages = [page for page in dict.fromkeys(pages) if 1 <= page <= page_count]
+        if pages:
+            return pages
+        start = index * page_count // slide_total
+        end = (index + 1) * page_count // slide_total
+        return list(range(start + 1, max(end, start + 1) + 1))
+
+    def add_slide(self, prs, title, content, image_query, image_path=None):
+        """
+        Adds a slide with a title, content, and an image, filling the
+        placeholders of the template's content layout (title at the top,
+        content on the left and the image on the right by default).
+        `image_path` (e.g. a figure from the PDF) is used when given; otherwise an image is
+        fetched for `image_query` unless Config.PDF_IMAGES_OFFLINE is set.
+        Returns the path of the image used, or None.
+        """
+        if image_path is None and not Config.PDF_IMAGES_OFFLINE:
+            image_path = self.fetch_and_save_image(image_query)
+        template_cache.get().add_slide(prs, "content", title, content, image_path)
+        return image_path
 
     def fetch_and_save_image(self, query):
         """
@@ -129,10 +621,6 @@ class PDFToPPTConverterTool(BaseTool):
         fetcher = ImageFetcherTool()
         return fetcher.run(query)
 
-# Register the tool in the registry
-ToolRegistry.register("pdf_to_ppt_converter", PDFToPPTConverterTool())
-logging.info("✅ pdf_to_ppt_converter tool registered successfully.")
-
 if __name__ == "__main__":
     # For standalone testing, replace with your actual PDF file path.
     converter = PDFToPPTConverterTool()
@@ -1,66 +1,66 @@
-from pptx import Presentation
-from pptx.util import Inches
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
+import contextlib
 import os
 import logging
+import queue
+import threading
+import time
 from config import Config
 from base_tool import BaseTool
+from tool_registry import ToolRegistry
+from backgrounds import apply_background
+from image_processing import log_bytes_saved
+from metrics import metrics
+from template_cache import template_cache
 
 logging.basicConfig(level=logging.INFO)
 
+def describe_output(output):
+    return output if isinstance(output, (str, os.PathLike)) else "in-memory buffer"
+
+
+def save_presentation(prs, output):
+    """
+    Saves `prs` to a path or a writable file object. A file object is
+    rewound so the caller can read the deck straight back.
+    """
+    with metrics.stage("save"):
+        prs.save(output)
+    if hasattr(output, "seek"):
+        metrics.add_bytes("deck_output", output.tell())
+        output.seek(0)
+    else:
+        metrics.add_bytes("deck_output", os.path.getsize(output))
+    logging.info(f"✅ PPT saved successfully at: {describe_output(output)}")
+
+
 class PPTGeneratorTool(BaseTool):
-    def run(self, main_topic, subtopics, generated_text):
+    def run(self, main_topic, subtopics, generated_text, output_path=None, progress=None, images=None):
+        """
+        Builds the deck and saves it to `output_path`, a path or a writable
+        binary file object such as a BytesIO (defaults to
+        generated_presentation.pptx in Config.OUTPUT_PATH). Returns
+        `output_path`, or None on failure. `progress`, if given, is called
+        with the name of each stage as it starts.
+        `images` maps image queries already resolved by the caller to their
+        paths; only the remaining queries are fetched.
+        """
         logging.info(f"✅ Generating PPT for topic: {main_topic} with subtopics: {subtopics}")
-        output_path = os.path.join(Config.OUTPUT_PATH, "generated_presentation.pptx")
-        logging.info(f"📁 Output Path: {output_path}")
+        output_path = output_path or os.path.join(Config.OUTPUT_PATH, "generated_presentation.pptx")
+        logging.info(f"📁 Output Path: {describe_output(output_path)}")
+        progress = progress or (lambda stage: None)
         
         try:
-            prs = Presentation()
-            background_path = os.path.join(Config.ASSETS_PATH, "light_blue_gradient.png")
-            
-            # -------------------------------
-            # Create Title Slide with Background
-            # -------------------------------
-            blank_slide_layout = prs.slide_layouts[6]  # Blank layout for custom design
-            title_slide = prs.slides.add_slide(blank_slide_layout)
-            
-            # Add the background image covering entire slide
-            if os.path.exists(background_path):
-                bg_shape = title_slide.shapes.add_picture(
-                    background_path, 
-                    0, 0, 
-                    width=prs.slide_width, 
-                    height=prs.slide_height
-                )
-                # Move background to the back by reordering the shape tree
-                spTree = title_slide.shapes._spTree
-                spTree.remove(bg_shape._element)
-                spTree.insert(2, bg_shape._element)
-            else:
-                logging.warning("Background image not found; skipping background for title slide.")
-            
-            # Add main topic image (if available) near the top
-            main_image_path = self.fetch_and_save_image(main_topic)
-            if main_image_path:
-                logging.info(f"🖼️ Adding main topic image for {main_topic} from {main_image_path}")
-                # Place the image at (1", 0.5") with height fixed at 2.5"
-                title_slide.shapes.add_picture(
-                    main_image_path, 
-                    Inches(1), Inches(0.5), 
-                    width=Inches(5), 
-                    height=Inches(2.5)
-                )
-                # Set title textbox below the image (image top + image height + margin)
-                title_top = Inches(0.5 + 2.5 + 0.5)
-            else:
-                title_top = Inches(1)
-            
-            # Add title textbox below the image
-            title_box = title_slide.shapes.add_textbox(Inches(1), title_top, Inches(8), Inches(1.5))
-            title_box.text_frame.text = main_topic
-            
-            # -------------------------------
-            # Create Subtopic Slides with Background
-            # -------------------------------
+            # Resolve every image up front so layout never waits on the network
+            progress("fetching_images")
+            images = dict(images or {})
+            queries = self.collect_image_queries(main_topic, subtopics, generated_text)
+            images.update(self.prefetch_images([query for query in queries if query not in images]))
+
+            progress("building_slides")
+            prs = template_cache.get().new_presentation()
+            self.add_slide_or_skip(self.add_title_slide, prs, main_topic, images.get(main_topic))
             for subtopic in subtopics:
                 # Retrieve generated slide data for the subtopic (expected as a list of slide dicts)
                 subtopic_data_list = generated_text.get(subtopic, [])
@@ -68,58 +68,222 @@ class PPTGeneratorTool(BaseTool):
                 
                 if isinstance(subtopic_data_list, list) and subtopic_data_list:
                     for entry in subtopic_data_list:
-                        # Create a blank slide for custom design
-                        slide = prs.slides.add_slide(prs.slide_layouts[6])
-                        
-                        # Add background to the slide
-                        if os.path.exists(background_path):
-                            bg_shape = slide.shapes.add_picture(
-                                background_path, 
-                                0, 0, 
-                                width=prs.slide_width, 
-                                height=prs.slide_height
-                            )
-                            spTree = slide.shapes._spTree
-                            spTree.remove(bg_shape._element)
-                            spTree.insert(2, bg_shape._element)
-                        else:
-                            logging.warning("Background image not found; skipping background for slide.")
-                        
-                        # Add title at top (spanning full width)
-                        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(1))
-                        title_box.text_frame.text = entry.get("title", subtopic)
-                        
-                        # Add content on the left side below title
-                        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(4.5), Inches(4))
-                        content_box.text_frame.text = entry.get("content", "No content found.")
-                        
-                        # Add image on the right side ensuring no overlap
-                        image_query = entry.get("image_query", entry.get("title", subtopic))
-                        image_path = self.fetch_and_save_image(image_query)
-                        if image_path:
-                            logging.info(f"🖼️ Adding image for {subtopic} from {image_path}")
-                            slide.shapes.add_picture(
-                                image_path, 
-                                Inches(5.5), Inches(1.5), 
-                                width=Inches(4), 
-                                height=Inches(4)
-                            )
+                        self.add_slide_or_skip(self.add_content_slide, prs, subtopic, entry,
+                                               images.get(self.image_query(subtopic, entry)))
                 else:
                     logging.warning(f"No slide data found for subtopic: {subtopic}")
             
-            prs.save(output_path)
-            logging.info(f"✅ PPT saved successfully at: {output_path}")
+            progress("saving")
+            save_presentation(prs, output_path)
             return output_path
         
         except Exception as e:
             logging.error(f"❌ PPT Generation Failed: {e}")
             return None
 
+    def stream(self, main_topic, subtopics, generated_text=None, output_path=None, bypass_cache=False):
+        """
+        Builds the same deck as `run` but yields an event dict as each slide
+        progresses: "slide_text" when its title and content are known,
+        "image" when its image query is resolved and "slide_rendered" once it
+        is in the deck, then "done" with the saved path (or "error").
+        Every event carries the seconds elapsed since the start.
+
+        Subtopics missing from `generated_text` are streamed from the text
+        generation tool, up to Config.STREAM_TEXT_CONCURRENCY at a time, so
+        the first slides render while the model is still writing the rest.
+        Images are fetched in the background as soon as their query is known
+        and slides are rendered in order.
+        """
+        start = time.perf_counter()
+        output_path = output_path or os.path.join(Config.OUTPUT_PATH, "generated_presentation.pptx")
+        generated_text = generated_text or {}
+
+        def event(name, **fields):
+            return {"event": name, **fields, "elapsed": round(time.perf_counter() - start, 3)}
+
+        executor = ThreadPoolExecutor(max_workers=Config.IMAGE_PREFETCH_WORKERS)
+        text_executor = ThreadPoolExecutor(max_workers=Config.STREAM_TEXT_CONCURRENCY)
+        stop = threading.Event()
+        fetches = {}
+        pending = deque()
+        first = {}
+
+        def fetch(query):
+            if query not in fetches:
+                fetches[query] = metrics.submit(executor, self.fetch_and_save_image, query)
+            return fetches[query]
+
+        def produce(subtopic, slides):
+            """Streams a subtopic's slides into its queue, then None."""
+            try:
+                with contextlib.closing(self.iter_slide_text(subtopic, generated_text, bypass_cache)) as entries:
+                    for entry in entries:
+                        if stop.is_set():
+                            break
+                        slides.put(entry)
+            except Exception as e:
+                logging.warning(f"⚠️ Text streaming failed for {subtopic}: {e}")
+            finally:
+                slides.put(None)
+
+        def render(timeout=None):
+            index, subtopic, entry, query, future = pending.popleft()
+            try:
+                image_path = future.result(timeout=timeout)
+            except Exception as e:
+                logging.warning(f"⚠️ Image fetch failed for {query}: {e}")
+                image_path = None
+            yield event("image", slide=index, image_query=query, resolved=bool(image_path))
+            if entry is None:
+                self.add_slide_or_skip(self.add_title_slide, prs, main_topic, image_path)
+            else:
+                self.add_slide_or_skip(self.add_content_slide, prs, subtopic, entry, image_path)
+            if index and "render" not in first:
+                first["render"] = time.perf_counter() - start
+            yield event("slide_rendered", slide=index)
+
+        try:
+            prs = template_cache.get().new_presentation()
+            yield event("stage", stage="generating_slides")
+            pending.append((0, None, None, main_topic, fetch(main_topic)))
+            streams = []
+            for subtopic in subtopics:
+                slides = queue.Queue()
+                metrics.submit(text_executor, produce, subtopic, slides)
+                streams.append((subtopic, slides))
+
+            index = 0
+            for subtopic, slides in streams:
+                while True:
+                    try:
+                        entry = slides.get(timeout=0.05)
+                    except queue.Empty:
+                        # Render whatever is ready while the text is still coming
+                        while pending and pending[0][-1].done():
+                            yield from render()
+                        continue
+                    if entry is None:
+                        break
+                    index += 1
+                    query = self.image_query(subtopic, entry)
+                    if "text" not in first:
+                        first["text"] = time.perf_counter() - start
+                    yield event("slide_text", slide=index, subtopic=subtopic, title=entry.get("title", subtopic),
+                                content=entry.get("content", "No content found."), image_query=query)
+                    pending.append((index, subtopic, entry, query, fetch(query)))
+                    # Render whatever is ready without holding up the text stream
+                    while pending and pending[0][-1].done():
+                        yield from render()
+
+            # Each fetch is a search plus a download, both bounded by IMAGE_FETCH_TIMEOUT
+            while pending:
+                yield from render(timeout=2 * Config.IMAGE_FETCH_TIMEOUT)
+
+            yield event("stage", stage="saving")
+            save_presentation(prs, output_path)
+            if first:
+                logging.info(f"⏱️ First slide text after {first['text']:.2f}s, rendered after {first['render']:.2f}s")
+            yield event(
+                "done", path=output_path, slides=index + 1,
+                time_to_first_slide=round(first["text"], 3) if first else None,
+                time_to_first_render=round(first["render"], 3) if first else None,
+            )
+        except Exception as e:
+            logging.error(f"❌ Streamed PPT Generation Failed: {e}")
+            yield event("error", detail=str(e))
+        finally:
+            stop.set()
+            text_executor.shutdown(wait=False, cancel_futures=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_slide_text(self, subtopic, generated_text, bypass_cache=False):
+        """Yields the slides of a subtopic from `generated_text`, or streams them from the LLM."""
+        subtopic_data_list = generated_text.get(subtopic)
+        if isinstance(subtopic_data_list, list) and subtopic_data_list:
+            yield from (entry for entry in subtopic_data_list if isinstance(entry, dict))
+            return
+        text_tool = ToolRegistry.get_tool("text_generation")
+        if not text_tool:
+            logging.warning(f"No slide data found for subtopic: {subtopic}")
+            return
+        yield from text_tool.stream(subtopic, bypass_cache=bypass_cache)
+
+    def add_slide_or_skip(self, add, prs, title, *args):
+        """
+        Calls `add(prs, title, *args)`. A slide that cannot be built is left
+        out with a warning instead of failing the whole deck.
+        """
+        try:
+            return add(prs, title, *args)
+        except Exception as e:
+            logging.warning(f"⚠️ Skipping slide {title!r}: {e}")
+            return None
+
+    def add_title_slide(self, prs, main_topic, main_image_path):
+        if main_image_path:
+            logging.info(f"🖼️ Adding main topic image for {main_topic} from {main_image_path}")
+        title_slide = template_cache.get().add_slide(prs, "title", main_topic, image_path=main_image_path)
+        apply_background(title_slide, prs)
+        return title_slide
+
+    def add_content_slide(self, prs, subtopic, entry, image_path):
+        if image_path:
+            logging.info(f"🖼️ Adding image for {subtopic} from {image_path}")
+        slide = template_cache.get().add_slide(
+            prs, "content",
+            entry.get("title", subtopic),
+            entry.get("content", "No content found."),
+            image_path
+        )
+        apply_background(slide, prs)
+        return slide
+
+    def image_query(self, subtopic, entry):
+        return entry.get("image_query", entry.get("title", subtopic))
+
+    def collect_image_queries(self, main_topic, subtopics, generated_text):
+        """Returns the de-duplicated image queries for a deck, in slide order."""
+        queries = [main_topic]
+        for subtopic in subtopics:
+            subtopic_data_list = generated_text.get(subtopic, [])
+            if isinstance(subtopic_data_list, list):
+                for entry in subtopic_data_list:
+                    queries.append(self.image_query(subtopic, entry))
+        return list(dict.fromkeys(q for q in queries if q))
+
+    def prefetch_images(self, queries):
+        """
+        Resolves image queries concurrently on a bounded worker pool.
+        Returns a dict mapping each query to an image path, or None when the
+        fetch failed or did not finish within the timeout.
+        """
+        images = dict.fromkeys(queries)
+        if not queries:
+            return images
+
+        workers = min(Config.IMAGE_PREFETCH_WORKERS, len(queries))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {metrics.submit(executor, self.fetch_and_save_image, query): query for query in queries}
+        # Each fetch is a search plus a download, both bounded by IMAGE_FETCH_TIMEOUT
+        waves = -(-len(queries) // workers)
+        done, not_done = wait(futures, timeout=2 * Config.IMAGE_FETCH_TIMEOUT * waves)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future in done:
+            query = futures[future]
+            try:
+                images[query] = future.result()
+            except Exception as e:
+                logging.warning(f"⚠️ Image prefetch failed for {query}: {e}")
+        for future in not_done:
+            logging.warning(f"⚠️ Image prefetch timed out for {futures[future]}")
+
+        logging.info(f"🖼️ Prefetched {sum(1 for p in images.values() if p)}/{len(queries)} images")
+        log_bytes_saved(images.values(), "Deck")
+        return images
+
     def fetch_and_save_image(self, query):
         from image_fetcher import ImageFetcherTool
         fetcher = ImageFetcherTool()
         return fetcher.run(query)
-
-from tool_registry import ToolRegistry
-ToolRegistry.register("ppt_generator", PPTGeneratorTool())
-logging.info("✅ ppt_generator tool registered successfully.")
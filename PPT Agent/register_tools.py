@@ -1,15 +1,17 @@
-# register_tools.py
 from tool_registry import ToolRegistry
-from ppt_generator import PPTGeneratorTool
-from image_fetcher import ImageFetcherTool
-from text_generation import OpenAITextGenerationTool
-from pdf_to_ppt_converter import PDFToPPTConverterTool  
+
+# Import paths of the built-in tools; each module is only imported, and its
+# tool built, when the tool is first requested
+TOOLS = {
+    "ppt_generator": "ppt_generator:PPTGeneratorTool",
+    "image_fetcher": "image_fetcher:ImageFetcherTool",
+    "text_generation": "text_generation:OpenAITextGenerationTool",
+    "pdf_to_ppt_converter": "pdf_to_ppt_converter:PDFToPPTConverterTool",
+}
 
 def register_all_tools():
-    ToolRegistry.register("ppt_generator", PPTGeneratorTool())
-    ToolRegistry.register("image_fetcher", ImageFetcherTool())
-    ToolRegistry.register("text_generation", OpenAITextGenerationTool())
-    ToolRegistry.register("pdf_to_ppt_converter", PDFToPPTConverterTool())
+    for name, import_path in TOOLS.items():
+        ToolRegistry.register_lazy(name, import_path)
     print("✅ Registered Tools:", ToolRegistry.list_tools())
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+from config import Config
+from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    work, and callers arriving while it is in flight wait for its result
+    (or exception) instead of repeating it. A key is forgotten as soon as
+    its call finishes, so a failure is only shared with the callers that
+    were already waiting and the next call starts afresh.
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns fn(*args, **kwargs), or the result of the identical call
+        already in flight for `key`. A waiting caller gives up after the
+        group's timeout (Config.SINGLEFLIGHT_TIMEOUTS) with a TimeoutError;
+        the call it waited on carries on.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        metrics.coalesce(self.name, not leader)
+
+        if not leader:
+            timeout = self.timeout or Config.SINGLEFLIGHT_TIMEOUTS.get(self.name)
+            try:
+                return future.result(timeout)
+            except TimeoutError:
+                logging.warning(f"⚠️ Gave up after {timeout}s waiting on an in-flight {self.name} request")
+                raise
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key):
+        # Forgotten before the waiters wake, so nobody joins a finished call
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+image_flight = SingleFlight("image")
+llm_flight = SingleFlight("llm")
@@ -0,0 +1,300 @@
+import copy
+import io
+import logging
+import os
+import threading
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.presentation import Presentation as PresentationDocument
+from pptx.util import Inches
+from config import Config
+from metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+TITLE_TYPES = (PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.TITLE)
+BODY_TYPES = (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.SUBTITLE, PP_PLACEHOLDER.OBJECT)
+IMAGE_TYPES = (PP_PLACEHOLDER.PICTURE, PP_PLACEHOLDER.OBJECT)
+
+# Where a role goes when the layout has no placeholder for it
+# (left, top, width, height in inches), matching the hand-built design
+FALLBACK_BOXES = {
+    "title": {"title": (1, 1, 8, 1.5), "image": (1, 0.5, 5, 2.5)},
+    "content": {"title": (0.5, 0.3, 9, 1), "body": (0.5, 1.5, 4.5, 4), "image": (5.5, 1.5, 4, 4)},
+}
+# Gap left between a hand-placed title image and the title below it
+TITLE_IMAGE_MARGIN = Inches(0.5)
+
+
+def index_placeholders(layout):
+    """
+    Maps the roles "title", "body" and "image" to placeholder idx values of
+    a layout. A layout with two content (OBJECT) placeholders uses the
+    first for the body and the second for the image.
+    """
+    placeholders = sorted(layout.placeholders, key=lambda ph: ph.placeholder_format.idx)
+    roles = {}
+    for role, types in (("title", TITLE_TYPES), ("body", BODY_TYPES), ("image", IMAGE_TYPES)):
+        for wanted in types:
+            match = next((ph for ph in placeholders
+                          if ph.placeholder_format.type == wanted and ph.placeholder_format.idx not in roles.values()), None)
+            if match is not None:
+                roles[role] = match.placeholder_format.idx
+                break
+    return roles
+
+
+class DeckTemplate:
+    """
+    A .pptx template parsed once, with the layouts used for title and
+    content slides and their placeholders indexed by role. Decks start as
+    copies of the parsed template instead of being loaded from disk.
+    """
+
+    # Roles each kind of slide needs from its layout, best match first
+    WANTED_ROLES = {
+        "title": (("title", "body"), ("title",)),
+        "content": (("title", "body", "image"), ("title", "body")),
+    }
+
+    def __init__(self, path=None):
+        self.path = path if path and os.path.exists(path) else None
+        prs = Presentation(self.path)
+        self._drop_slides(prs)
+        self.layouts = {kind: self._pick_layout(prs, kind) for kind in self.WANTED_ROLES}
+        self.image_types = {}
+        self.image_boxes = {}
+        self.placeholder_boxes = {}
+        self.prototypes = {kind: self._build_prototypes(prs, kind) for kind in self.WANTED_ROLES}
+        self._drop_slides(prs)
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        self.size = buffer.tell()
+        # The saved package, which the XML renderer copies its parts from
+        self.package = buffer.getvalue()
+        self._xml_template = None
+        # deepcopy copies every lxml element it meets separately, so a cached
+        # reference to a child element (python-pptx caches them lazily, e.g.
+        # for prs.slides) would be detached from the copied tree. Copies are
+        # therefore only taken from a fresh parse that is never used directly.
+        self._pristine = Presentation(io.BytesIO(buffer.getvalue()))
+        self._lock = threading.Lock()
+        self._xml_lock = threading.Lock()
+        logging.info(
+            f"📐 Template {self.path or 'python-pptx default'} parsed ({self.size} bytes): "
+            + ", ".join(f"{kind} -> {prs.slide_layouts[index].name} {sorted(roles)}"
+                        for kind, (index, roles) in self.layouts.items())
+        )
+
+    def new_presentation(self):
+        """
+        Returns a new deck with no slides: an XMLDeck when
+        Config.SLIDE_RENDERER is "xml" and the template supports it,
+        otherwise an independent python-pptx copy of the parsed template.
+        """
+        if Config.SLIDE_RENDERER == "xml":
+            xml_template = self.xml_template()
+            if xml_template is not None:
+                from xml_renderer import XMLDeck
+                return XMLDeck(xml_template)
+        return self.copy_presentation()
+
+    def copy_presentation(self):
+        """Returns an independent python-pptx copy of the parsed template, with no slides."""
+        with self._lock:
+            return copy.deepcopy(self._pristine)
+
+    def xml_template(self):
+        """The template's precompiled slide XML, built on first use; None if it cannot be compiled."""
+        with self._xml_lock:
+            if self._xml_template is None:
+                from xml_renderer import XMLTemplate
+                try:
+                    self._xml_template = XMLTemplate(self)
+                except Exception as e:
+                    logging.warning(f"⚠️ Template cannot be rendered as XML ({e}); using python-pptx")
+                    self._xml_template = False
+            return self._xml_template or None
+
+    def add_slide(self, prs, kind, title, body=None, image_path=None):
+        """
+        Adds a "title" or "content" slide to `prs` (a deck from
+        `new_presentation`) and fills the placeholders of its layout. Roles
+        the layout has no placeholder for are placed by hand at
+        FALLBACK_BOXES; placeholders that would stay empty are left out.
+        """
+        with metrics.stage("slide_layout"):
+            if not isinstance(prs, PresentationDocument):
+                return prs.add_slide(kind, title, body, image_path)
+            return self._add_slide(prs, kind, title, body, image_path)
+
+    def image_box(self, kind, image_size):
+        """
+        Where a picture of `image_size` (width, height in pixels) goes on a
+        slide of `kind` without a picture placeholder: fitted inside the
+        area of its content placeholder, or stretched over the fallback box.
+        Returns (left, top, width, height) in EMU.
+        """
+        if kind not in self.image_boxes:
+            return tuple(Inches(v) for v in FALLBACK_BOXES[kind]["image"])
+        left, top, width, height = self.image_boxes[kind]
+        # A content placeholder only marks the area; keep the image's aspect ratio inside it
+        scale = min(width / image_size[0], height / image_size[1])
+        fitted_width, fitted_height = int(image_size[0] * scale), int(image_size[1] * scale)
+        return left + (width - fitted_width) // 2, top + (height - fitted_height) // 2, fitted_width, fitted_height
+
+    def _add_slide(self, prs, kind, title, body, image_path):
+        index = self.layouts[kind][0]
+        prototypes = self.prototypes[kind]
+        # Same as prs.slides.add_slide, but only the placeholders that get
+        # filled are cloned, from prototypes built once per template
+        rId, slide = prs.part.add_slide(prs.slide_layouts[index])
+        prs.slides._sldIdLst.add_sldId(rId)
+        try:
+            self._fill_slide(slide, kind, prototypes, title, body, image_path)
+        except Exception:
+            # Never leave a half-built slide in the deck
+            slide_ids = prs.slides._sldIdLst
+            slide_ids.remove(slide_ids[-1])
+            prs.part.drop_rel(rId)
+            raise
+        return slide
+
+    def _fill_slide(self, slide, kind, prototypes, title, body, image_path):
+        boxes = FALLBACK_BOXES[kind]
+
+        def placeholder(role):
+            if role not in prototypes:
+                return None
+            element = copy.deepcopy(prototypes[role])
+            # Shape ids must stay unique within the slide
+            element._nvXxPr.cNvPr.id = slide.shapes._next_shape_id
+            slide.shapes._spTree.insert_element_before(element, "p:extLst")
+            return slide.shapes._shape_factory(element)
+
+        image_bottom = None
+        if image_path:
+            try:
+                image_bottom = self._place_image(slide, kind, placeholder, image_path)
+            except Exception as e:
+                # A bad or missing image only costs this slide its picture
+                logging.warning(f"⚠️ Could not place image {image_path}: {e}; leaving the slide without it")
+
+        title_shape = placeholder("title")
+        if title_shape is None:
+            title_shape = slide.shapes.add_textbox(*(Inches(v) for v in boxes["title"]))
+        title_shape.text_frame.text = title
+        if kind == "title" and image_bottom is not None and title_shape.top < image_bottom:
+            # Keep the title clear of a hand-placed image above it. The
+            # placeholder inherits its position, so all four values are set
+            left, width, height = title_shape.left, title_shape.width, title_shape.height
+            title_shape.left, title_shape.top = left, image_bottom + TITLE_IMAGE_MARGIN
+            title_shape.width, title_shape.height = width, height
+
+        if body:
+            body_shape = placeholder("body")
+            if body_shape is None:
+                body_shape = slide.shapes.add_textbox(*(Inches(v) for v in boxes["body"]))
+            body_shape.text_frame.text = body
+
+    def _place_image(self, slide, kind, placeholder, image_path):
+        """
+        Puts the image in its picture placeholder, or at `image_box`.
+        Returns its bottom edge.
+        """
+        if self.image_types.get(kind) == PP_PLACEHOLDER.PICTURE:
+            picture_placeholder = placeholder("image")
+            try:
+                picture = picture_placeholder.insert_picture(image_path)
+            except Exception:
+                picture_placeholder._element.getparent().remove(picture_placeholder._element)
+                raise
+            return picture.top + picture.height
+
+        if kind in self.image_boxes:
+            with Image.open(image_path) as img:
+                left, top, width, height = self.image_box(kind, img.size)
+        else:
+            left, top, width, height = self.image_box(kind, None)
+        slide.shapes.add_picture(image_path, left, top, width=width, height=height)
+        return top + height
+
+    def _build_prototypes(self, prs, kind):
+        """
+        Adds a throwaway slide with the kind's layout and keeps a copy of
+        each role's placeholder element, and its area in `placeholder_boxes`.
+        Content (OBJECT) placeholders used for images only record their area
+        in `image_boxes`.
+        """
+        index, roles = self.layouts[kind]
+        slide = prs.slides.add_slide(prs.slide_layouts[index])
+        by_idx = {ph.placeholder_format.idx: ph for ph in slide.placeholders}
+        prototypes = {}
+        boxes = self.placeholder_boxes[kind] = {}
+        for role, idx in roles.items():
+            ph = by_idx.get(idx)
+            if ph is None:
+                continue
+            boxes[role] = (ph.left, ph.top, ph.width, ph.height)
+            if role == "image":
+                self.image_types[kind] = ph.placeholder_format.type
+                if ph.placeholder_format.type != PP_PLACEHOLDER.PICTURE:
+                    self.image_boxes[kind] = (ph.left, ph.top, ph.width, ph.height)
+                    continue
+            prototypes[role] = copy.deepcopy(ph._element)
+        return prototypes
+
+    def _drop_slides(self, prs):
+        """Removes any sample slides shipped in the template file."""
+        slide_ids = prs.slides._sldIdLst
+        for slide_id in list(slide_ids):
+            prs.part.drop_rel(slide_id.rId)
+            slide_ids.remove(slide_id)
+
+    def _pick_layout(self, prs, kind):
+        """
+        Uses the layout named in Config.TEMPLATE_LAYOUTS if the template has
+        it, otherwise the first layout offering the most wanted roles, and
+        finally the layout with the fewest placeholders (usually Blank).
+        """
+        layouts = list(prs.slide_layouts)
+        indexed = [(index, index_placeholders(layout)) for index, layout in enumerate(layouts)]
+        name = Config.TEMPLATE_LAYOUTS.get(kind)
+        for index, roles in indexed:
+            if layouts[index].name == name:
+                return index, roles
+        for wanted in self.WANTED_ROLES[kind]:
+            for index, roles in indexed:
+                if all(role in roles for role in wanted):
+                    return index, roles
+        index = min(range(len(layouts)), key=lambda i: len(layouts[i].placeholders))
+        return index, {}
+
+
+class TemplateCache:
+    """
+    Parsed templates, one per path. An entry is reparsed when its file
+    changes on disk.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, path=None):
+        """Returns the DeckTemplate for `path` (Config.TEMPLATE_PATH by default)."""
+        path = path or Config.TEMPLATE_PATH
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        with self._lock:
+            cached = self._templates.get(path)
+            metrics.cache("template", cached is not None and cached[0] == mtime)
+            if cached is None or cached[0] != mtime:
+                if mtime is None:
+                    logging.info(f"📐 Template not found at {path}; using the python-pptx default")
+                cached = (mtime, DeckTemplate(path))
+                self._templates[path] = cached
+            return cached[1]
+
+
+template_cache = TemplateCache()
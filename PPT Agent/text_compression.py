@@ -0,0 +1,194 @@
+import logging
+import re
+import unicodedata
+from collections import Counter
+import numpy as np
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+
+PAGE_MARKER = re.compile(r"^\[Page (\d+)\]\n")
+PAGE_NUMBER_LINE = re.compile(r"^(page\s*)?[-–]?\s*\d+\s*[-–]?(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+REFERENCES_HEADING = re.compile(r"^(\d+\.?\s*)?(references|bibliography|works cited|literature cited)$", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+WORD = re.compile(r"[a-z][a-z0-9'-]+")
+MARKER_CHARS = len("\n\n[Page 1000]\n")
+
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers him
+his how however i if in into is it its itself just may me might more most must my no nor not now of off on once
+only or other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up upon us very was we were what when where which while who whom why
+will with within without would you your
+""".split())
+
+
+def estimate_tokens(text):
+    return len(text) // Config.CHARS_PER_TOKEN
+
+
+def split_pages(pages):
+    """(page number, text) pairs from "[Page N]"-marked page texts (or plain ones, numbered in order)."""
+    for index, page in enumerate(pages, start=1):
+        match = PAGE_MARKER.match(page)
+        yield (int(match.group(1)), page[match.end():]) if match else (index, page)
+
+
+def margin_lines(lines, margin):
+    """Indexes of the first and last `margin` non-empty lines, where running headers and footers sit."""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:margin] + filled[-margin:])
+
+
+def boilerplate_key(line):
+    # "Page 3 of 10" and "Page 4 of 10" count as the same line
+    return re.sub(r"\d+", "#", line.casefold())
+
+
+def strip_boilerplate(pages, margin=None, min_share=None):
+    """
+    Drops page-number lines and lines repeated in the header or footer of
+    at least `min_share` of the pages (running titles, copyright lines).
+    `pages` is a list of (number, text); yields (number, lines) page by
+    page, releasing each page's text from the list once it is cleaned.
+    """
+    margin = margin or Config.PDF_BOILERPLATE_MARGIN_LINES
+    min_share = min_share or Config.PDF_BOILERPLATE_MIN_SHARE
+
+    counts = Counter()
+    for _, text in pages:
+        lines = [line.strip() for line in text.splitlines()]
+        counts.update({boilerplate_key(lines[i]) for i in margin_lines(lines, margin)})
+    threshold = max(2, min_share * len(pages))
+    repeated = {key for key, count in counts.items() if count >= threshold} if len(pages) >= 3 else set()
+
+    for position, (number, text) in enumerate(pages):
+        pages[position] = None
+        lines = [line.strip() for line in text.splitlines()]
+        margins = margin_lines(lines, margin)
+        yield number, [
+            line for i, line in enumerate(lines)
+            if not (i in margins and (boilerplate_key(line) in repeated or PAGE_NUMBER_LINE.match(line)))
+        ]
+
+
+def drop_references(pages, count):
+    """Cuts everything from a References/Bibliography heading in the second half of the `count` pages."""
+    for position, (number, lines) in enumerate(pages):
+        if position >= count / 2:
+            for i, line in enumerate(lines):
+                if REFERENCES_HEADING.match(line):
+                    yield number, lines[:i]
+                    return
+        yield number, lines
+
+
+def normalize_text(lines):
+    """
+    Joins a page's lines into paragraphs: words hyphenated across line
+    breaks are rejoined, wrapped lines are unwrapped, and whitespace,
+    soft hyphens and ligatures are normalized.
+    """
+    text = unicodedata.normalize("NFKC", "\n".join(lines)).replace("­", "")
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    paragraphs = (" ".join(paragraph.split()) for paragraph in re.split(r"\n\s*\n", text))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def rank_sentences(sentences):
+    """
+    Scores sentences by the cosine similarity of their TF-IDF vector to the
+    document centroid, so sentences about the document's main themes rank
+    first. Vectorized over a sparse (sentence, term) list, so the cost is
+    linear in the number of words.
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in WORD.findall(sentence.lower()):
+            if word not in STOPWORDS:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    count = len(sentences)
+    if not cols:
+        return np.zeros(count)
+
+    size = len(vocabulary)
+    keys, tf = np.unique(np.array(rows, dtype=np.int64) * size + np.array(cols, dtype=np.int64), return_counts=True)
+    rows, cols = keys // size, keys % size
+    df = np.bincount(cols, minlength=size)
+    idf = np.log((1 + count) / (1 + df)) + 1
+    weights = (1 + np.log(tf)) * idf[cols]
+    weights /= np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=count))[rows]
+    centroid = np.bincount(cols, weights=weights, minlength=size)
+    centroid /= np.linalg.norm(centroid) or 1
+    return np.bincount(rows, weights=weights * centroid[cols], minlength=count)
+
+
+def compress_pages(pages, token_budget=None, stats=None):
+    """
+    Turns extracted page texts into prompt text of at most `token_budget`
+    tokens (Config.PDF_TOKEN_BUDGET by default):
+    1. boilerplate repeated across pages, page numbers and a trailing
+       reference list are removed;
+    2. whitespace and hyphenation are normalized;
+    3. if the text is still over budget, sentences are ranked by TF-IDF
+       centrality and the best ones are kept, in document order.
+    Yields the kept text page by page, as "[Page N]" sections ending in a
+    blank line, so it is chunked like extracted pages. Ranking needs every
+    sentence, so all pages are read before the first section is yielded,
+    but each page is held only until its sentences are split out. If
+    `stats` is a dict, it is filled with the input and output token counts.
+    """
+    token_budget = token_budget or Config.PDF_TOKEN_BUDGET
+    raw = []
+    length = input_tokens = 0
+    for number, text in split_pages(pages):
+        if length >= Config.PDF_COMPRESS_MAX_CHARS:
+            logging.info("Compression input limit reached; skipping remaining pages.")
+            break
+        raw.append((number, text))
+        length += len(text)
+        input_tokens += estimate_tokens(text)
+
+    page_count = len(raw)
+    sentences, page_numbers, seen = [], [], set()
+    for number, lines in drop_references(strip_boilerplate(raw), page_count):
+        for paragraph in normalize_text(lines):
+            for sentence in SENTENCE_END.split(paragraph):
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append(sentence)
+                    page_numbers.append(number)
+
+    lengths = np.array([len(sentence) + 1 for sentence in sentences], dtype=np.int64)
+    page_numbers = np.array(page_numbers, dtype=np.int64)
+    budget_chars = token_budget * Config.CHARS_PER_TOKEN
+    if lengths.sum() + MARKER_CHARS * len(np.unique(page_numbers)) <= budget_chars:
+        keep = np.arange(len(sentences))
+    else:
+        order = np.argsort(-rank_sentences(sentences), kind="stable")
+        cumulative = np.cumsum(lengths[order])
+        keep = order[cumulative <= budget_chars]
+        # Leaves room for the page markers of the kept sentences
+        markers = MARKER_CHARS * len(np.unique(page_numbers[keep]))
+        keep = np.sort(order[cumulative <= budget_chars - markers])
+
+    kept_pages = {}
+    for index in keep:
+        kept_pages.setdefault(page_numbers[index], []).append(sentences[index])
+    sections = [f"[Page {number}]\n" + " ".join(kept) + "\n\n" for number, kept in kept_pages.items()]
+
+    output_tokens = sum(estimate_tokens(section) for section in sections)
+    logging.info(
+        f"🗜️ Compressed PDF text: {input_tokens} -> {output_tokens} tokens "
+        f"({len(keep)}/{len(sentences)} sentences from {page_count} pages)"
+    )
+    if stats is not None:
+        stats["compression"] = {
+            "pages": page_count, "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "sentences": len(sentences), "kept_sentences": int(len(keep)),
+        }
+    del sentences, seen, kept_pages
+    yield from sections
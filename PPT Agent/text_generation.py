@@ -1,20 +1,319 @@
 import json
 import logging
 import re
+import time
 from config import Config
 from base_tool import BaseTool
-from tool_registry import ToolRegistry
-from openai import OpenAI
+from llm_cache import llm_cache
+from http_client import get_openai_client
+from metrics import metrics
+from singleflight import llm_flight
 
 logging.basicConfig(level=logging.INFO)
 
-client = OpenAI(api_key=Config.OPENAI_API_KEY)
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array arriving in pieces, e.g. the deltas
+    of a streamed chat completion. `feed` returns the top-level elements
+    completed by the new text, so each slide can be used as soon as its
+    closing brace arrives. Anything before the opening bracket (such as a
+    markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element = []
+
+    def feed(self, text):
+        elements = []
+        for char in text:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = char == "["
+                continue
+            if self._in_string:
+                self._element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0 and char in ",]":
+                self._finished = char == "]"
+                self._emit(elements)
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+            self._element.append(char)
+            if self._depth == 0 and char in "]}":
+                self._emit(elements)
+        return elements
+
+    def _emit(self, elements):
+        text = "".join(self._element).strip()
+        self._element = []
+        if not text:
+            return
+        try:
+            elements.append(json.loads(text))
+        except json.JSONDecodeError:
+            logging.warning(f"⚠️ Skipping malformed array element: {text[:80]}")
+
 
 class OpenAITextGenerationTool(BaseTool):
-    def run(self, topic):
+    MODEL = "gpt-4o-mini"
+    TEMPERATURE = 0.7
+    MAX_TOKENS = 150
+
+    def __init__(self):
+        # Running estimate of output tokens per topic, used to size batches
+        self._tokens_per_topic = Config.TEXT_BATCH_TOKENS_PER_TOPIC
+
+    def run(self, topic, bypass_cache=False):
+        """
+        Generates three slides for `topic`. Responses are cached by
+        (model, prompt, temperature, max_tokens); `bypass_cache` forces a
+        fresh call and overwrites the cached entry. Concurrent calls for the
+        same topic share one request.
+        """
         logging.info(f"🔍 Generating text for topic: {topic}")
 
-        prompt = f"""
+        cache_key = self.cache_key(topic)
+        try:
+            text_response = None if bypass_cache else llm_cache.get(cache_key)
+            cache_hit = text_response is not None
+            if cache_hit:
+                logging.info(f"⚡ Cache hit for topic: {topic}")
+            else:
+                response = llm_flight.do(cache_key, self.complete, self.build_prompt(topic), self.MAX_TOKENS)
+                text_response = response.choices[0].message.content.strip()
+            logging.info(f"DEBUG: Raw text response: {text_response}")
+            result, parsed = self.parse_response(topic, text_response)
+            # Only responses that parse are worth replaying
+            if parsed and not cache_hit:
+                llm_cache.set(cache_key, text_response)
+            return result
+
+        except Exception as e:
+            logging.error("Exception in text generation: %s", e, exc_info=True)
+            return {"error": f"Text generation failed: {e}"}
+
+    def parse_response(self, topic, text_response):
+        """
+        Turns a raw (fresh or cached) response for `topic` into
+        {"data": [...]} or {"error": ...}. Returns (result, parsed), where
+        `parsed` is False if the response was not valid JSON.
+        """
+        # Remove markdown formatting if present
+        if text_response.startswith("```"):
+            text_response = re.sub(r"```(\w+)?", "", text_response).strip()
+
+        # Fix JSON closing issues
+        text_response = re.sub(r",\s*\]", "]", text_response)
+        if not text_response.endswith("]"):
+            text_response += "]"
+
+        try:
+            generated_raw = json.loads(text_response)
+        except json.JSONDecodeError:
+            logging.error(f"❌ JSON Decode Error: {text_response}")
+            return {"data": [{"title": topic, "content": "Text generation failed.", "image_query": topic}]}, False
+
+        logging.info(f"DEBUG: Parsed JSON structure: {generated_raw}")
+        if not isinstance(generated_raw, list):
+            logging.error("❌ Unexpected JSON format from OpenAI.")
+            return {"error": "Invalid JSON structure from OpenAI response"}, True
+        return {"data": self.clean_slides(generated_raw)}, True
+
+    def stream(self, topic, bypass_cache=False):
+        """
+        Yields the slides for `topic` one at a time, each as soon as its
+        JSON object has been streamed back by the model. Shares the cache
+        with `run`: a hit yields the cached slides straight away, and a
+        complete streamed response is stored for later calls.
+        """
+        cache_key = self.cache_key(topic)
+        cached = None if bypass_cache else llm_cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"⚡ Cache hit for topic: {topic}")
+            yield from self.parse_response(topic, cached)[0].get("data", [])
+            return
+
+        logging.info(f"🔍 Streaming text for topic: {topic}")
+        parser = JSONArrayStream()
+        parts = []
+        count = 0
+        # Time spent waiting on the model, not on the consumer of the slides
+        llm_seconds = 0.0
+        resumed = time.perf_counter()
+        try:
+            response = get_openai_client().chat.completions.create(
+                model=self.MODEL,
+                messages=[{"role": "user", "content": self.build_prompt(topic)}],
+                temperature=self.TEMPERATURE,
+                max_tokens=self.MAX_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in response:
+                metrics.add_usage(getattr(chunk, "usage", None))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+                for slide in self.clean_slides(parser.feed(delta)):
+                    count += 1
+                    llm_seconds += time.perf_counter() - resumed
+                    yield slide
+                    resumed = time.perf_counter()
+        except Exception as e:
+            logging.error("Exception in streamed text generation: %s", e, exc_info=True)
+        finally:
+            metrics.observe("llm_call", llm_seconds + time.perf_counter() - resumed)
+
+        raw_response = "".join(parts).strip()
+        if count and raw_response.endswith("]"):
+            llm_cache.set(cache_key, raw_response)
+        elif not count:
+            yield {"title": topic, "content": "Text generation failed.", "image_query": topic}
+
+    def run_batch(self, topics, bypass_cache=False):
+        """
+        Generates three slides for each topic using as few LLM requests as
+        the token budget allows. Topics are packed into batches that share
+        one instruction block. Each batch answers with a JSON object keyed
+        by topic. A batch that fails or is truncated is split in half and
+        retried; a single topic falls back to `run`.
+
+        Returns {topic: {"data": [...]}} (or {"error": ...}) in input order.
+        Results are cached per topic, under the same key `run` uses.
+        """
+        topics = list(dict.fromkeys(topics))
+        results = {}
+        pending = []
+        for topic in topics:
+            cached = None if bypass_cache else llm_cache.get(self.cache_key(topic))
+            if cached is not None:
+                logging.info(f"⚡ Cache hit for topic: {topic}")
+                results[topic] = self.parse_response(topic, cached)[0]
+            else:
+                pending.append(topic)
+
+        stats = {"requests": 0, "prompt_tokens": 0}
+        for batch in self.plan_batches(pending):
+            results.update(self.generate_batch(batch, stats))
+        logging.info(
+            f"📦 Batch text generation: {len(topics)} topics, {len(topics) - len(pending)} cached, "
+            f"{stats['requests']} requests, {stats['prompt_tokens']} prompt tokens"
+        )
+        return {topic: results[topic] for topic in topics}
+
+    def plan_batches(self, topics):
+        """Splits topics into batches whose expected output fits Config.TEXT_BATCH_MAX_TOKENS."""
+        per_topic = self._tokens_per_topic * Config.TEXT_BATCH_TOKEN_MARGIN
+        size = int(max(1, min(Config.TEXT_BATCH_MAX_TOPICS, Config.TEXT_BATCH_MAX_TOKENS // per_topic)))
+        return [topics[i:i + size] for i in range(0, len(topics), size)]
+
+    def generate_batch(self, topics, stats):
+        if len(topics) == 1:
+            stats["requests"] += 1
+            return {topics[0]: self.run(topics[0], bypass_cache=True)}
+
+        max_tokens = min(
+            Config.TEXT_BATCH_MAX_TOKENS,
+            int(len(topics) * self._tokens_per_topic * Config.TEXT_BATCH_TOKEN_MARGIN),
+        )
+        try:
+            prompt = self.build_batch_prompt(topics)
+            key = llm_cache.make_key(self.MODEL, prompt, self.TEMPERATURE, max_tokens)
+            response = llm_flight.do(key, self.complete, prompt, max_tokens)
+            stats["requests"] += 1
+            if response.usage:
+                stats["prompt_tokens"] += response.usage.prompt_tokens
+            choice = response.choices[0]
+            if choice.finish_reason == "length":
+                raise ValueError(f"response truncated at {max_tokens} tokens")
+
+            text_response = choice.message.content.strip()
+            if text_response.startswith("```"):
+                text_response = re.sub(r"```(\w+)?", "", text_response).strip()
+            generated_raw = json.loads(text_response)
+            if not isinstance(generated_raw, dict):
+                raise ValueError("expected a JSON object keyed by topic")
+        except Exception as e:
+            logging.warning(f"⚠️ Batch of {len(topics)} topics failed ({e}); splitting and retrying")
+            middle = len(topics) // 2
+            return {**self.generate_batch(topics[:middle], stats), **self.generate_batch(topics[middle:], stats)}
+
+        if response.usage:
+            # Learn how many output tokens a topic really needs
+            observed = response.usage.completion_tokens / len(topics)
+            self._tokens_per_topic = 0.7 * self._tokens_per_topic + 0.3 * observed
+
+        results = {}
+        missing = []
+        for topic in topics:
+            slides = generated_raw.get(topic)
+            slides = self.clean_slides(slides) if isinstance(slides, list) else []
+            if slides:
+                llm_cache.set(self.cache_key(topic), json.dumps(slides))
+                results[topic] = {"data": slides}
+            else:
+                missing.append(topic)
+        if len(missing) == len(topics):
+            # Nothing usable (e.g. keys renamed by the model): the same batch
+            # would fail the same way, so split it as for a bad response
+            logging.warning(f"⚠️ Batch response had none of the {len(topics)} topics; splitting and retrying")
+            middle = len(topics) // 2
+            results.update(self.generate_batch(topics[:middle], stats))
+            results.update(self.generate_batch(topics[middle:], stats))
+        elif missing:
+            logging.warning(f"⚠️ Batch response had no slides for {missing}; retrying them")
+            for batch in self.plan_batches(missing):
+                results.update(self.generate_batch(batch, stats))
+        return results
+
+    def build_batch_prompt(self, topics):
+        return f"""
+You are a PowerPoint presentation specialist. Your task is to generate structured slide content for each of the topics listed at the end.
+
+For every topic, generate **exactly** three slides. Each slide must contain:
+1. **"title"** - A concise slide title.
+2. **"content"** - A short, informative sentence (max 30 words).
+3. **"image_query"** - A term for fetching a representative image (if omitted, default to the slide title).
+
+Return only a **valid JSON object** whose keys are the topics exactly as given and whose values are arrays of the three slides:
+{{
+    "Topic": [
+        {{"title": "Slide 1 Title", "content": "Slide 1 content", "image_query": "Query 1"}},
+        {{"title": "Slide 2 Title", "content": "Slide 2 content", "image_query": "Query 2"}},
+        {{"title": "Slide 3 Title", "content": "Slide 3 content", "image_query": "Query 3"}}
+    ]
+}}
+
+Ensure:
+- No markdown formatting (e.g., no triple backticks).
+- No additional commentary.
+- Every topic appears as a key.
+
+Topics: {json.dumps(topics)}
+"""
+
+    def build_prompt(self, topic):
+        return f"""
 You are a PowerPoint presentation specialist. Your task is to generate structured slide content for the topic: "{topic}".
 
 Generate **exactly** three slides, each in JSON format. Each slide must contain:
@@ -35,51 +334,28 @@ Ensure:
 - Response is fully enclosed in square brackets.
 """
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
+    def complete(self, prompt, max_tokens):
+        """Sends one chat completion request and returns the response."""
+        with metrics.stage("llm_call"):
+            response = get_openai_client().chat.completions.create(
+                model=self.MODEL,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=150
+                temperature=self.TEMPERATURE,
+                max_tokens=max_tokens
             )
+        metrics.add_usage(response.usage)
+        return response
 
-            text_response = response.choices[0].message.content.strip()
-            logging.info(f"DEBUG: Raw text response: {text_response}")
-
-            # Remove markdown formatting if present
-            if text_response.startswith("```"):
-                text_response = re.sub(r"```(\w+)?", "", text_response).strip()
-
-            # Fix JSON closing issues
-            text_response = re.sub(r",\s*\]", "]", text_response)
-            if not text_response.endswith("]"):
-                text_response += "]"
-
-            try:
-                generated_raw = json.loads(text_response)
-            except json.JSONDecodeError:
-                logging.error(f"❌ JSON Decode Error: {text_response}")
-                return {"data": [{"title": topic, "content": "Text generation failed.", "image_query": topic}]}
-
-            logging.info(f"DEBUG: Parsed JSON structure: {generated_raw}")
-
-            result = []
-            if isinstance(generated_raw, list):
-                for entry in generated_raw:
-                    if isinstance(entry, dict):
-                        slide_title = entry.get("title", "Untitled Slide")
-                        slide_content = entry.get("content", "No content available.")
-                        image_query = entry.get("image_query", slide_title)
-                        result.append({"title": slide_title, "content": slide_content, "image_query": image_query})
-            else:
-                logging.error("❌ Unexpected JSON format from OpenAI.") 
-                return {"error": "Invalid JSON structure from OpenAI response"}
-
-            return {"data": result}
-
-        except Exception as e:
-            logging.error("Exception in text generation: %s", e, exc_info=True)
-            return {"error": f"Text generation failed: {e}"}
+    def cache_key(self, topic):
+        return llm_cache.make_key(self.MODEL, self.build_prompt(topic), self.TEMPERATURE, self.MAX_TOKENS)
 
-ToolRegistry.register("text_generation", OpenAITextGenerationTool())
-logging.info("✅ text_generation tool registered successfully.")
+    def clean_slides(self, generated_raw):
+        """Keeps the slide dicts of a parsed response and fills in missing fields."""
+        result = []
+        for entry in generated_raw:
+            if isinstance(entry, dict):
+                slide_title = entry.get("title", "Untitled Slide")
+                slide_content = entry.get("content", "No content available.")
+                image_query = entry.get("image_query", slide_title)
+                result.append({"title": slide_title, "content": slide_content, "image_query": image_query})
+        return result
@@ -1,15 +1,81 @@
-# tool_registry.py
+import importlib
+import logging
+import threading
+import time
+
+
 class ToolRegistry:
+    """
+    Tools by name. A tool is registered either as a ready instance or as a
+    lazy factory: an import path ("module:ClassName") or a callable, built
+    on the first `get_tool` and cached. Concurrent first calls for the same
+    tool build it only once.
+    """
     _registry = {}
+    _factories = {}
+    _build_locks = {}
+    _lock = threading.Lock()
 
     @classmethod
     def register(cls, name, tool):
-        cls._registry[name] = tool
+        with cls._lock:
+            cls._registry[name] = tool
+
+    @classmethod
+    def register_lazy(cls, name, factory):
+        """
+        Registers `factory` for `name` without importing or building it.
+        Registering the same factory again keeps an already built tool.
+        """
+        with cls._lock:
+            if cls._factories.get(name) != factory:
+                cls._factories[name] = factory
+                cls._registry.pop(name, None)
 
     @classmethod
     def get_tool(cls, name):
-        return cls._registry.get(name)
+        tool = cls._registry.get(name)
+        if tool is not None or name not in cls._factories:
+            return tool
+        with cls._lock:
+            build_lock = cls._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            tool = cls._registry.get(name)
+            if tool is None:
+                tool = cls._build(name)
+        return tool
+
+    @classmethod
+    def has_tool(cls, name):
+        """True if `name` is registered, without building it."""
+        return name in cls._registry or name in cls._factories
 
     @classmethod
     def list_tools(cls):
-        return list(cls._registry.keys())
+        return list(dict.fromkeys([*cls._registry, *cls._factories]))
+
+    @classmethod
+    def warm_up(cls, names=None):
+        """
+        Builds the named tools (all registered tools by default) ahead of
+        their first use. Returns the names that could not be built.
+        """
+        return [name for name in (names or cls.list_tools()) if cls.get_tool(name) is None]
+
+    @classmethod
+    def _build(cls, name):
+        factory = cls._factories[name]
+        start = time.perf_counter()
+        try:
+            if isinstance(factory, str):
+                module_name, _, attribute = factory.partition(":")
+                factory = getattr(importlib.import_module(module_name), attribute)
+            tool = factory()
+        except Exception as e:
+            # Not cached, so a later call can try again
+            logging.error(f"❌ Failed to build tool {name}: {e}")
+            return None
+        with cls._lock:
+            cls._registry[name] = tool
+        logging.info(f"✅ {name} tool built in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return tool
@@ -0,0 +1,404 @@
+import copy
+import io
+import itertools
+import logging
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+from lxml import etree
+from PIL import Image
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.oxml.shapes.picture import CT_Picture
+from pptx.parts.image import Image as PackageImage
+from pptx.util import Inches
+from config import Config
+from template_cache import FALLBACK_BOXES, TITLE_IMAGE_MARGIN
+
+logging.basicConfig(level=logging.INFO)
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+RELS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Values written into the prototype shapes and swapped for format fields
+# when they are compiled; none is a substring of another
+SENTINELS = {
+    "id": "7770001",
+    "name_number": "7770000",
+    "left": "7771001",
+    "top": "7772002",
+    "width": "7773003",
+    "height": "7774004",
+    "rId": "rId7775005",
+    "descr": "sentinel-descr",
+}
+SENTINEL_TEXT = "sentinel-text"
+
+NAMESPACE_DECLARATION = re.compile(r' xmlns:\w+="[^"]*"')
+# Characters lxml refuses; python-pptx raises ValueError for them too
+NOT_XML = re.compile("[\ud800-\udfff\ufffe\uffff]")
+# Escaped the way python-pptx writes control characters into a run
+CONTROL_CHARACTER = re.compile("[\x00-\x08\x0b-\x1f]")
+SLD_ID_LIST = re.compile(r"<p:sldIdLst/>|<p:sldIdLst>.*?</p:sldIdLst>", re.S)
+AFTER_SLD_ID_LIST = re.compile(r"<p:sldSz\b|<p:notesSz\b")
+RELATIONSHIP_ID = re.compile(r'Id="rId(\d+)"')
+DEFAULT_EXTENSION = re.compile(r'<Default Extension="([^"]+)"')
+MEDIA_NUMBER = re.compile(r"^ppt/media/image(\d+)\.")
+
+
+def serialize(element):
+    """`element` as XML text, without the namespace declarations on its root tag."""
+    xml = etree.tostring(element, encoding="unicode")
+    head, rest = xml.split(">", 1)
+    return NAMESPACE_DECLARATION.sub("", head) + ">" + rest
+
+
+def compile_fragment(element, fields=(), text=False):
+    """
+    Turns a prototype shape into a str.format template: the sentinel of
+    each name in `fields` becomes a {name} field and, with `text`, the
+    sentinel paragraph becomes {paragraphs}.
+    """
+    xml = serialize(element).replace("{", "{{").replace("}", "}}")
+    replacements = [(SENTINELS[name], name) for name in fields]
+    if text:
+        replacements.append((f"<a:p><a:r><a:t>{SENTINEL_TEXT}</a:t></a:r></a:p>", "paragraphs"))
+    for sentinel, name in replacements:
+        if sentinel not in xml:
+            raise ValueError(f"prototype has no {name} to fill")
+        xml = xml.replace(sentinel, "{" + name + "}")
+    return xml
+
+
+def paragraphs(text):
+    """
+    The <a:p> elements python-pptx writes for `text`: a paragraph per
+    line, a line break per vertical tab, and no run for empty pieces.
+    """
+    if NOT_XML.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    xml = []
+    for line in text.split("\n"):
+        parts = []
+        for index, run in enumerate(line.split("\v")):
+            if index:
+                parts.append("<a:br/>")
+            if run:
+                run = CONTROL_CHARACTER.sub(lambda match: f"_x{ord(match.group()):04X}_", run)
+                parts.append(f"<a:r><a:t>{escape(run)}</a:t></a:r>")
+        xml.append(f"<a:p>{''.join(parts)}</a:p>" if parts else "<a:p/>")
+    return "".join(xml)
+
+
+class XMLTemplate:
+    """
+    A DeckTemplate compiled to text: the template's package parts, the
+    slide skeleton, and a format string per shape the renderer places,
+    serialized from python-pptx-built prototypes so stamped slides match
+    what python-pptx would write.
+    """
+
+    def __init__(self, deck_template):
+        self.deck_template = template = deck_template
+        prs = template.copy_presentation()
+        self.slide_width, self.slide_height = prs.slide_width, prs.slide_height
+        with zipfile.ZipFile(io.BytesIO(template.package)) as package:
+            self.parts = {name: package.read(name) for name in package.namelist()}
+        self.layout_targets = {
+            kind: "../slideLayouts/" + prs.slide_layouts[index].part.partname.filename
+            for kind, (index, _) in template.layouts.items()
+        }
+        self.media_numbers = {int(m.group(1)) for m in map(MEDIA_NUMBER.match, self.parts) if m}
+
+        presentation = SLD_ID_LIST.sub("", self.parts["ppt/presentation.xml"].decode("utf-8"))
+        split = AFTER_SLD_ID_LIST.search(presentation).start()
+        self.presentation = presentation[:split], presentation[split:]
+        rels = self.parts["ppt/_rels/presentation.xml.rels"].decode("utf-8")
+        self.presentation_rels = rels.rsplit("</Relationships>", 1)[0]
+        self.presentation_rel_numbers = {int(number) for number in RELATIONSHIP_ID.findall(rels)}
+        content_types = self.parts["[Content_Types].xml"].decode("utf-8").rsplit("</Types>", 1)[0]
+        # New media Defaults go after the template's, ahead of its Overrides
+        split = content_types.find("<Override")
+        self.content_types = (content_types, "") if split < 0 else (content_types[:split], content_types[split:])
+        self.extensions = {ext.lower() for ext in DEFAULT_EXTENSION.findall(content_types)}
+
+        self._scratch = prs
+        self._lock = threading.Lock()
+        self._skeletons = {}
+        self.skeleton = self.background_skeleton("none")
+        self._compile_shapes()
+
+    def _compile_shapes(self):
+        _, slide = self._scratch_slide()
+        geometry = [int(SENTINELS[name]) for name in ("left", "top", "width", "height")]
+
+        picture = slide.shapes.add_picture(io.BytesIO(sentinel_png()), *geometry)
+        picture._element.nvPicPr.cNvPr.set("descr", SENTINELS["descr"])
+        picture._element.blipFill.blip.rEmbed = SENTINELS["rId"]
+        self.picture = self._compile_named(picture, "Picture", ("left", "top", "width", "height", "rId", "descr"))
+
+        textbox = slide.shapes.add_textbox(*geometry)
+        textbox.text_frame.text = SENTINEL_TEXT
+        self.textbox = self._compile_named(textbox, "TextBox", ("left", "top", "width", "height"), text=True)
+
+        self.placeholders = {}
+        self.moved_titles = {}
+        for kind, prototypes in self.deck_template.prototypes.items():
+            for role, element in prototypes.items():
+                if role == "image":
+                    continue
+                shape = slide.shapes._shape_factory(copy.deepcopy(element))
+                shape._element.nvSpPr.cNvPr.id = int(SENTINELS["id"])
+                shape.text_frame.text = SENTINEL_TEXT
+                self.placeholders[kind, role] = compile_fragment(shape._element, ("id",), text=True)
+                if role == "title":
+                    shape.left, shape.top, shape.width, shape.height = geometry
+                    self.moved_titles[kind] = compile_fragment(
+                        shape._element, ("id", "left", "top", "width", "height"), text=True)
+
+    def _compile_named(self, shape, prefix, fields, text=False):
+        shape._element._nvXxPr.cNvPr.id = int(SENTINELS["id"])
+        shape._element._nvXxPr.cNvPr.name = f"{prefix} {SENTINELS['name_number']}"
+        return compile_fragment(shape._element, ("id", "name_number", *fields), text=text)
+
+    def _scratch_slide(self):
+        layout = self._scratch.slide_layouts[0]
+        return self._scratch.part.add_slide(layout)
+
+    def background_skeleton(self, mode):
+        """
+        The slide XML around the shapes as (head, tail), with the <p:bg> of
+        a "solid" or "gradient" background from the current Config.
+        """
+        if mode not in ("solid", "gradient"):
+            key = mode = "none"
+        elif mode == "solid":
+            key = mode, Config.BACKGROUND_COLOR
+        else:
+            key = mode, Config.BACKGROUND_GRADIENT, Config.BACKGROUND_GRADIENT_ANGLE
+        with self._lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is None:
+                from backgrounds import apply_background
+
+                _, slide = self._scratch_slide()
+                if mode != "none":
+                    apply_background(slide, self._scratch)
+                xml = etree.tostring(slide._element, encoding="unicode")
+                split = xml.rindex("</p:spTree>")
+                skeleton = self._skeletons[key] = (XML_DECLARATION + xml[:split], xml[split:])
+            return skeleton
+
+
+def sentinel_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class XMLSlide:
+    """A slide of an XMLDeck: its shapes as XML text, in tree order, and its image relationships."""
+
+    def __init__(self, deck, kind):
+        self.deck = deck
+        self.kind = kind
+        self.skeleton = deck.template.skeleton
+        self.shapes = []
+        self.next_id = 2
+        # rId1 is the slide layout
+        self.rels = {}
+
+    def relate(self, media):
+        """The slide's rId for a media part, added on first use."""
+        rId = self.rels.get(media.partname)
+        if rId is None:
+            rId = self.rels[media.partname] = f"rId{len(self.rels) + 2}"
+        return rId
+
+    def add_shape(self, fragment, index=None, **fields):
+        shape_id = self.next_id
+        self.next_id += 1
+        xml = fragment.format(id=shape_id, name_number=shape_id - 1, **fields)
+        self.shapes.insert(len(self.shapes) if index is None else index, xml)
+
+    def add_picture(self, image, left, top, width, height, index=None):
+        media = self.deck.add_media(image)
+        self.add_shape(self.deck.template.picture, index, left=left, top=top, width=width, height=height,
+                       rId=self.relate(media), descr=escape(media.desc, {'"': "&quot;"}))
+
+    def apply_background(self, prs):
+        """Same backgrounds as backgrounds.apply_background gives python-pptx slides."""
+        from backgrounds import background_image_bytes
+
+        mode = Config.BACKGROUND_MODE
+        if mode == "image":
+            image_bytes = background_image_bytes(prs)
+            if image_bytes is None:
+                logging.warning("Background image not found; skipping background for slide.")
+                return
+            # Full-bleed picture behind all shapes
+            self.add_picture(self.deck.image_from_bytes(image_bytes), 0, 0,
+                             self.deck.slide_width, self.deck.slide_height, index=0)
+        elif mode in ("solid", "gradient"):
+            self.skeleton = self.deck.template.background_skeleton(mode)
+
+    def xml(self):
+        head, tail = self.skeleton
+        return (head + "".join(self.shapes) + tail).encode("utf-8")
+
+    def rels_xml(self):
+        rels = [f'<Relationship Id="rId1" Type="{RT.SLIDE_LAYOUT}" '
+                f'Target="{self.deck.template.layout_targets[self.kind]}"/>']
+        rels += [f'<Relationship Id="{rId}" Type="{RT.IMAGE}" Target="../media/{partname.rsplit("/", 1)[1]}"/>'
+                 for partname, rId in self.rels.items()]
+        return (f'{XML_DECLARATION}<Relationships xmlns="{RELS_NAMESPACE}">'
+                + "".join(rels) + "</Relationships>").encode("utf-8")
+
+
+class Media:
+    """An image part of an XMLDeck."""
+
+    def __init__(self, partname, image):
+        self.partname = partname
+        self.desc = image.filename or f"image.{image.ext}"
+        self.blob = image.blob
+        self.ext = image.ext
+        self.content_type = image.content_type
+
+
+class XMLDeck:
+    """
+    A deck rendered without python-pptx's object model: slides are
+    stamped from an XMLTemplate's precompiled XML as they are added, and
+    `save` writes the whole package in one pass. Slides match what
+    DeckTemplate.add_slide builds with python-pptx.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.slide_width = template.slide_width
+        self.slide_height = template.slide_height
+        self.slides = []
+        # Image parts by content hash, in the order they were added
+        self.media = {}
+        self._images = {}
+
+    def add_slide(self, kind, title, body=None, image_path=None):
+        slide = XMLSlide(self, kind)
+        image_bottom = None
+        if image_path:
+            try:
+                image_bottom = self._place_image(slide, kind, image_path)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not place image {image_path}: {e}; leaving the slide without it")
+
+        template = self.template
+        if (kind, "title") in template.placeholders:
+            left, top, width, height = template.deck_template.placeholder_boxes[kind]["title"]
+            # A title slide's image sits at the top; keep the title clear of it
+            if kind == "title" and image_bottom is not None and top < image_bottom:
+                slide.add_shape(template.moved_titles[kind], left=left, top=image_bottom + TITLE_IMAGE_MARGIN,
+                                width=width, height=height, paragraphs=paragraphs(title))
+            else:
+                slide.add_shape(template.placeholders[kind, "title"], paragraphs=paragraphs(title))
+        else:
+            left, top, width, height = (Inches(v) for v in FALLBACK_BOXES[kind]["title"])
+            if kind == "title" and image_bottom is not None and top < image_bottom:
+                top = image_bottom + TITLE_IMAGE_MARGIN
+            slide.add_shape(template.textbox, left=left, top=top, width=width, height=height,
+                            paragraphs=paragraphs(title))
+
+        if body:
+            if (kind, "body") in template.placeholders:
+                slide.add_shape(template.placeholders[kind, "body"], paragraphs=paragraphs(body))
+            else:
+                left, top, width, height = (Inches(v) for v in FALLBACK_BOXES[kind]["body"])
+                slide.add_shape(template.textbox, left=left, top=top, width=width, height=height,
+                                paragraphs=paragraphs(body))
+        self.slides.append(slide)
+        return slide
+
+    def _place_image(self, slide, kind, image_path):
+        """Adds the slide's picture as DeckTemplate._place_image would; returns its bottom edge."""
+        image = self._image(image_path)
+        template = self.template.deck_template
+        if template.image_types.get(kind) == PP_PLACEHOLDER.PICTURE:
+            return self._fill_picture_placeholder(slide, kind, image)
+        left, top, width, height = template.image_box(kind, image.size)
+        slide.add_picture(image, left, top, width, height)
+        return top + height
+
+    def _fill_picture_placeholder(self, slide, kind, image):
+        template = self.template.deck_template
+        placeholder = copy.deepcopy(template.prototypes[kind]["image"])
+        left, top, width, height = template.placeholder_boxes[kind]["image"]
+        media = self.add_media(image)
+        shape_id = slide.next_id
+        picture = CT_Picture.new_ph_pic(shape_id, placeholder.nvSpPr.cNvPr.name, media.desc, slide.relate(media))
+        picture.crop_to_fit(image.size, (width, height))
+        picture.nvPicPr.nvPr._insert_ph(placeholder.ph)
+        slide.add_shape(serialize(picture).replace("{", "{{").replace("}", "}}"))
+        return top + height
+
+    def _image(self, image_path):
+        image = self._images.get(image_path)
+        if image is None:
+            image = self._images[image_path] = PackageImage.from_file(image_path)
+            # Fails here, like python-pptx, for files PIL cannot identify
+            image.size
+        return image
+
+    def image_from_bytes(self, image_bytes):
+        # Keyed by the bytes themselves; a bytes object hashes its content once
+        image = self._images.get(image_bytes)
+        if image is None:
+            image = self._images[image_bytes] = PackageImage.from_blob(image_bytes)
+        return image
+
+    def add_media(self, image):
+        """The deck's image part holding `image`, added on first use."""
+        media = self.media.get(image.sha1)
+        if media is None:
+            used = self.template.media_numbers | {int(MEDIA_NUMBER.match(m.partname[1:]).group(1))
+                                                  for m in self.media.values()}
+            number = next(n for n in itertools.count(1) if n not in used)
+            media = self.media[image.sha1] = Media(f"/ppt/media/image{number}.{image.ext}", image)
+        return media
+
+    def save(self, output):
+        """Writes the deck to a path or a writable file object in one pass."""
+        template = self.template
+        free = (n for n in itertools.count(1) if n not in template.presentation_rel_numbers)
+        slide_rIds = [f"rId{next(free)}" for _ in self.slides]
+
+        defaults, overrides = template.content_types
+        content_types = [defaults]
+        for ext, content_type in sorted({(m.ext, m.content_type) for m in self.media.values()}):
+            if ext.lower() not in template.extensions:
+                content_types.append(f'<Default Extension="{ext}" ContentType="{content_type}"/>')
+        content_types.append(overrides)
+        content_types += [f'<Override PartName="/ppt/slides/slide{number}.xml" ContentType="{CT.PML_SLIDE}"/>'
+                          for number in range(1, len(self.slides) + 1)]
+        content_types.append("</Types>")
+
+        head, tail = template.presentation
+        slide_ids = "".join(f'<p:sldId id="{256 + index}" r:id="{rId}"/>' for index, rId in enumerate(slide_rIds))
+        presentation = head + (f"<p:sldIdLst>{slide_ids}</p:sldIdLst>" if slide_ids else "") + tail
+        presentation_rels = template.presentation_rels + "".join(
+            f'<Relationship Id="{rId}" Type="{RT.SLIDE}" Target="slides/slide{number}.xml"/>'
+            for number, rId in enumerate(slide_rIds, 1)) + "</Relationships>"
+
+        rewritten = {
+            "[Content_Types].xml": "".join(content_types).encode("utf-8"),
+            "ppt/presentation.xml": presentation.encode("utf-8"),
+            "ppt/_rels/presentation.xml.rels": presentation_rels.encode("utf-8"),
+        }
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as package:
+            for name, data in template.parts.items():
+                package.writestr(name, rewritten.get(name, data))
+            for number, slide in enumerate(self.slides, 1):
+                package.writestr(f"ppt/slides/slide{number}.xml", slide.xml())
+                package.writestr(f"ppt/slides/_rels/slide{number}.xml.rels", slide.rels_xml())
+            for media in self.media.values():
+                package.writestr(media.partname[1:], media.blob)